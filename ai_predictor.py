@@ -3,10 +3,50 @@ import pandas as pd
 import numpy as np
 from datetime import datetime, timedelta
 from sklearn.ensemble import RandomForestRegressor
+from sklearn.metrics import mean_absolute_error, r2_score
+from sklearn.model_selection import KFold, ParameterGrid, ParameterSampler
 from sklearn.preprocessing import LabelEncoder
+import itertools
 import joblib
 import os
-import sqlite3
+import time
+import clock
+import metrics
+import worker_pool
+from model_registry import ModelRegistry
+
+TRAIN_SECONDS = metrics.registry.histogram(
+    'expiry_model_train_seconds', 'Time spent training the urgency model')
+PREDICT_SECONDS = metrics.registry.histogram(
+    'expiry_model_predict_seconds', 'Time spent predicting one urgency score')
+
+# Search space of tune_model: tree count and depth
+DEFAULT_PARAM_GRID = {
+    'n_estimators': [10, 25, 50, 100, 200],
+    'max_depth': [4, 8, 12, None],
+}
+
+# (days left up to, action, priority, estimated cost); the last tier catches the rest
+RECOMMENDATION_TIERS = (
+    (0, 'فوري: قم بالتجديد فوراً', 'عالي جداً', 'تحقق من التكلفة الإضافية للتأخير'),
+    (7, 'عاجل: ابدأ إجراءات التجديد', 'عالي', 'التكلفة المعتادة'),
+    (30, 'مخطط: ابدأ التحضير للتجديد', 'متوسط', 'التكلفة المعتادة'),
+    (float('inf'), 'مراقبة: ضع تذكيراً لاحقاً', 'منخفض', 'التكلفة المعتادة'),
+)
+
+def _fit_candidate(task):
+    """Fit one (params, fold) pair; returns its scores, size and fit time"""
+    params, fold = task
+    X, y, folds = worker_pool.shared()
+    train_index, test_index = folds[fold]
+    start = time.perf_counter()
+    model = RandomForestRegressor(random_state=42, n_jobs=1, **params)
+    model.fit(X[train_index], y[train_index])
+    seconds = time.perf_counter() - start
+    predicted = model.predict(X[test_index])
+    nodes = sum(tree.tree_.node_count for tree in model.estimators_)
+    return params, fold, r2_score(y[test_index], predicted), mean_absolute_error(y[test_index], predicted), nodes, seconds
+
 
 class ExpiryPredictor:
     def __init__(self, tracker):
@@ -14,6 +54,8 @@ class ExpiryPredictor:
         self.model = None
         self.label_encoders = {}
         self.model_path = os.path.join('data', 'expiry_predictor.pkl')
+        self.training_report = None
+        self.registry = ModelRegistry(os.path.join('data', 'models'))
 
     def encode_column(self, column_name, data):
         """Encode categorical data with LabelEncoder and store encoder"""
@@ -22,45 +64,144 @@ class ExpiryPredictor:
             self.label_encoders[column_name].fit(data)
         return self.label_encoders[column_name].transform(data)
 
-    def prepare_training_data(self):
-        """Prepare data for training the prediction model"""
+    def load_training_frame(self):
+        """All non-deleted items as a DataFrame, read from the analytics snapshot if there is one"""
+        conn = self.tracker.analytics().get_connection()
         df = pd.read_sql_query(
             "SELECT * FROM expiry_items WHERE status != 'deleted'",
-            sqlite3.connect(self.tracker.db_path)
+            conn
         )
-        
+        conn.close()
+        return df
+
+    def prepare_training_data(self):
+        """Prepare data for training the prediction model"""
+        df = self.load_training_frame()
+
         if len(df) < 10:
             return None, None
 
-        df['expiry_date'] = pd.to_datetime(df['expiry_date'])
-        df['days_until_expiry'] = (df['expiry_date'] - datetime.now()).dt.days
+        # Calendar days from clock.today(), as in the status projection's days_left
+        df['expiry_date'] = pd.to_datetime(df['expiry_date']).dt.normalize()
+        df['days_until_expiry'] = (df['expiry_date'] - pd.Timestamp(clock.today())).dt.days
 
         features = pd.DataFrame()
         features['category_encoded'] = self.encode_column('category', df['category'])
         features['priority_encoded'] = self.encode_column('priority', df['priority'])
         features['source_encoded'] = self.encode_column('source', df['source'])
-        features['days_created'] = (datetime.now() - pd.to_datetime(df['created_at'])).dt.days
+        features['days_created'] = (clock.now() - pd.to_datetime(df['created_at'])).dt.days
 
         df['urgency_score'] = np.clip(100 - df['days_until_expiry'], 0, 100)
 
         return features, df['urgency_score']
 
-    def train_model(self):
-        """Train the prediction model"""
+    @metrics.timed(TRAIN_SECONDS)
+    def train_model(self, n_jobs: int = None, **params):
+        """Train the prediction model (n_jobs=-1 uses every core)"""
         X, y = self.prepare_training_data()
 
         if X is None or len(X) < 10:
             return False
 
-        self.model = RandomForestRegressor(n_estimators=100, random_state=42)
+        params = dict({'n_estimators': 100}, **params)
+        self.model = RandomForestRegressor(random_state=42, n_jobs=n_jobs, **params)
         self.model.fit(X, y)
+        self.save_model()
+
+        return True
 
-        joblib.dump({
+    def save_model(self, report=None):
+        data = {
             'model': self.model,
             'encoders': self.label_encoders
-        }, self.model_path)
+        }
+        if report is not None:
+            data['report'] = report
+        joblib.dump(data, self.model_path)
 
-        return True
+    @metrics.timed(TRAIN_SECONDS)
+    def tune_model(self, param_grid=None, cv: int = 3, target_r2: float = None, tolerance: float = 0.01,
+                   n_jobs: int = -1, n_iter: int = None, baseline: bool = True):
+        """Cross-validated search over tree count and depth in a process pool.
+
+        Every (candidate, fold) fit runs as its own task on n_jobs processes
+        (-1 = all cores); with n_iter a random subset of the grid is tried.
+        The smallest model (fewest tree nodes) whose mean R² reaches
+        target_r2 (default: the best score minus tolerance) is refitted on all
+        data with every core and saved; if none does, the best scoring one is
+        used. Returns a report with the scores and wall times, including a
+        single-core fit of the default model.
+        """
+        X, y = self.prepare_training_data()
+
+        if X is None or len(X) < 10:
+            return None
+
+        features, X, y = X, X.to_numpy(), y.to_numpy()
+        grid = param_grid or DEFAULT_PARAM_GRID
+        candidates = (list(ParameterSampler(grid, n_iter, random_state=42)) if n_iter
+                      else list(ParameterGrid(grid)))
+        folds = list(KFold(n_splits=cv, shuffle=True, random_state=42).split(X))
+        tasks = list(itertools.product(candidates, range(cv)))
+        workers = min(os.cpu_count() or 1, len(tasks)) if n_jobs in (None, -1) else n_jobs
+
+        start = time.perf_counter()
+        if workers <= 1:
+            worker_pool.share((X, y, folds))
+            results = [_fit_candidate(task) for task in tasks]
+        else:
+            with worker_pool.executor(workers, (X, y, folds)) as pool:
+                results = list(pool.map(_fit_candidate, tasks))
+        search_seconds = time.perf_counter() - start
+
+        scores = {}
+        for params, fold, r2, mae, nodes, seconds in results:
+            entry = scores.setdefault(tuple(sorted(params.items())), {
+                'params': params, 'r2': [], 'mae': [], 'nodes': [], 'fit_seconds': 0.0})
+            entry['r2'].append(r2)
+            entry['mae'].append(mae)
+            entry['nodes'].append(nodes)
+            entry['fit_seconds'] += seconds
+        ranked = [{
+            'params': entry['params'],
+            'r2': float(np.mean(entry['r2'])),
+            'mae': float(np.mean(entry['mae'])),
+            'nodes': int(np.mean(entry['nodes'])),
+            'fit_seconds': entry['fit_seconds'],
+        } for entry in scores.values()]
+        ranked.sort(key=lambda candidate: candidate['nodes'])
+
+        if target_r2 is None:
+            target_r2 = max(candidate['r2'] for candidate in ranked) - tolerance
+        passing = [candidate for candidate in ranked if candidate['r2'] >= target_r2]
+        chosen = passing[0] if passing else max(ranked, key=lambda candidate: candidate['r2'])
+
+        start = time.perf_counter()
+        self.model = RandomForestRegressor(random_state=42, n_jobs=n_jobs, **chosen['params'])
+        self.model.fit(features, y)
+        final_seconds = time.perf_counter() - start
+
+        report = {
+            'candidates': ranked,
+            'chosen': chosen,
+            'target_r2': target_r2,
+            'target_met': bool(passing),
+            'workers': workers,
+            'search_seconds': search_seconds,
+            # Sum of the individual fit times: what the search costs on one core
+            'search_single_core_seconds': sum(candidate['fit_seconds'] for candidate in ranked),
+            'final_fit_seconds': final_seconds,
+        }
+        report['search_speedup'] = report['search_single_core_seconds'] / search_seconds if search_seconds else 0.0
+
+        if baseline:
+            start = time.perf_counter()
+            RandomForestRegressor(n_estimators=100, random_state=42, n_jobs=1).fit(features, y)
+            report['baseline_single_core_seconds'] = time.perf_counter() - start
+
+        self.training_report = report
+        self.save_model(report)
+        return report
 
     def load_model(self):
         """Load the trained model and encoders from file"""
@@ -68,69 +209,62 @@ class ExpiryPredictor:
             data = joblib.load(self.model_path)
             self.model = data['model']
             self.label_encoders = data['encoders']
+            self.training_report = data.get('report')
             return True
         return False
 
+    def train_category_models(self):
+        """Train one small model per category; returns the registry index"""
+        df = self.load_training_frame()
+        if len(df) < 10:
+            return None
+        return self.registry.train(df)
+
+    @metrics.timed(PREDICT_SECONDS)
     def predict_urgency(self, item_data):
         """Predict urgency score for a new item"""
-        if self.model is None:
-            if not self.load_model():
-                return 50  # Default score if no model available
+        # A per-category model if there is one; the heuristic if nothing else can score the item
+        if item_data.get('category') in self.registry:
+            return float(self.registry.predict([item_data])[0])
+        if self.model is None and not self.load_model():
+            return float(self.registry.predict([item_data])[0])
 
         try:
             features = pd.DataFrame([{
                 'category_encoded': self.label_encoders['category'].transform([item_data['category']])[0],
                 'priority_encoded': self.label_encoders['priority'].transform([item_data['priority']])[0],
                 'source_encoded': self.label_encoders['source'].transform([item_data['source']])[0],
-                'days_created': (datetime.now() - pd.to_datetime(item_data['created_at'])).days
+                'days_created': (clock.now() - pd.to_datetime(item_data['created_at'])).days
             }])
         except Exception:
-            return 50  # Fallback if encoding fails
+            return float(self.registry.predict([item_data])[0])
 
         urgency_score = self.model.predict(features)[0]
         return max(0, min(100, urgency_score))
 
+    def predict_urgency_batch(self, items):
+        """Urgency scores for many items at once, from the per-category models"""
+        return self.registry.predict(items)
+
     def get_smart_recommendations(self):
         """Get AI-powered recommendations"""
-        upcoming = self.tracker.get_upcoming_expirations(60)
-
-        if upcoming.empty:
-            return []
+        upcoming = self.tracker.get_upcoming_records(60)
+        today = clock.today()
 
         recommendations = []
 
-        for _, item in upcoming.iterrows():
-            days_left = int(item['days_remaining'])
-
-            if days_left <= 0:
-                recommendation = {
-                    'item': item['title'],
-                    'action': 'فوري: قم بالتجديد فوراً',
-                    'priority': 'عالي جداً',
-                    'estimated_cost': 'تحقق من التكلفة الإضافية للتأخير'
-                }
-            elif days_left <= 7:
-                recommendation = {
-                    'item': item['title'],
-                    'action': 'عاجل: ابدأ إجراءات التجديد',
-                    'priority': 'عالي',
-                    'estimated_cost': 'التكلفة المعتادة'
-                }
-            elif days_left <= 30:
-                recommendation = {
-                    'item': item['title'],
-                    'action': 'مخطط: ابدأ التحضير للتجديد',
-                    'priority': 'متوسط',
-                    'estimated_cost': 'التكلفة المعتادة'
-                }
-            else:
-                recommendation = {
-                    'item': item['title'],
-                    'action': 'مراقبة: ضع تذكيراً لاحقاً',
-                    'priority': 'منخفض',
-                    'estimated_cost': 'التكلفة المعتادة'
-                }
-
-            recommendations.append(recommendation)
+        for item in upcoming:
+            days_left = item.days_until(today)
+
+            for limit, action, priority, estimated_cost in RECOMMENDATION_TIERS:
+                if days_left <= limit:
+                    break
+
+            recommendations.append({
+                'item': item.title,
+                'action': action,
+                'priority': priority,
+                'estimated_cost': estimated_cost
+            })
 
         return recommendations
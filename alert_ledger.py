@@ -0,0 +1,120 @@
+# alert_ledger.py - سجل إرسال التنبيهات لمنع التكرار بين التشغيلات المتزامنة
+"""Delivery ledger on the alerts table.
+
+Every alert is identified by (item_id, alert_type, alert_date, channel):
+alert_type is the milestone (the alert tier the item has reached), and
+alert_date the expiry date of the cycle, so a renewed recurring item is
+alerted again for its next cycle. A unique index on that key makes claiming
+atomic: a run inserts its claims with INSERT OR IGNORE and only sends the
+rows it actually inserted, so two overlapping runs never send the same alert.
+
+A successful send marks the row sent; a failed one deletes the claim so a
+later run can retry. A run that dies between claim and send leaves an unsent
+claim behind, which is never retried: sends are at most once.
+"""
+import json
+from typing import Iterable, List, Set, Tuple
+
+import numpy as np
+
+from message_templates import tier_index
+
+# Milestone per alert tier of message_templates (days left <= 0, 7, 30, later)
+MILESTONES = ('expired', 'week', 'month', 'later')
+
+AlertKey = Tuple[int, str, str, str]
+
+
+def create_alert_ledger(cursor):
+    """Add the ledger columns and the unique claim index to the alerts table"""
+    cursor.execute("PRAGMA table_info(alerts)")
+    existing = {row[1] for row in cursor.fetchall()}
+    if 'channel' not in existing:
+        cursor.execute("ALTER TABLE alerts ADD COLUMN channel TEXT")
+    if 'sent_at' not in existing:
+        cursor.execute("ALTER TABLE alerts ADD COLUMN sent_at TIMESTAMP")
+    cursor.execute('''
+        CREATE UNIQUE INDEX IF NOT EXISTS idx_alerts_ledger
+        ON alerts (item_id, alert_type, alert_date, channel)
+    ''')
+
+
+def milestones(days_left) -> List[str]:
+    """Milestone of each item, for a whole array of days left"""
+    return [MILESTONES[tier] for tier in tier_index(np.asarray(days_left, dtype=np.int64)).tolist()]
+
+
+class AlertLedger:
+    """Claims, sent marks and bulk lookups on the alerts table"""
+
+    def __init__(self, tracker):
+        self.tracker = tracker
+
+    @staticmethod
+    def keys(items, days_left, channel: str) -> List[AlertKey]:
+        return [(item['id'], milestone, str(item['expiry_date'])[:10], channel)
+                for item, milestone in zip(items, milestones(days_left))]
+
+    def lookup(self, keys: Iterable[AlertKey], conn=None) -> Set[AlertKey]:
+        """Keys already in the ledger (claimed or sent), in one query over their item ids"""
+        keys = list(keys)
+        if not keys:
+            return set()
+        own = conn is None
+        conn = conn or self.tracker.get_connection()
+        try:
+            rows = conn.execute('''
+                SELECT item_id, alert_type, alert_date, channel FROM alerts
+                WHERE item_id IN (SELECT value FROM json_each(?))
+            ''', (json.dumps(sorted({key[0] for key in keys})),)).fetchall()
+        finally:
+            if own:
+                conn.close()
+        wanted = set(keys)
+        return {row for row in map(tuple, rows) if row in wanted}
+
+    def claim(self, keys: Iterable[AlertKey]) -> Set[AlertKey]:
+        """Claim alerts for sending; returns the keys this caller won.
+
+        Keys already in the ledger are dropped with one lookup first; the rest
+        are inserted in one transaction, and a key whose insert was ignored
+        belongs to a concurrent run.
+        """
+        keys = list(dict.fromkeys(keys))
+        if not keys:
+            return set()
+        conn = self.tracker.get_connection()
+        try:
+            cursor = conn.cursor()
+            cursor.execute("BEGIN IMMEDIATE")
+            existing = self.lookup(keys, conn)
+            won = set()
+            for key in keys:
+                if key in existing:
+                    continue
+                cursor.execute('''
+                    INSERT OR IGNORE INTO alerts (item_id, alert_type, alert_date, channel, sent)
+                    VALUES (?, ?, ?, ?, 0)
+                ''', key)
+                if cursor.rowcount:
+                    won.add(key)
+            conn.commit()
+        finally:
+            conn.close()
+        return won
+
+    def finish(self, sent: Iterable[AlertKey], failed: Iterable[AlertKey] = ()):
+        """Mark sent alerts and release the claims of failed ones"""
+        conn = self.tracker.get_connection()
+        try:
+            conn.executemany('''
+                UPDATE alerts SET sent = 1, sent_at = CURRENT_TIMESTAMP
+                WHERE item_id = ? AND alert_type = ? AND alert_date = ? AND channel = ?
+            ''', list(sent))
+            conn.executemany('''
+                DELETE FROM alerts
+                WHERE item_id = ? AND alert_type = ? AND alert_date = ? AND channel = ? AND sent = 0
+            ''', list(failed))
+            conn.commit()
+        finally:
+            conn.close()
@@ -0,0 +1,379 @@
+# api_server.py - واجهة REST (JSON) محلية لنظام تتبع الانتهاء
+"""Asynchronous JSON API over ExpiryTracker and ExpiryPredictor.
+
+Requests are parsed on an asyncio event loop; database work runs on a thread
+pool that shares a fixed pool of SQLite connections. GET responses carry an
+ETag derived from the tracker's data version, so unchanged resources are
+answered with 304 before any query runs, and bodies are gzip-compressed when
+the client accepts it. Encoded bodies are also kept in a small LRU keyed by
+ETag, so repeated requests for unchanged data skip the query and JSON work.
+
+Usage:
+    python api_server.py --port 8080 --db data/expiry_tracker.db
+"""
+import argparse
+import asyncio
+import functools
+import gzip
+import hashlib
+import json
+import math
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+from http import HTTPStatus
+from typing import Any, Dict
+from urllib.parse import parse_qs, urlsplit
+
+import clock
+from ai_predictor import ExpiryPredictor
+from models import ExpiryTracker
+from query_cache import QueryCache, MISSING
+
+MAX_BODY_BYTES = 1024 * 1024
+GZIP_MIN_BYTES = 1024
+STREAM_BATCH_SIZE = 500
+# Encoded bodies kept per ETag; the ETag embeds the data version, so entries never go stale
+RESPONSE_CACHE_SIZE = 256
+
+
+class HttpError(Exception):
+    def __init__(self, status: int, message: str):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+
+
+class Request:
+    def __init__(self, method: str, target: str, headers: Dict[str, str], body: bytes):
+        self.method = method
+        self.target = target
+        self.headers = headers
+        self.body = body
+        parts = urlsplit(target)
+        self.path = parts.path.rstrip('/') or '/'
+        self.query = {key: values[-1] for key, values in parse_qs(parts.query).items()}
+
+    def int_param(self, name: str, default: int, minimum: int = 0, maximum: int = None) -> int:
+        try:
+            value = int(self.query.get(name, default))
+        except ValueError:
+            raise HttpError(400, f"'{name}' must be an integer")
+        if value < minimum or (maximum is not None and value > maximum):
+            raise HttpError(400, f"'{name}' must be between {minimum} and {maximum}")
+        return value
+
+    def json(self) -> Any:
+        try:
+            return json.loads(self.body or b'null')
+        except ValueError:
+            raise HttpError(400, "Request body is not valid JSON")
+
+    @property
+    def accepts_gzip(self) -> bool:
+        return 'gzip' in self.headers.get('accept-encoding', '')
+
+    @property
+    def keep_alive(self) -> bool:
+        return self.headers.get('connection', '').lower() != 'close'
+
+
+class StreamedJson:
+    """A JSON array produced batch by batch and sent with chunked encoding"""
+
+    def __init__(self, batches):
+        self.batches = batches
+
+
+def _json_value(value):
+    if isinstance(value, float) and math.isnan(value):
+        return None
+    if hasattr(value, 'item'):
+        return value.item()
+    return str(value)
+
+
+def _records(df) -> list:
+    """DataFrame rows as JSON-ready dicts (NaN becomes null)"""
+    if df.empty:
+        return []
+    return df.astype(object).where(df.notna(), None).to_dict('records')
+
+
+def _dumps(payload) -> bytes:
+    return json.dumps(payload, ensure_ascii=False, default=_json_value).encode('utf-8')
+
+
+class ApiServer:
+    def __init__(self, tracker: ExpiryTracker = None, predictor: ExpiryPredictor = None,
+                 host: str = '127.0.0.1', port: int = 8080, workers: int = 8,
+                 db_path: str = "data/expiry_tracker.db", max_page_size: int = 1000,
+                 response_cache_size: int = RESPONSE_CACHE_SIZE):
+        self.tracker = tracker or ExpiryTracker(db_path, pool_size=workers)
+        self.predictor = predictor or ExpiryPredictor(self.tracker)
+        self.host = host
+        self.port = port
+        self.max_page_size = max_page_size
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='api')
+        self._responses = QueryCache(response_cache_size) if response_cache_size else None
+        self._server = None
+
+        self.routes = {
+            ('GET', '/health'): self.health,
+            ('GET', '/items'): self.list_items,
+            ('GET', '/items/stream'): self.stream_items,
+            ('GET', '/stats'): self.stats,
+            ('GET', '/upcoming'): self.upcoming,
+            ('GET', '/overdue'): self.overdue,
+            ('GET', '/search'): self.search,
+            ('GET', '/recommendations'): self.recommendations,
+            ('POST', '/predict'): self.predict,
+        }
+
+    async def run_db(self, func, *args, **kwargs):
+        """Run blocking tracker/predictor work on the worker pool"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, functools.partial(func, *args, **kwargs))
+
+    # ------------------------------------------------------------------ routes
+
+    async def health(self, request):
+        return {'status': 'ok'}
+
+    async def list_items(self, request):
+        limit = request.int_param('limit', 100, 1, self.max_page_size)
+        offset = request.int_param('offset', 0)
+        category = request.query.get('category')
+        status = request.query.get('status', 'active')
+        items = await self.run_db(self.tracker.get_items_page, limit, offset, category, status)
+        total = await self.run_db(self.tracker.count_items, category, status)
+        next_offset = offset + limit if offset + limit < total else None
+        return {'items': items, 'total': total, 'limit': limit, 'offset': offset, 'next_offset': next_offset}
+
+    async def stream_items(self, request):
+        category = request.query.get('category')
+        status = request.query.get('status', 'active')
+        batches = self.tracker.iter_item_batches(STREAM_BATCH_SIZE, category, status)
+        return StreamedJson(batches)
+
+    async def get_item(self, request, item_id: int):
+        item = await self.run_db(self.tracker.get_item, item_id)
+        if item is None:
+            raise HttpError(404, f"Item {item_id} not found")
+        return item
+
+    async def stats(self, request):
+        return await self.run_db(self.tracker.get_statistics)
+
+    async def upcoming(self, request):
+        days = request.int_param('days', 30, 0, 3650)
+        df = await self.run_db(self.tracker.get_upcoming_expirations, days, expand_recurring=True)
+        return {'items': _records(df), 'days': days}
+
+    async def overdue(self, request):
+        df = await self.run_db(self.tracker.get_overdue_items)
+        return {'items': _records(df)}
+
+    async def search(self, request):
+        query = request.query.get('q', '')
+        if not query:
+            raise HttpError(400, "'q' is required")
+        limit = request.int_param('limit', 50, 1, self.max_page_size)
+        filters = {key: request.query[key] for key in ('category', 'source', 'priority', 'status')
+                   if key in request.query}
+        df = await self.run_db(self.tracker.search_items, query, filters, limit)
+        return {'items': _records(df), 'query': query}
+
+    async def recommendations(self, request):
+        return {'recommendations': await self.run_db(self.predictor.get_smart_recommendations)}
+
+    async def predict(self, request):
+        item = request.json()
+        if not isinstance(item, dict):
+            raise HttpError(400, "Expected a JSON object")
+        missing = [key for key in ('category', 'priority', 'source', 'created_at') if key not in item]
+        if missing:
+            raise HttpError(400, f"Missing fields: {', '.join(missing)}")
+        score = await self.run_db(self.predictor.predict_urgency, item)
+        return {'urgency_score': float(score)}
+
+    # ---------------------------------------------------------------- plumbing
+
+    def resolve(self, request):
+        handler = self.routes.get((request.method, request.path))
+        if handler is not None:
+            return handler, ()
+        if request.path.startswith('/items/') and request.method == 'GET':
+            item_id = request.path[len('/items/'):]
+            if item_id.isdigit():
+                return self.get_item, (int(item_id),)
+        if any(path == request.path for _, path in self.routes):
+            raise HttpError(405, "Method not allowed")
+        raise HttpError(404, "Not found")
+
+    async def etag_for(self, request) -> str:
+        version = await self.run_db(self.tracker.get_data_version)
+        digest = hashlib.sha1(request.target.encode('utf-8')).hexdigest()[:12]
+        return f'W/"{version}-{clock.today().isoformat()}-{digest}"'
+
+    async def handle(self, request) -> tuple:
+        """Return (status, headers, body or StreamedJson) for one request"""
+        try:
+            handler, args = self.resolve(request)
+            headers = {}
+            cache_key = None
+            if request.method == 'GET' and request.path != '/health':
+                etag = await self.etag_for(request)
+                headers['ETag'] = etag
+                headers['Cache-Control'] = 'no-cache'
+                if request.headers.get('if-none-match') == etag:
+                    return 304, headers, b''
+                if self._responses is not None and request.path != '/items/stream':
+                    cache_key = (etag, request.accepts_gzip)
+                    cached, generation = self._responses.get(cache_key)
+                    if cached is not MISSING:
+                        body, encoding = cached
+                        if encoding:
+                            headers['Content-Encoding'] = encoding
+                        return 200, headers, body
+            payload = await handler(request, *args)
+            if isinstance(payload, StreamedJson):
+                return 200, headers, payload
+            body = _dumps(payload)
+            if request.accepts_gzip and len(body) >= GZIP_MIN_BYTES:
+                body = gzip.compress(body, compresslevel=5)
+                headers['Content-Encoding'] = 'gzip'
+            if cache_key is not None:
+                self._responses.put(cache_key, (body, headers.get('Content-Encoding')), generation)
+            return 200, headers, body
+        except HttpError as e:
+            return e.status, {}, _dumps({'error': e.message})
+        except Exception as e:
+            print(f"API request failed: {request.method} {request.target}: {e}")
+            return 500, {}, _dumps({'error': 'Internal server error'})
+
+    async def handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            while True:
+                request = await self.read_request(reader)
+                if request is None:
+                    break
+                status, headers, body = await self.handle(request)
+                await self.write_response(writer, request, status, headers, body)
+                if not request.keep_alive:
+                    break
+        except HttpError as e:
+            writer.write(self._head(e.status, {'Content-Length': '0', 'Connection': 'close'}))
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            try:
+                writer.close()
+                await writer.wait_closed()
+            except ConnectionError:
+                pass
+
+    async def read_request(self, reader: asyncio.StreamReader):
+        line = await reader.readline()
+        if not line:
+            return None
+        try:
+            method, target, _ = line.decode('latin-1').rstrip('\r\n').split(' ', 2)
+        except ValueError:
+            raise HttpError(400, "Malformed request line")
+
+        headers = {}
+        while True:
+            line = await reader.readline()
+            if line in (b'\r\n', b'\n', b''):
+                break
+            name, _, value = line.decode('latin-1').partition(':')
+            headers[name.strip().lower()] = value.strip()
+
+        try:
+            length = int(headers.get('content-length') or 0)
+        except ValueError:
+            raise HttpError(400, "Invalid Content-Length")
+        if length > MAX_BODY_BYTES:
+            raise HttpError(413, "Request body too large")
+        body = await reader.readexactly(length) if length else b''
+        return Request(method.upper(), target, headers, body)
+
+    @staticmethod
+    def _head(status: int, headers: Dict[str, str]) -> bytes:
+        lines = [f'HTTP/1.1 {status} {HTTPStatus(status).phrase}']
+        lines.extend(f'{name}: {value}' for name, value in headers.items())
+        return ('\r\n'.join(lines) + '\r\n\r\n').encode('latin-1')
+
+    async def write_response(self, writer, request, status, headers, body):
+        headers['Connection'] = 'keep-alive' if request.keep_alive else 'close'
+        if status != 304:
+            headers['Content-Type'] = 'application/json; charset=utf-8'
+            headers['Vary'] = 'Accept-Encoding'
+
+        if isinstance(body, StreamedJson):
+            await self.write_stream(writer, request, headers, body)
+            return
+
+        headers['Content-Length'] = str(len(body))
+        writer.write(self._head(status, headers) + body)
+        await writer.drain()
+
+    async def write_stream(self, writer, request, headers, stream: StreamedJson):
+        headers['Transfer-Encoding'] = 'chunked'
+        compressor = None
+        if request.accepts_gzip:
+            headers['Content-Encoding'] = 'gzip'
+            compressor = zlib.compressobj(5, zlib.DEFLATED, 31)
+        writer.write(self._head(200, headers))
+
+        async def send(data: bytes):
+            if compressor is not None:
+                data = compressor.compress(data)
+            if data:
+                writer.write(f'{len(data):x}\r\n'.encode('latin-1') + data + b'\r\n')
+                await writer.drain()
+
+        await send(b'[')
+        first = True
+        batches = iter(stream.batches)
+        while True:
+            batch = await self.run_db(next, batches, None)
+            if batch is None:
+                break
+            if batch:
+                await send((b'' if first else b',') + b','.join(_dumps(item) for item in batch))
+                first = False
+        await send(b']')
+        if compressor is not None:
+            tail = compressor.flush()
+            if tail:
+                writer.write(f'{len(tail):x}\r\n'.encode('latin-1') + tail + b'\r\n')
+        writer.write(b'0\r\n\r\n')
+        await writer.drain()
+
+    async def serve(self):
+        self._server = await asyncio.start_server(self.handle_connection, self.host, self.port,
+                                                  reuse_address=True)
+        self.port = self._server.sockets[0].getsockname()[1]
+        print(f"🌐 API server listening on http://{self.host}:{self.port}")
+        async with self._server:
+            await self._server.serve_forever()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Expiry tracker JSON API')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8080)
+    parser.add_argument('--db', default='data/expiry_tracker.db')
+    parser.add_argument('--workers', type=int, default=8)
+    args = parser.parse_args(argv)
+
+    server = ApiServer(host=args.host, port=args.port, workers=args.workers, db_path=args.db)
+    try:
+        asyncio.run(server.serve())
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
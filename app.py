@@ -1,6 +1,6 @@
 # app.py - صفحة الدخول الرئيسية
 import streamlit as st
-from auth_system import AuthSystem
+from streamlit_data import get_auth_system, get_user_permissions, clear_user_permissions
 
 # إعدادات أساسية للصفحة
 st.set_page_config(
@@ -9,8 +9,8 @@ st.set_page_config(
     layout="centered"
 )
 
-# استدعاء نظام الصلاحيات
-auth = AuthSystem()
+# استدعاء نظام الصلاحيات (نسخة واحدة لكل العملية بدلاً من كل إعادة تشغيل)
+auth = get_auth_system()
 
 # التحقق مما إذا كان المستخدم مسجلاً للدخول بالفعل
 if 'authenticated' not in st.session_state:
@@ -31,7 +31,7 @@ if not st.session_state['authenticated']:
             if user:
                 st.session_state['user_info'] = user
                 st.session_state['authenticated'] = True
-                st.session_state['user_permissions'] = auth.get_user_permissions(user['id'])
+                st.session_state['user_permissions'] = get_user_permissions(user['id'])
                 st.rerun()  # إعادة تحميل الصفحة لإظهار المحتوى بعد الدخول
             else:
                 st.error("اسم المستخدم أو كلمة المرور غير صحيحة.")
@@ -49,4 +49,5 @@ if st.button("تسجيل الخروج"):
     st.session_state['authenticated'] = False
     st.session_state['user_info'] = None
     st.session_state['user_permissions'] = []
+    clear_user_permissions()
     st.rerun()
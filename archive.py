@@ -0,0 +1,142 @@
+# archive.py - أرشفة العناصر غير النشطة القديمة خارج الجدول الرئيسي
+import threading
+import time
+from typing import List
+
+from periodic import PeriodicWorker
+
+ARCHIVE_TABLE = 'expiry_items_archive'
+HISTORY_VIEW = 'expiry_items_history'
+
+
+def _columns(cursor, table: str) -> List[str]:
+    cursor.execute(f"PRAGMA table_info({table})")
+    return [row[1] for row in cursor.fetchall()]
+
+
+def ensure_archive_schema(cursor):
+    """Create or migrate the archive table and the hot + archive union view"""
+    cursor.execute(f'''
+        CREATE TABLE IF NOT EXISTS {ARCHIVE_TABLE} AS
+        SELECT * FROM expiry_items WHERE 0
+    ''')
+
+    # Columns added to expiry_items later are mirrored on the archive
+    hot_columns = _columns(cursor, 'expiry_items')
+    archive_columns = _columns(cursor, ARCHIVE_TABLE)
+    for column in hot_columns:
+        if column not in archive_columns:
+            cursor.execute(f"ALTER TABLE {ARCHIVE_TABLE} ADD COLUMN {column}")
+    if 'archived_at' not in archive_columns:
+        cursor.execute(f"ALTER TABLE {ARCHIVE_TABLE} ADD COLUMN archived_at TIMESTAMP")
+
+    cursor.execute(f"CREATE UNIQUE INDEX IF NOT EXISTS idx_archive_id ON {ARCHIVE_TABLE} (id)")
+    cursor.execute(f"CREATE INDEX IF NOT EXISTS idx_archive_expiry ON {ARCHIVE_TABLE} (expiry_date)")
+
+    column_list = ', '.join(hot_columns)
+    cursor.execute(f"DROP VIEW IF EXISTS {HISTORY_VIEW}")
+    cursor.execute(f'''
+        CREATE VIEW {HISTORY_VIEW} AS
+        SELECT {column_list}, NULL AS archived_at FROM expiry_items
+        UNION ALL
+        SELECT {column_list}, archived_at FROM {ARCHIVE_TABLE}
+    ''')
+
+
+class ItemArchiver:
+    """Moves inactive items past a retention window from the hot table to the archive.
+
+    Rows are moved in small transactions so scrapers and the UI only wait for
+    one batch at a time. Archived rows leave the search and metadata indexes
+    but stay available through the expiry_items_history view.
+    """
+
+    def __init__(self, tracker, retention_days: int = 365, batch_size: int = 1000,
+                 pause_seconds: float = 0.05):
+        self.tracker = tracker
+        self.retention_days = retention_days
+        self.batch_size = batch_size
+        self.pause_seconds = pause_seconds
+        self._worker = PeriodicWorker(lambda: self.run(stopping=self._worker.stopping),
+                                      'item-archiver', 'Archiving')
+
+    def archive_batch(self) -> int:
+        """Archive one batch; returns the number of rows moved"""
+        conn = self.tracker.get_connection()
+        cursor = conn.cursor()
+        try:
+            cursor.execute("BEGIN IMMEDIATE")
+            cursor.execute('''
+                SELECT id FROM expiry_items
+                WHERE status != 'active'
+                AND updated_at < datetime('now', '-' || ? || ' days')
+                ORDER BY id
+                LIMIT ?
+            ''', (self.retention_days, self.batch_size))
+            ids = [row[0] for row in cursor.fetchall()]
+
+            if ids:
+                columns = ', '.join(_columns(cursor, 'expiry_items'))
+                placeholders = ', '.join('?' * len(ids))
+                cursor.execute(f'''
+                    INSERT OR REPLACE INTO {ARCHIVE_TABLE} ({columns}, archived_at)
+                    SELECT {columns}, CURRENT_TIMESTAMP FROM expiry_items
+                    WHERE id IN ({placeholders})
+                ''', ids)
+                cursor.execute(f"DELETE FROM expiry_items WHERE id IN ({placeholders})", ids)
+
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            conn.close()
+
+        if ids:
+            self.tracker.invalidate_cache()
+        return len(ids)
+
+    def run(self, max_batches: int = None, stopping: threading.Event = None) -> int:
+        """Archive until nothing is left (or max_batches, or stopping is set); returns rows moved"""
+        total = 0
+        batches = 0
+        while stopping is None or not stopping.is_set():
+            moved = self.archive_batch()
+            total += moved
+            batches += 1
+            if moved < self.batch_size or (max_batches and batches >= max_batches):
+                break
+            time.sleep(self.pause_seconds)
+        return total
+
+    def restore_item(self, item_id: int) -> bool:
+        """Move an archived item back to the hot table"""
+        conn = self.tracker.get_connection()
+        cursor = conn.cursor()
+        try:
+            cursor.execute("BEGIN IMMEDIATE")
+            columns = ', '.join(_columns(cursor, 'expiry_items'))
+            cursor.execute(f'''
+                INSERT INTO expiry_items ({columns})
+                SELECT {columns} FROM {ARCHIVE_TABLE} WHERE id = ?
+            ''', (item_id,))
+            restored = cursor.rowcount > 0
+            cursor.execute(f"DELETE FROM {ARCHIVE_TABLE} WHERE id = ?", (item_id,))
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            conn.close()
+
+        if restored:
+            self.tracker.invalidate_cache()
+        return restored
+
+    def start(self, interval_seconds: float = 3600):
+        """Run the archiver periodically in a daemon thread"""
+        self._worker.start(interval_seconds)
+        return self
+
+    def stop(self):
+        self._worker.stop()
@@ -0,0 +1,175 @@
+# background_writer.py - كاتب خلفي يدمج التحديثات ويثبتها في معاملات جماعية
+"""Single writer thread for item updates.
+
+Every update_item / update_item_status used to open a connection and commit
+on its own, one fsync per click; concurrent sessions then fight for the
+write lock and see "database is locked". BackgroundWriter queues updates,
+merges the ones for the same item that arrive before the next flush, and
+applies everything pending in one transaction every flush_interval seconds.
+Each caller gets a Future resolved once its update is committed (True if the
+item exists). If the writer thread dies, every queued update fails with the
+error that stopped it and further updates are refused.
+
+    writer = BackgroundWriter(tracker).start()
+    tracker.writer = writer            # update_item* now go through the writer
+    writer.update_status(42, 'renewed').result()
+
+durability sets PRAGMA synchronous on the writer's connection: 'full' syncs
+every group commit, 'normal' (default) follows SQLite's NORMAL, 'off' leaves
+syncing to the OS and can lose the last commits on power failure.
+"""
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+from typing import Any, Dict
+
+import metrics
+from database import connect
+
+FLUSH_SECONDS = metrics.registry.histogram(
+    'expiry_writer_flush_seconds', 'Time spent committing one group of queued updates')
+QUEUED_UPDATES = metrics.registry.counter(
+    'expiry_writer_updates_total', 'Updates submitted to the background writer')
+COALESCED_UPDATES = metrics.registry.counter(
+    'expiry_writer_coalesced_total', 'Queued updates merged into an earlier update of the same item')
+
+DURABILITY = {'full': 'FULL', 'normal': 'NORMAL', 'off': 'OFF'}
+
+# Columns update_item may change
+UPDATABLE_COLUMNS = ('title', 'category', 'expiry_date', 'source', 'description', 'priority', 'status')
+
+
+class BackgroundWriter:
+    """Queue of item updates committed in groups by one thread"""
+
+    def __init__(self, tracker, flush_interval: float = 0.005, durability: str = 'normal',
+                 busy_timeout: float = 30.0):
+        if durability not in DURABILITY:
+            raise ValueError(f"Unknown durability: {durability}")
+        self.tracker = tracker
+        self.flush_interval = flush_interval
+        self.durability = durability
+        self.busy_timeout = busy_timeout
+        # item id -> list of [op, futures]; op is a dict of column values or 'renew'
+        self._pending: 'OrderedDict[int, list]' = OrderedDict()
+        self._cond = threading.Condition()
+        self._closing = False
+        # Set when the writer thread has exited, normally or on an error
+        self._stopped = False
+        self._thread = None
+
+    def update_item(self, item_id: int, fields: Dict[str, Any]) -> Future:
+        """Queue new values for some of an item's columns"""
+        unknown = set(fields) - set(UPDATABLE_COLUMNS)
+        if unknown:
+            raise ValueError(f"Cannot update columns: {', '.join(sorted(unknown))}")
+        return self._submit(item_id, dict(fields))
+
+    def update_status(self, item_id: int, status: str) -> Future:
+        """Queue a status change; 'renewed' rolls recurring items forward like update_item_status"""
+        return self._submit(item_id, 'renew' if status == 'renewed' else {'status': status})
+
+    def _submit(self, item_id: int, op) -> Future:
+        future = Future()
+        with self._cond:
+            if self._closing or self._stopped or self._thread is None or not self._thread.is_alive():
+                raise RuntimeError("Background writer is not running")
+            ops = self._pending.setdefault(item_id, [])
+            # Plain column updates merge into the one before; a renewal must run once per request
+            if op != 'renew' and ops and ops[-1][0] != 'renew':
+                ops[-1][0].update(op)
+                ops[-1][1].append(future)
+                COALESCED_UPDATES.inc()
+            else:
+                ops.append([op, [future]])
+            self._cond.notify()
+        QUEUED_UPDATES.inc()
+        return future
+
+    def _apply(self, cursor, item_id: int, op) -> bool:
+        if op == 'renew':
+            if self.tracker._roll_forward(cursor, item_id):
+                return True
+            op = {'status': 'renewed'}
+        assignments = ', '.join(f"{column} = ?" for column in op)
+        cursor.execute(f'''
+            UPDATE expiry_items SET {assignments}, updated_at = CURRENT_TIMESTAMP
+            WHERE id = ?
+        ''', (*op.values(), item_id))
+        return cursor.rowcount > 0
+
+    def _flush(self, conn, batch):
+        results = []
+        try:
+            with FLUSH_SECONDS.time():
+                cursor = conn.cursor()
+                cursor.execute("BEGIN IMMEDIATE")
+                for item_id, ops in batch.items():
+                    for op, futures in ops:
+                        results.append((futures, self._apply(cursor, item_id, op)))
+                conn.commit()
+        except Exception as e:
+            if conn.in_transaction:
+                conn.rollback()
+            self._fail(batch, e)
+            return
+        self.tracker.invalidate_cache()
+        for futures, updated in results:
+            for future in futures:
+                future.set_result(updated)
+
+    @staticmethod
+    def _fail(batch, error: Exception):
+        for ops in batch.values():
+            for _, futures in ops:
+                for future in futures:
+                    if not future.done():
+                        future.set_exception(error)
+
+    def _run(self):
+        batch = OrderedDict()
+        try:
+            conn = connect(self.tracker.db_path, timeout=self.busy_timeout, isolation_level=None)
+            try:
+                conn.execute(f"PRAGMA synchronous = {DURABILITY[self.durability]}")
+                while True:
+                    with self._cond:
+                        while not self._pending and not self._closing:
+                            self._cond.wait()
+                        if not self._pending:
+                            return
+                    # Let updates from other callers join this group
+                    if self.flush_interval and not self._closing:
+                        time.sleep(self.flush_interval)
+                    with self._cond:
+                        batch, self._pending = self._pending, OrderedDict()
+                    self._flush(conn, batch)
+            finally:
+                conn.close()
+        except Exception as e:
+            print(f"Background writer stopped: {e}")
+            with self._cond:
+                self._stopped = True
+                pending, self._pending = self._pending, OrderedDict()
+            self._fail(batch, e)
+            self._fail(pending, e)
+        finally:
+            with self._cond:
+                self._stopped = True
+
+    def start(self):
+        self._closing = False
+        self._stopped = False
+        self._thread = threading.Thread(target=self._run, name='db-writer', daemon=True)
+        self._thread.start()
+        return self
+
+    def close(self):
+        """Commit everything still queued, then stop the thread"""
+        with self._cond:
+            self._closing = True
+            self._cond.notify()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
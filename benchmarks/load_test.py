@@ -0,0 +1,168 @@
+# load_test.py - اختبار الحمل لواجهة REST وقياس زمن الاستجابة
+"""Load test for api_server.py.
+
+Opens N keep-alive connections, sends GET requests round-robin over the given
+paths for a fixed duration and reports p50/p90/p99 latency and requests per
+second. With --spawn, a server is started on a synthetic database first.
+
+Usage:
+    python benchmarks/load_test.py --url http://127.0.0.1:8080 --concurrency 32 --duration 10
+    python benchmarks/load_test.py --spawn --size 100k --concurrency 32
+"""
+import argparse
+import asyncio
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import time
+from collections import Counter
+from urllib.parse import urlsplit
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT_DIR = os.path.dirname(BENCH_DIR)
+
+DEFAULT_PATHS = '/stats,/upcoming?days=30,/items?limit=50,/overdue,/search?q=تأمين'
+
+
+async def read_response(reader: asyncio.StreamReader) -> tuple:
+    """Read one HTTP/1.1 response and return its status code and headers"""
+    status_line = await reader.readline()
+    if not status_line:
+        raise ConnectionError("Server closed the connection")
+    status = int(status_line.split()[1])
+    headers = {}
+    while True:
+        line = await reader.readline()
+        if line in (b'\r\n', b''):
+            break
+        name, _, value = line.decode('latin-1').partition(':')
+        headers[name.strip().lower()] = value.strip()
+
+    if headers.get('transfer-encoding') == 'chunked':
+        while True:
+            size = int((await reader.readline()).strip(), 16)
+            await reader.readexactly(size + 2)
+            if size == 0:
+                break
+    else:
+        await reader.readexactly(int(headers.get('content-length') or 0))
+    return status, headers
+
+
+async def worker(host, port, paths, deadline, latencies, statuses, use_etag, offset):
+    reader, writer = await asyncio.open_connection(host, port)
+    etags = {}
+    index = offset
+    try:
+        while time.perf_counter() < deadline:
+            path = paths[index % len(paths)]
+            index += 1
+            extra = f'If-None-Match: {etags[path]}\r\n' if use_etag and path in etags else ''
+            request = (f'GET {path} HTTP/1.1\r\nHost: {host}\r\nAccept-Encoding: gzip\r\n'
+                       f'{extra}\r\n')
+            start = time.perf_counter()
+            writer.write(request.encode('utf-8'))
+            await writer.drain()
+            status, headers = await read_response(reader)
+            if 'etag' in headers:
+                etags[path] = headers['etag']
+            latencies.append(time.perf_counter() - start)
+            statuses[status] += 1
+    finally:
+        writer.close()
+
+
+async def run_load(url, paths, concurrency, duration, use_etag):
+    parts = urlsplit(url)
+    latencies, statuses = [], Counter()
+    deadline = time.perf_counter() + duration
+    started = time.perf_counter()
+    await asyncio.gather(*(
+        worker(parts.hostname, parts.port or 80, paths, deadline, latencies, statuses, use_etag, i)
+        for i in range(concurrency)
+    ))
+    elapsed = time.perf_counter() - started
+    return latencies, statuses, elapsed
+
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+def spawn_server(size: str):
+    sys.path.insert(0, ROOT_DIR)
+    sys.path.insert(0, BENCH_DIR)
+    from synthetic_data import parse_size
+    from run_benchmarks import prepare_database
+
+    db_path = prepare_database(parse_size(size), 42)
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        port = s.getsockname()[1]
+    process = subprocess.Popen(
+        [sys.executable, os.path.join(ROOT_DIR, 'api_server.py'), '--port', str(port), '--db', db_path],
+        cwd=ROOT_DIR, stdout=subprocess.DEVNULL)
+    for _ in range(100):
+        try:
+            socket.create_connection(('127.0.0.1', port), timeout=0.2).close()
+            break
+        except OSError:
+            time.sleep(0.2)
+    return process, f'http://127.0.0.1:{port}'
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='API load test')
+    parser.add_argument('--url', default='http://127.0.0.1:8080')
+    parser.add_argument('--paths', default=DEFAULT_PATHS, help='comma separated request paths')
+    parser.add_argument('--concurrency', type=int, default=16)
+    parser.add_argument('--duration', type=float, default=10.0)
+    parser.add_argument('--etag', action='store_true', help='send If-None-Match (conditional GET)')
+    parser.add_argument('--spawn', action='store_true', help='start api_server.py on a synthetic database')
+    parser.add_argument('--size', default='10k', help='synthetic database size with --spawn')
+    parser.add_argument('--output', default='', help='write the report as JSON')
+    args = parser.parse_args(argv)
+
+    process = None
+    url = args.url
+    if args.spawn:
+        process, url = spawn_server(args.size)
+
+    try:
+        paths = [path for path in args.paths.split(',') if path]
+        latencies, statuses, elapsed = asyncio.run(
+            run_load(url, paths, args.concurrency, args.duration, args.etag))
+    finally:
+        if process is not None:
+            process.terminate()
+            process.wait()
+
+    if not latencies:
+        print("⚠️ لم يتم تنفيذ أي طلب")
+        return 1
+
+    report = {
+        'url': url,
+        'concurrency': args.concurrency,
+        'requests': len(latencies),
+        'duration_s': round(elapsed, 3),
+        'rps': round(len(latencies) / elapsed, 1),
+        'p50_ms': round(percentile(latencies, 0.50) * 1000, 2),
+        'p90_ms': round(percentile(latencies, 0.90) * 1000, 2),
+        'p99_ms': round(percentile(latencies, 0.99) * 1000, 2),
+        'mean_ms': round(statistics.fmean(latencies) * 1000, 2),
+        'statuses': dict(statuses),
+    }
+    print(json.dumps(report, indent=2))
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
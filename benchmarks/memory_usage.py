@@ -0,0 +1,112 @@
+# memory_usage.py - قياس استهلاك الذاكرة لتمثيلات العناصر المختلفة
+"""Memory footprint of the in-process item representations.
+
+Loads the active items of a synthetic database in each representation the
+code has used (dict(sqlite3.Row), DataFrame.to_dict('records'), the DataFrame
+itself) and as ExpiryItem records, and reports the memory retained by each
+(tracemalloc) in total and per item.
+
+Usage:
+    python benchmarks/memory_usage.py --size 100k
+"""
+import argparse
+import gc
+import json
+import os
+import shutil
+import sqlite3
+import sys
+import tempfile
+import tracemalloc
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+sys.path.insert(0, BENCH_DIR)
+
+import pandas as pd
+
+from database import connect
+from models import ExpiryTracker
+from run_benchmarks import prepare_database
+from synthetic_data import parse_size
+
+ACTIVE_ITEMS = "SELECT * FROM expiry_items WHERE status = 'active' ORDER BY expiry_date"
+
+
+def load_row_dicts(tracker):
+    conn = connect(tracker.db_path)
+    conn.row_factory = sqlite3.Row
+    rows = [dict(row) for row in conn.execute(ACTIVE_ITEMS)]
+    conn.close()
+    return rows
+
+
+def load_dataframe(tracker):
+    conn = connect(tracker.db_path)
+    df = pd.read_sql_query(ACTIVE_ITEMS, conn)
+    conn.close()
+    return df
+
+
+def load_dataframe_records(tracker):
+    return load_dataframe(tracker).to_dict('records')
+
+
+def load_expiry_items(tracker):
+    return tracker.get_item_records('active')
+
+
+REPRESENTATIONS = {
+    'sqlite_row_dicts': load_row_dicts,
+    'dataframe': load_dataframe,
+    'dataframe_records': load_dataframe_records,
+    'expiry_items': load_expiry_items,
+}
+
+
+def measure(loader, tracker) -> tuple:
+    """Return (bytes retained by the loaded value, number of items)"""
+    gc.collect()
+    tracemalloc.start()
+    baseline = tracemalloc.get_traced_memory()[0]
+    value = loader(tracker)
+    gc.collect()
+    retained = tracemalloc.get_traced_memory()[0] - baseline
+    tracemalloc.stop()
+    if isinstance(value, pd.DataFrame):
+        # Arrow-backed string columns are allocated outside tracemalloc's view
+        retained = max(retained, int(value.memory_usage(deep=True).sum()))
+    return retained, len(value)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Item representation memory usage')
+    parser.add_argument('--size', default='100k')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--output', default='', help='write the report as JSON')
+    args = parser.parse_args(argv)
+
+    source_db = prepare_database(parse_size(args.size), args.seed)
+    report = {'size': args.size, 'representations': {}}
+    with tempfile.TemporaryDirectory() as workdir:
+        db_path = os.path.join(workdir, 'bench.db')
+        shutil.copyfile(source_db, db_path)
+        tracker = ExpiryTracker(db_path)
+        for name, loader in REPRESENTATIONS.items():
+            retained, count = measure(loader, tracker)
+            report['representations'][name] = {
+                'items': count,
+                'total_mb': round(retained / 1024 / 1024, 2),
+                'bytes_per_item': round(retained / count) if count else 0,
+            }
+            print(f"  {name:<20} {count:>10,} items {retained / 1024 / 1024:10.2f} MB "
+                  f"{report['representations'][name]['bytes_per_item']:8,} B/item")
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
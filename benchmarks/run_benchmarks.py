@@ -0,0 +1,290 @@
+# run_benchmarks.py - تشغيل مجموعة قياس الأداء وحفظ النتائج
+"""Benchmark suite for the tracker, dashboard, predictor and notifications.
+
+Each size gets its own synthetic database (cached under benchmarks/.data),
+every benchmark is repeated and the min/median/mean wall times are written to
+a JSON results file so runs can be compared.
+
+Usage:
+    python benchmarks/run_benchmarks.py --sizes 10k,100k
+    python benchmarks/run_benchmarks.py --sizes 10k --compare benchmarks/results/baseline.json
+"""
+import argparse
+import json
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+from typing import Callable, Dict, List
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+sys.path.insert(0, BENCH_DIR)
+
+from synthetic_data import generate_items, parse_size, populate_database
+from models import ExpiryTracker
+from simple_dashboard import SimpleDashboard
+from ai_predictor import ExpiryPredictor
+from background_writer import BackgroundWriter
+from message_templates import CHANNELS, AlertRenderer
+from notifications import NotificationManager, NotificationTemplates
+from reports import REPORTS, ReportEngine, ReportJob
+
+DATA_DIR = os.path.join(BENCH_DIR, '.data')
+RESULTS_DIR = os.path.join(BENCH_DIR, 'results')
+
+# Registered benchmarks: name -> setup(context) returning the timed callable
+BENCHMARKS: Dict[str, Callable] = {}
+
+
+def benchmark(name: str):
+    """Register a benchmark; the decorated function receives the context and returns the timed callable"""
+    def decorator(func):
+        BENCHMARKS[name] = func
+        return func
+    return decorator
+
+
+@benchmark('add_item')
+def bench_add_item(ctx):
+    items = list(generate_items(200, seed=ctx['seed'] + 1))
+    tracker = ctx['tracker']
+
+    def run():
+        for item in items:
+            tracker.add_item(item)
+    run.operations = len(items)
+    return run
+
+
+@benchmark('writer_update_status')
+def bench_writer_update_status(ctx):
+    tracker = ctx['tracker']
+    conn = tracker.get_connection()
+    ids = [row[0] for row in conn.execute("SELECT id FROM expiry_items WHERE status = 'active' LIMIT 2000")]
+    conn.close()
+
+    def run():
+        # Statuses are rewritten with their current value, so later benchmarks see the same data
+        writer = BackgroundWriter(tracker).start()
+        futures = [writer.update_status(item_id, 'active') for item_id in ids]
+        for future in futures:
+            future.result()
+        writer.close()
+    run.operations = max(len(ids), 1)
+    return run
+
+
+@benchmark('get_all_items')
+def bench_get_all_items(ctx):
+    return ctx['tracker'].get_all_items
+
+
+@benchmark('get_upcoming_expirations')
+def bench_get_upcoming_expirations(ctx):
+    return lambda: ctx['tracker'].get_upcoming_expirations(30)
+
+
+@benchmark('get_overdue_items')
+def bench_get_overdue_items(ctx):
+    return ctx['tracker'].get_overdue_items
+
+
+@benchmark('get_items_by_category')
+def bench_get_items_by_category(ctx):
+    return lambda: ctx['tracker'].get_items_by_category('وثائق التأمين')
+
+
+@benchmark('get_statistics')
+def bench_get_statistics(ctx):
+    return ctx['tracker'].get_statistics
+
+
+@benchmark('dashboard_generate_html')
+def bench_dashboard(ctx):
+    return SimpleDashboard(ctx['db_path']).generate_html_dashboard
+
+
+@benchmark('predictor_train_model')
+def bench_train_model(ctx):
+    return ctx['predictor'].train_model
+
+
+@benchmark('predictor_tune_model')
+def bench_tune_model(ctx):
+    return lambda: ctx['predictor'].tune_model(n_iter=6, baseline=False)
+
+
+@benchmark('predictor_predict_urgency')
+def bench_predict_urgency(ctx):
+    predictor = ctx['predictor']
+    if predictor.model is None:
+        predictor.train_model()
+    items = [dict(item, created_at='2025-01-01') for item in generate_items(100, seed=ctx['seed'] + 2)]
+
+    def run():
+        for item in items:
+            predictor.predict_urgency(item)
+    run.operations = len(items)
+    return run
+
+
+@benchmark('notification_render')
+def bench_notification_render(ctx):
+    manager = NotificationManager()
+    items = ctx['tracker'].get_upcoming_records(30)
+
+    def run():
+        for item in items:
+            manager.create_expiry_alert(item, item.days_remaining)
+        NotificationTemplates.weekly_summary(items)
+        NotificationTemplates.monthly_report(items)
+    run.operations = max(len(items), 1)
+    return run
+
+
+@benchmark('notification_render_bulk')
+def bench_notification_render_bulk(ctx):
+    """Batch rendering for every channel; per_op_s is the time per rendered message"""
+    items = ctx['tracker'].get_upcoming_records(30)
+    days_left = [item.days_remaining for item in items]
+    renderers = [AlertRenderer(channel) for channel in CHANNELS]
+
+    def run():
+        for renderer in renderers:
+            renderer.render_batch(items, days_left)
+    run.operations = max(len(items) * len(renderers), 1)
+    return run
+
+
+@benchmark('report_engine_all')
+def bench_report_engine(ctx):
+    engine = ReportEngine(workers=1)
+    job = ReportJob('all', {name: {} for name in REPORTS})
+    return lambda: engine.run(engine.scan(ctx['tracker']), [job])
+
+
+def time_callable(func: Callable, repeat: int) -> Dict[str, float]:
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    operations = getattr(func, 'operations', 1)
+    return {
+        'min_s': min(timings),
+        'median_s': statistics.median(timings),
+        'mean_s': statistics.fmean(timings),
+        'repeat': repeat,
+        'operations': operations,
+        'per_op_s': min(timings) / operations,
+    }
+
+
+def prepare_database(size: int, seed: int) -> str:
+    """Return a cached synthetic database path; the copy used for a run is disposable"""
+    os.makedirs(DATA_DIR, exist_ok=True)
+    db_path = os.path.join(DATA_DIR, f'items_{size}_{seed}.db')
+    if not os.path.exists(db_path):
+        print(f"⏳ توليد {size:,} عنصر...")
+        populate_database(db_path, size, seed)
+    return db_path
+
+
+def run_suite(sizes: List[int], names: List[str], repeat: int, seed: int) -> Dict:
+    results = {
+        'generated_at': datetime.now().isoformat(timespec='seconds'),
+        'commit': _git_commit(),
+        'python': platform.python_version(),
+        'machine': platform.platform(),
+        'seed': seed,
+        'results': {},
+    }
+
+    for size in sizes:
+        source_db = prepare_database(size, seed)
+        with tempfile.TemporaryDirectory() as workdir:
+            db_path = os.path.join(workdir, 'bench.db')
+            shutil.copyfile(source_db, db_path)
+
+            tracker = ExpiryTracker(db_path)
+            predictor = ExpiryPredictor(tracker)
+            predictor.model_path = os.path.join(workdir, 'model.pkl')
+            ctx = {'db_path': db_path, 'tracker': tracker, 'predictor': predictor, 'seed': seed}
+
+            size_results = results['results'][str(size)] = {}
+            # add_item mutates the database, so it always runs last
+            for name in sorted(names, key=lambda n: n == 'add_item'):
+                func = BENCHMARKS[name](ctx)
+                size_results[name] = time_callable(func, repeat)
+                print(f"  {size:>10,}  {name:<28} {size_results[name]['min_s'] * 1000:10.2f} ms")
+
+    return results
+
+
+def compare(current: Dict, baseline: Dict, threshold: float = 0.10) -> bool:
+    """Print per-benchmark ratios against a baseline; return True if nothing regressed"""
+    ok = True
+    for size, benchmarks in current['results'].items():
+        for name, result in benchmarks.items():
+            base = baseline.get('results', {}).get(size, {}).get(name)
+            if not base:
+                continue
+            ratio = result['min_s'] / base['min_s'] if base['min_s'] else float('inf')
+            flag = ''
+            if ratio > 1 + threshold:
+                flag = '  ⚠️ REGRESSION'
+                ok = False
+            print(f"  {int(size):>10,}  {name:<28} x{ratio:6.2f}{flag}")
+    return ok
+
+
+def _git_commit() -> str:
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'],
+                                       cwd=BENCH_DIR, text=True).strip()
+    except Exception:
+        return 'unknown'
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Expiry tracker benchmark suite')
+    parser.add_argument('--sizes', default='10k', help='comma separated: 10k,100k,1M,10M')
+    parser.add_argument('--bench', default='', help='comma separated benchmark names (default: all)')
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--output', default='', help='results JSON path')
+    parser.add_argument('--compare', default='', help='baseline results JSON to compare against')
+    parser.add_argument('--threshold', type=float, default=0.10, help='allowed slowdown ratio')
+    args = parser.parse_args(argv)
+
+    sizes = [parse_size(s) for s in args.sizes.split(',') if s]
+    names = [n for n in args.bench.split(',') if n] or list(BENCHMARKS)
+    unknown = set(names) - set(BENCHMARKS)
+    if unknown:
+        parser.error(f"unknown benchmarks: {', '.join(sorted(unknown))}")
+
+    results = run_suite(sizes, names, args.repeat, args.seed)
+
+    os.makedirs(RESULTS_DIR, exist_ok=True)
+    output = args.output or os.path.join(
+        RESULTS_DIR, f"{datetime.now().strftime('%Y%m%d-%H%M%S')}-{results['commit']}.json")
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump(results, f, ensure_ascii=False, indent=2)
+    print(f"✅ تم حفظ النتائج: {output}")
+
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as f:
+            baseline = json.load(f)
+        if not compare(results, baseline, args.threshold):
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,141 @@
+# synthetic_data.py - مولد بيانات اصطناعية قابلة للتكرار لقياس الأداء
+"""Deterministic synthetic data for expiry_items.
+
+The same (count, seed, base_date) always produces the same rows. Categories,
+sources and priorities follow a skewed distribution close to production data,
+and expiry dates are clustered around "now" with a long tail of far-future and
+overdue items.
+
+Usage:
+    python benchmarks/synthetic_data.py data/bench_100k.db 100k
+"""
+import json
+import os
+import random
+import sys
+from datetime import date, timedelta
+from typing import Any, Dict, Iterator, Tuple
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database import connect
+from models import ExpiryTracker
+
+SIZES = {'10k': 10_000, '100k': 100_000, '1M': 1_000_000, '10M': 10_000_000}
+
+# category -> (weight, sources, metadata key, title prefix)
+CATEGORIES = {
+    'تأشيرات الموظفين': (40, ['الجوازات', 'مكتب العمل'], 'employee_id', 'تأشيرة'),
+    'تسجيل المركبات': (25, ['إدارة المرور'], 'plate_number', 'استمارة مركبة'),
+    'وثائق التأمين': (15, ['شركة التأمين', 'وسيط التأمين'], 'policy_number', 'تأمين'),
+    'العقود': (10, ['المكتب العقاري', 'الشؤون القانونية'], 'contract_number', 'عقد'),
+    'رخص القيادة': (6, ['إدارة المرور'], 'license_number', 'رخصة القيادة'),
+    'الوثائق الضريبية': (3, ['مصلحة الضرائب'], 'tax_number', 'شهادة ضريبية'),
+    'السجلات التجارية': (1, ['وزارة التجارة'], 'cr_number', 'سجل تجاري'),
+}
+
+PRIORITIES = (('high', 25), ('medium', 55), ('low', 20))
+STATUSES = (('active', 80), ('renewed', 12), ('closed', 5), ('deleted', 3))
+
+FIRST_NAMES = ['أحمد', 'محمد', 'سارة', 'فاطمة', 'خالد', 'نورة', 'عبدالله', 'ريم', 'يوسف', 'ليلى',
+               'John', 'Maria', 'Ravi', 'Ana']
+LAST_NAMES = ['العتيبي', 'القحطاني', 'الشمري', 'الزهراني', 'الحربي', 'الغامدي', 'Smith', 'Kumar']
+
+# (weight, min days, max days) relative to the base date
+DATE_BANDS = ((10, -365, -1), (15, 0, 30), (50, 31, 365), (25, 366, 1825))
+
+
+def _cumulative(weights):
+    total = 0
+    result = []
+    for weight in weights:
+        total += weight
+        result.append(total)
+    return result
+
+
+def generate_items(count: int, seed: int = 42, base_date: date = None) -> Iterator[Dict[str, Any]]:
+    """Yield item dicts accepted by ExpiryTracker.add_item"""
+    rng = random.Random(seed)
+    base_date = base_date or date.today()
+
+    categories = list(CATEGORIES)
+    category_weights = _cumulative(CATEGORIES[c][0] for c in categories)
+    priorities = [p for p, _ in PRIORITIES]
+    priority_weights = _cumulative(w for _, w in PRIORITIES)
+    statuses = [s for s, _ in STATUSES]
+    status_weights = _cumulative(w for _, w in STATUSES)
+    band_weights = _cumulative(b[0] for b in DATE_BANDS)
+
+    for index in range(count):
+        category = rng.choices(categories, cum_weights=category_weights)[0]
+        _, sources, metadata_key, prefix = CATEGORIES[category]
+        band = rng.choices(DATE_BANDS, cum_weights=band_weights)[0]
+        expiry_date = base_date + timedelta(days=rng.randint(band[1], band[2]))
+        name = f'{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}'
+        reference = f'{metadata_key[:3].upper()}-{seed}-{index:08d}'
+
+        yield {
+            'title': f'{prefix} - {name}',
+            'category': category,
+            'expiry_date': expiry_date.isoformat(),
+            'source': rng.choice(sources),
+            'source_url': '',
+            'description': f'{prefix} {reference}',
+            'priority': rng.choices(priorities, cum_weights=priority_weights)[0],
+            'status': rng.choices(statuses, cum_weights=status_weights)[0],
+            'metadata': {metadata_key: reference, 'holder': name},
+            'days_before_alert': rng.choice((7, 14, 30, 30, 30, 60)),
+        }
+
+
+def _as_row(item: Dict[str, Any]) -> Tuple:
+    return (
+        item['title'], item['category'], item['expiry_date'], item['source'],
+        item['source_url'], item['description'], item['priority'], item['status'],
+        json.dumps(item['metadata'], ensure_ascii=False), item['days_before_alert'],
+    )
+
+
+def populate_database(db_path: str, count: int, seed: int = 42, base_date: date = None,
+                      batch_size: int = 50_000) -> str:
+    """Create db_path with the tracker schema and bulk-insert count synthetic items"""
+    ExpiryTracker(db_path)
+    conn = connect(db_path)
+    cursor = conn.cursor()
+    batch = []
+    for item in generate_items(count, seed, base_date):
+        batch.append(_as_row(item))
+        if len(batch) >= batch_size:
+            _insert_batch(cursor, batch)
+            conn.commit()
+            batch = []
+    if batch:
+        _insert_batch(cursor, batch)
+    conn.commit()
+    conn.close()
+    return db_path
+
+
+def _insert_batch(cursor, rows):
+    cursor.executemany('''
+        INSERT INTO expiry_items
+        (title, category, expiry_date, source, source_url, description,
+         priority, status, metadata, days_before_alert)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+    ''', rows)
+
+
+def parse_size(size: str) -> int:
+    """Turn '10k' / '1M' / '2500' into a row count"""
+    if size in SIZES:
+        return SIZES[size]
+    return int(size)
+
+
+if __name__ == '__main__':
+    if len(sys.argv) < 3:
+        print(__doc__)
+        sys.exit(1)
+    path = populate_database(sys.argv[1], parse_size(sys.argv[2]))
+    print(f"✅ تم إنشاء قاعدة بيانات اصطناعية: {path}")
@@ -0,0 +1,146 @@
+# change_feed.py - سجل التغييرات على العناصر للمستهلكين اللاحقين
+import sqlite3
+from typing import Any, Callable, Dict, List
+
+# Columns whose changes are recorded; bookkeeping columns such as updated_at are not
+TRACKED_COLUMNS = (
+    'title', 'category', 'expiry_date', 'source', 'source_url', 'description',
+    'status', 'priority', 'metadata', 'days_before_alert',
+    'recurrence_rule', 'recurrence_anchor', 'recurrence_until',
+)
+
+
+def create_change_log(cursor: sqlite3.Cursor):
+    """Create the append-only change log, consumer checkpoints and capture triggers"""
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS change_log (
+            seq INTEGER PRIMARY KEY AUTOINCREMENT,
+            op TEXT NOT NULL,
+            item_id INTEGER NOT NULL,
+            changed_columns TEXT,
+            changed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS change_checkpoints (
+            consumer TEXT PRIMARY KEY,
+            seq INTEGER NOT NULL DEFAULT 0,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+
+    changed = ' || '.join(
+        f"CASE WHEN OLD.{column} IS NOT NEW.{column} THEN '{column},' ELSE '' END"
+        for column in TRACKED_COLUMNS
+    )
+    any_changed = ' OR '.join(f"OLD.{column} IS NOT NEW.{column}" for column in TRACKED_COLUMNS)
+
+    # Recreated on every start so the tracked column list stays current
+    cursor.execute("DROP TRIGGER IF EXISTS change_log_update")
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS change_log_insert
+        AFTER INSERT ON expiry_items BEGIN
+            INSERT INTO change_log (op, item_id) VALUES ('insert', NEW.id);
+        END
+    ''')
+    cursor.execute(f'''
+        CREATE TRIGGER change_log_update
+        AFTER UPDATE ON expiry_items
+        WHEN {any_changed}
+        BEGIN
+            INSERT INTO change_log (op, item_id, changed_columns)
+            VALUES ('update', NEW.id, rtrim({changed}, ','));
+        END
+    ''')
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS change_log_delete
+        AFTER DELETE ON expiry_items BEGIN
+            INSERT INTO change_log (op, item_id) VALUES ('delete', OLD.id);
+        END
+    ''')
+
+
+class ChangeFeed:
+    """Reads the change log from a named consumer's checkpoint in batches.
+
+    Archiving an item shows up as a 'delete': the row left expiry_items.
+    """
+
+    def __init__(self, tracker, consumer: str):
+        self.tracker = tracker
+        self.consumer = consumer
+
+    def get_checkpoint(self) -> int:
+        conn = self.tracker.get_connection()
+        row = conn.execute("SELECT seq FROM change_checkpoints WHERE consumer = ?",
+                           (self.consumer,)).fetchone()
+        conn.close()
+        return row[0] if row else 0
+
+    def read(self, batch_size: int = 500, after: int = None) -> List[Dict[str, Any]]:
+        """Get the next changes after the checkpoint (or after the given seq)"""
+        after = self.get_checkpoint() if after is None else after
+        conn = self.tracker.get_connection()
+        rows = conn.execute('''
+            SELECT seq, op, item_id, changed_columns, changed_at
+            FROM change_log WHERE seq > ? ORDER BY seq LIMIT ?
+        ''', (after, batch_size)).fetchall()
+        conn.close()
+
+        return [{
+            'seq': seq,
+            'op': op,
+            'item_id': item_id,
+            'changed_columns': changed_columns.split(',') if changed_columns else [],
+            'changed_at': changed_at,
+        } for seq, op, item_id, changed_columns, changed_at in rows]
+
+    def commit(self, seq: int):
+        """Move the checkpoint forward to seq"""
+        conn = self.tracker.get_connection()
+        conn.execute('''
+            INSERT INTO change_checkpoints (consumer, seq) VALUES (?, ?)
+            ON CONFLICT(consumer) DO UPDATE SET
+                seq = MAX(seq, excluded.seq), updated_at = CURRENT_TIMESTAMP
+        ''', (self.consumer, seq))
+        conn.commit()
+        conn.close()
+
+    def consume(self, handler: Callable[[List[Dict[str, Any]]], None], batch_size: int = 500) -> int:
+        """Pass every pending batch to handler, checkpointing after each one"""
+        processed = 0
+        after = self.get_checkpoint()
+        while True:
+            batch = self.read(batch_size, after)
+            if not batch:
+                return processed
+            handler(batch)
+            after = batch[-1]['seq']
+            self.commit(after)
+            processed += len(batch)
+
+    @staticmethod
+    def changed_item_ids(batch: List[Dict[str, Any]]) -> Dict[str, set]:
+        """Collapse a batch into the ids that were upserted and the ids that were removed"""
+        upserted, deleted = set(), set()
+        for change in batch:
+            if change['op'] == 'delete':
+                upserted.discard(change['item_id'])
+                deleted.add(change['item_id'])
+            else:
+                deleted.discard(change['item_id'])
+                upserted.add(change['item_id'])
+        return {'upserted': upserted, 'deleted': deleted}
+
+    def prune(self) -> int:
+        """Delete log entries every registered consumer has already processed"""
+        conn = self.tracker.get_connection()
+        cursor = conn.cursor()
+        cursor.execute('''
+            DELETE FROM change_log
+            WHERE seq <= (SELECT COALESCE(MIN(seq), 0) FROM change_checkpoints)
+        ''')
+        removed = cursor.rowcount
+        conn.commit()
+        conn.close()
+        return removed
@@ -0,0 +1,75 @@
+# clock.py - مصدر موحد للتاريخ والوقت الحاليين قابل للاستبدال في الاختبارات
+"""Single source of "today" and "now" for the whole application.
+
+Modules call clock.today() / clock.now() instead of date.today() or
+julianday('now'), so every consumer agrees on the current day. Tests and
+simulations swap the clock with set_clock() or use_clock():
+
+    with clock.use_clock(clock.FixedClock(date(2025, 1, 31))):
+        tracker.get_statistics()
+"""
+from contextlib import contextmanager
+from datetime import date, datetime, time, timedelta
+
+
+class SystemClock:
+    """Local wall-clock time"""
+
+    def now(self) -> datetime:
+        return datetime.now()
+
+    def today(self) -> date:
+        return date.today()
+
+
+class FixedClock:
+    """Clock frozen at a given moment; advance() moves it forward"""
+
+    def __init__(self, moment=None):
+        self.set(moment or datetime.now())
+
+    def set(self, moment):
+        if not isinstance(moment, datetime):
+            moment = datetime.combine(moment, time())
+        self._now = moment
+
+    def advance(self, **kwargs):
+        """Move the clock by timedelta(**kwargs), e.g. advance(days=1)"""
+        self._now += timedelta(**kwargs)
+
+    def now(self) -> datetime:
+        return self._now
+
+    def today(self) -> date:
+        return self._now.date()
+
+
+_clock = SystemClock()
+
+
+def get_clock():
+    return _clock
+
+
+def set_clock(clock):
+    """Install a clock for the whole process; returns the previous one"""
+    global _clock
+    previous, _clock = _clock, clock
+    return previous
+
+
+@contextmanager
+def use_clock(clock):
+    previous = set_clock(clock)
+    try:
+        yield clock
+    finally:
+        set_clock(previous)
+
+
+def now() -> datetime:
+    return _clock.now()
+
+
+def today() -> date:
+    return _clock.today()
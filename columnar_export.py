@@ -0,0 +1,249 @@
+# columnar_export.py - تصدير العناصر إلى ملفات Parquet / Arrow مقسمة حسب شهر الانتهاء
+"""Columnar export of expiry_items for the BI team.
+
+Rows are streamed out of SQLite in record batches and written to Parquet or
+Arrow IPC files, one directory per expiry month (hive layout, so pyarrow,
+DuckDB and Spark read expiry_month as a column):
+
+    data/export/expiry_month=2026-11/part-00000.parquet
+    data/export/_watermark.json
+
+category, source and priority are dictionary-encoded against one dictionary
+per export, so every batch and file shares it. Arrow IPC files can be opened
+with pyarrow.memory_map and read without copying.
+
+The watermark is the change_log seq (see change_feed.py) the export read up
+to. An incremental export only writes the items changed after it, as new
+part files, and writes none when nothing changed; an item changed since the
+last export therefore appears in more than one part, and readers keep the
+row with the latest updated_at per id (read_export does this). Deleted items
+disappear only with a full export. The export is a change feed consumer, so
+ChangeFeed.prune() keeps the log entries it has not read yet.
+
+pyarrow is optional for the rest of the application and only needed here.
+"""
+import argparse
+import glob
+import json
+import os
+import sys
+import time
+from typing import Any, Dict
+
+import numpy as np
+
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    import pyarrow.dataset as ds
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
+
+import metrics
+from change_feed import ChangeFeed
+
+EXPORT_SECONDS = metrics.registry.histogram(
+    'expiry_export_seconds', 'Time spent exporting items to columnar files')
+
+FORMATS = {'parquet': '.parquet', 'arrow': '.arrow'}
+DICTIONARY_COLUMNS = ('category', 'source', 'priority')
+WATERMARK_FILE = '_watermark.json'
+EXPORT_CONSUMER = 'columnar_export'
+
+# (column, Arrow type); dictionary columns are encoded separately
+COLUMNS = (
+    ('id', 'int64'),
+    ('title', 'string'),
+    ('category', 'dictionary'),
+    ('expiry_date', 'date32'),
+    ('source', 'dictionary'),
+    ('source_url', 'string'),
+    ('description', 'string'),
+    ('status', 'string'),
+    ('priority', 'dictionary'),
+    ('days_before_alert', 'int32'),
+    ('recurrence_rule', 'string'),
+    ('metadata', 'string'),
+    ('created_at', 'timestamp'),
+    ('updated_at', 'timestamp'),
+)
+
+
+def _require_pyarrow():
+    if pa is None:
+        raise RuntimeError("Columnar export needs pyarrow: pip install pyarrow")
+
+
+def schema() -> 'pa.Schema':
+    _require_pyarrow()
+    types = {
+        'int64': pa.int64(), 'int32': pa.int32(), 'string': pa.string(), 'date32': pa.date32(),
+        'timestamp': pa.timestamp('s'), 'dictionary': pa.dictionary(pa.int32(), pa.string()),
+    }
+    return pa.schema([(name, types[kind]) for name, kind in COLUMNS])
+
+
+def read_watermark(out_dir: str) -> Dict[str, Any]:
+    path = os.path.join(out_dir, WATERMARK_FILE)
+    if os.path.exists(path):
+        with open(path, encoding='utf-8') as f:
+            return json.load(f)
+    return {}
+
+
+class _PartitionWriters:
+    """One open Parquet / IPC writer per expiry month"""
+
+    def __init__(self, out_dir: str, fmt: str, part: int, schema):
+        self.out_dir = out_dir
+        self.fmt = fmt
+        self.file_name = f'part-{part:05d}{FORMATS[fmt]}'
+        self.schema = schema
+        self._writers = {}
+        self.files = []
+
+    def write(self, month: str, batch):
+        writer = self._writers.get(month)
+        if writer is None:
+            directory = os.path.join(self.out_dir, f'expiry_month={month}')
+            os.makedirs(directory, exist_ok=True)
+            path = os.path.join(directory, self.file_name)
+            if self.fmt == 'parquet':
+                writer = pq.ParquetWriter(path, self.schema, compression='zstd')
+            else:
+                writer = pa.ipc.new_file(path, self.schema)
+            self._writers[month] = writer
+            self.files.append(path)
+        writer.write_batch(batch)
+
+    def close(self):
+        for writer in self._writers.values():
+            writer.close()
+        self._writers.clear()
+
+
+def _record_batch(rows, dictionaries, schema):
+    columns = list(zip(*rows))
+    arrays = []
+    for (name, kind), values in zip(COLUMNS, columns):
+        if kind == 'dictionary':
+            indices = pc.index_in(pa.array(values, pa.string()), value_set=dictionaries[name])
+            arrays.append(pa.DictionaryArray.from_arrays(indices.cast(pa.int32()), dictionaries[name]))
+        elif kind in ('date32', 'timestamp'):
+            arrays.append(pa.array(values, pa.string()).cast(schema.field(name).type))
+        else:
+            arrays.append(pa.array(values, schema.field(name).type))
+    return pa.RecordBatch.from_arrays(arrays, schema=schema)
+
+
+def export_items(tracker, out_dir: str = os.path.join('data', 'export'), fmt: str = 'parquet',
+                 incremental: bool = False, batch_size: int = 50000) -> Dict[str, Any]:
+    """Write expiry_items to out_dir; returns the new watermark with row and file counts.
+
+    A full export replaces earlier part files of the same format; so does an
+    incremental one without a previous watermark. Rows are read from the
+    tracker's analytics snapshot when snapshots are enabled.
+    """
+    _require_pyarrow()
+    if fmt not in FORMATS:
+        raise ValueError(f"Unknown export format: {fmt}")
+    watermark = read_watermark(out_dir) if incremental else {}
+    if watermark.get('format', fmt) != fmt:
+        raise ValueError(f"{out_dir} holds a {watermark['format']} export")
+    since = watermark.get('seq')
+    incremental = since is not None
+
+    os.makedirs(out_dir, exist_ok=True)
+    if not incremental:
+        for path in glob.glob(os.path.join(glob.escape(out_dir), 'expiry_month=*', 'part-*' + FORMATS[fmt])):
+            os.remove(path)
+
+    target_schema = schema()
+    select = ', '.join(name for name, _ in COLUMNS)
+    where, params = (("WHERE id IN (SELECT item_id FROM change_log WHERE seq > ?)", (since,))
+                     if incremental else ("", ()))
+    start = time.perf_counter()
+
+    conn = tracker.analytics().get_connection()
+    writers = _PartitionWriters(out_dir, fmt, watermark.get('next_part', 0), target_schema)
+    rows_written = 0
+    try:
+        # One read transaction, so the seq, the dictionaries and the streamed rows agree
+        conn.execute("BEGIN")
+        seq = conn.execute("SELECT COALESCE(MAX(seq), 0) FROM change_log").fetchone()[0]
+        dictionaries = {
+            name: pa.array([row[0] for row in conn.execute(
+                f"SELECT DISTINCT {name} FROM expiry_items {where} ORDER BY {name}", params)], pa.string())
+            for name in DICTIONARY_COLUMNS
+        }
+        cursor = conn.execute(f"SELECT {select} FROM expiry_items {where} ORDER BY expiry_date, id", params)
+        while True:
+            rows = cursor.fetchmany(batch_size)
+            if not rows:
+                break
+            batch = _record_batch(rows, dictionaries, target_schema)
+            months = pc.strftime(batch.column('expiry_date'), format='%Y-%m')
+            for month in pc.unique(months).to_pylist():
+                writers.write(month, batch.filter(pc.equal(months, month)))
+            rows_written += len(rows)
+    finally:
+        writers.close()
+        conn.rollback()
+        conn.close()
+
+    result = {
+        'format': fmt,
+        'seq': seq,
+        'next_part': watermark.get('next_part', 0) + (1 if writers.files else 0),
+        'rows': rows_written,
+        'files': len(writers.files),
+    }
+    with open(os.path.join(out_dir, WATERMARK_FILE), 'w', encoding='utf-8') as f:
+        json.dump(result, f, ensure_ascii=False, indent=2)
+    ChangeFeed(tracker, EXPORT_CONSUMER).commit(seq)
+    EXPORT_SECONDS.observe(time.perf_counter() - start)
+    return result
+
+
+def read_export(out_dir: str = os.path.join('data', 'export'), fmt: str = 'parquet') -> 'pa.Table':
+    """Current rows of an export: the version of each id in its latest part"""
+    _require_pyarrow()
+    dataset = ds.dataset(out_dir, format='ipc' if fmt == 'arrow' else fmt, partitioning='hive',
+                         exclude_invalid_files=True)
+    # Part numbers follow export order; updated_at only has one-second resolution
+    tables, parts = [], []
+    for fragment in dataset.get_fragments():
+        table = fragment.to_table()
+        for name, value in ds.get_partition_keys(fragment.partition_expression).items():
+            table = table.append_column(name, pa.array([value] * table.num_rows, pa.string()))
+        tables.append(table)
+        parts.append(np.full(table.num_rows, int(os.path.basename(fragment.path)[5:10])))
+    if not tables:
+        return dataset.to_table()
+    table = pa.concat_tables(tables).append_column('_part', pa.array(np.concatenate(parts)))
+    order = pc.sort_indices(table, sort_keys=[('id', 'ascending'), ('_part', 'descending')])
+    table = table.take(order).drop_columns(['_part'])
+    ids = table.column('id').to_numpy()
+    first = np.ones(len(ids), dtype=bool)
+    first[1:] = ids[1:] != ids[:-1]
+    return table.filter(pa.array(first))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Export items to Parquet / Arrow files')
+    parser.add_argument('--db', default='data/expiry_tracker.db')
+    parser.add_argument('--out', default=os.path.join('data', 'export'))
+    parser.add_argument('--format', choices=sorted(FORMATS), default='parquet')
+    parser.add_argument('--incremental', action='store_true', help='only rows changed since the last export')
+    parser.add_argument('--batch-size', type=int, default=50000)
+    args = parser.parse_args(argv)
+
+    from models import ExpiryTracker
+    result = export_items(ExpiryTracker(args.db), args.out, args.format, args.incremental, args.batch_size)
+    print(f"✅ تم تصدير {result['rows']:,} عنصر إلى {result['files']} ملف في {args.out}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,111 @@
+# database.py - نقطة موحدة لفتح اتصالات قاعدة البيانات
+import queue
+import sqlite3
+import weakref
+from typing import Callable, List
+
+from query_monitor import monitor, MonitoredCursor
+
+# Callables applied to every new connection (e.g. registering SQL functions)
+_connection_hooks: List[Callable[[sqlite3.Connection], None]] = []
+
+
+def add_connection_hook(hook: Callable[[sqlite3.Connection], None]):
+    """Register a function that is called with every new connection"""
+    if hook not in _connection_hooks:
+        _connection_hooks.append(hook)
+
+
+class TrackedConnection(sqlite3.Connection):
+    """sqlite3 connection that routes its cursors through the query monitor"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._monitored_cursors = weakref.WeakSet()
+        self._pool = None
+
+    def cursor(self, factory=None):
+        if factory is None and monitor.enabled:
+            cursor = super().cursor(MonitoredCursor)
+            self._monitored_cursors.add(cursor)
+            return cursor
+        return super().cursor() if factory is None else super().cursor(factory)
+
+    # The built-in shortcuts create their cursor in C, bypassing cursor() and the monitor
+    def execute(self, sql, parameters=()):
+        return self.cursor().execute(sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        return self.cursor().executemany(sql, seq_of_parameters)
+
+    def executescript(self, sql_script):
+        return self.cursor().executescript(sql_script)
+
+    def close(self):
+        # Flush statements whose cursors were never closed explicitly
+        for cursor in list(self._monitored_cursors):
+            cursor._finish()
+        if self._pool is not None:
+            self._pool.release(self)
+            return
+        super().close()
+
+    def really_close(self):
+        """Close the underlying connection even when it belongs to a pool"""
+        self._pool = None
+        super().close()
+
+
+def connect(db_path: str, **kwargs) -> sqlite3.Connection:
+    """Open a connection to the tracker database"""
+    conn = sqlite3.connect(db_path, factory=TrackedConnection, **kwargs)
+    for hook in _connection_hooks:
+        hook(conn)
+    return conn
+
+
+class ConnectionPool:
+    """Fixed-size pool of connections shared between threads.
+
+    Connections handed out are regular TrackedConnections; calling close() on
+    one returns it to the pool instead of closing it.
+    """
+
+    def __init__(self, db_path: str, size: int = 8, timeout: float = 30.0):
+        self.db_path = db_path
+        self.size = size
+        self.timeout = timeout
+        self._idle = queue.LifoQueue(maxsize=size)
+        self._closed = False
+        for _ in range(size):
+            conn = connect(db_path, check_same_thread=False, timeout=timeout)
+            conn._pool = self
+            self._idle.put(conn)
+
+    def acquire(self) -> sqlite3.Connection:
+        """Take a connection, waiting up to timeout seconds for one to be free"""
+        if self._closed:
+            # A tracker evicted while in use keeps working on unpooled connections
+            return connect(self.db_path, check_same_thread=False, timeout=self.timeout)
+        try:
+            return self._idle.get(timeout=self.timeout)
+        except queue.Empty:
+            raise sqlite3.OperationalError("Timed out waiting for a pooled connection")
+
+    def release(self, conn: sqlite3.Connection):
+        if self._closed:
+            conn.really_close()
+            return
+        if conn.in_transaction:
+            conn.rollback()
+        conn.row_factory = None
+        self._idle.put(conn)
+
+    def close(self):
+        """Close every idle connection; ones still in use are closed when released"""
+        self._closed = True
+        while True:
+            try:
+                self._idle.get_nowait().really_close()
+            except queue.Empty:
+                return
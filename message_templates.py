@@ -0,0 +1,281 @@
+# message_templates.py - قوالب رسائل التنبيه المترجمة مسبقاً لكل قناة ولغة
+"""Notification message templates compiled once per channel and locale.
+
+Template sources use a small markup: [[text]] is emphasis and {name} a field.
+Compiling for a channel turns emphasis into <b>, *bold* or nothing, applies
+the channel's line breaks and fills in everything that does not depend on
+the item (tier emoji, urgency and action). Each compiled template is a
+generated f-string function, so rendering an item is one call with its
+escaped fields.
+
+Channels:
+    email     HTML e-mail body; fields HTML-escaped, newlines become <br>
+    telegram  Telegram HTML parse mode; &, < and > escaped
+    whatsapp  WhatsApp *bold* markup; * _ ~ ` in fields followed by a zero-width space
+    plain     no markup
+"""
+import functools
+import html
+import re
+import string
+from typing import Any, Callable, Dict, List, NamedTuple
+
+import numpy as np
+
+# Alert tiers: highest days left per tier; anything later is the last tier
+TIER_LIMITS = (0, 7, 30)
+
+# locale -> one (urgency, emoji, action) per tier
+TIERS = {
+    'ar': (
+        ('منتهية', '🔴', 'فوري'),
+        ('عاجلة', '🟠', 'خلال أسبوع'),
+        ('قريبة', '🟡', 'خلال شهر'),
+        ('مخططة', '🟢', 'مراقبة'),
+    ),
+    'en': (
+        ('Expired', '🔴', 'Immediately'),
+        ('Urgent', '🟠', 'Within a week'),
+        ('Soon', '🟡', 'Within a month'),
+        ('Planned', '🟢', 'Monitor'),
+    ),
+}
+
+SOURCES = {
+    'ar': {
+        'alert': (
+            "\n{emoji} [[تنبيه انتهاء الصلاحية]]\n\n"
+            "[[العنصر:]] {title}\n"
+            "[[الفئة:]] {category}\n"
+            "[[تاريخ الانتهاء:]] {expiry_date}\n"
+            "[[الأيام المتبقية:]] {days_left} يوم\n"
+            "[[الأولوية:]] {urgency}\n"
+            "[[الإجراء المطلوب:]] {action}\n\n"
+            "المصدر: {source}\n"
+        ),
+        'alert_subject': "تنبيه: {title} - {urgency}",
+        'weekly_summary': (
+            "\n📊 [[ملخص أسبوعي لتنبيهات الانتهاء]]\n\n"
+            "إجمالي العناصر: {total_items}\n"
+            "عناصر عاجلة: {urgent_count}\n"
+            "عناصر تحت المراقبة: {warning_count}\n\n"
+            "[[أهم العناصر:]]\n"
+        ),
+        'weekly_line': "\n{emoji} {title} - {days_left} يوم",
+        'monthly_report': (
+            "\n📈 [[تقرير شهري لتنبيهات الانتهاء]]\n\n"
+            "[[إجمالي العناصر:]] {total_items}\n"
+            "[[التصنيفات:]]\n"
+        ),
+        'monthly_line': "\n• {category}: {count} عنصر",
+    },
+    'en': {
+        'alert': (
+            "\n{emoji} [[Expiry alert]]\n\n"
+            "[[Item:]] {title}\n"
+            "[[Category:]] {category}\n"
+            "[[Expiry date:]] {expiry_date}\n"
+            "[[Days left:]] {days_left} days\n"
+            "[[Priority:]] {urgency}\n"
+            "[[Required action:]] {action}\n\n"
+            "Source: {source}\n"
+        ),
+        'alert_subject': "Alert: {title} - {urgency}",
+        'weekly_summary': (
+            "\n📊 [[Weekly expiry summary]]\n\n"
+            "Total items: {total_items}\n"
+            "Urgent items: {urgent_count}\n"
+            "Watched items: {warning_count}\n\n"
+            "[[Top items:]]\n"
+        ),
+        'weekly_line': "\n{emoji} {title} - {days_left} days",
+        'monthly_report': (
+            "\n📈 [[Monthly expiry report]]\n\n"
+            "[[Total items:]] {total_items}\n"
+            "[[Categories:]]\n"
+        ),
+        'monthly_line': "\n• {category}: {count} items",
+    },
+}
+
+DEFAULT_LOCALE = 'ar'
+
+
+def _html_escape(value: str) -> str:
+    # Most fields contain nothing to escape; skip the replace passes for them
+    if '&' in value or '<' in value or '>' in value or '"' in value or "'" in value:
+        return html.escape(value)
+    return value
+
+
+def _telegram_escape(value: str) -> str:
+    if '&' in value or '<' in value or '>' in value:
+        return html.escape(value, quote=False)
+    return value
+
+
+# WhatsApp has no escape character; a zero-width space after a marker keeps it from pairing up
+_WHATSAPP_MARKERS = str.maketrans({marker: marker + '\u200b' for marker in '*_~`'})
+
+
+def _whatsapp_escape(value: str) -> str:
+    if '*' in value or '_' in value or '~' in value or '`' in value:
+        return value.translate(_WHATSAPP_MARKERS)
+    return value
+
+
+def _no_escape(value: str) -> str:
+    return value
+
+
+class Channel(NamedTuple):
+    bold: tuple
+    newline: str
+    escape: Callable[[str], str]
+
+
+CHANNELS = {
+    'email': Channel(('<b>', '</b>'), '<br>\n', _html_escape),
+    'telegram': Channel(('<b>', '</b>'), '\n', _telegram_escape),
+    'whatsapp': Channel(('*', '*'), '\n', _whatsapp_escape),
+    'plain': Channel(('', ''), '\n', _no_escape),
+}
+
+_EMPHASIS = re.compile(r'\[\[(.*?)\]\]')
+
+
+class Template:
+    """A message template compiled into a Python function.
+
+    The static text becomes constants of a generated f-string, so render()
+    costs about as much as a hand-written f-string; fields are passed as
+    keyword arguments and must already be escaped for the channel.
+    """
+
+    def __init__(self, text: str):
+        self.text = text
+        namespace, pieces, fields = {}, [], []
+        for index, (literal, field, _, _) in enumerate(string.Formatter().parse(text)):
+            if literal:
+                namespace[f'_text{index}'] = literal
+                pieces.append(f'{{_text{index}}}')
+            if field is not None:
+                if not field.isidentifier():
+                    raise ValueError(f"Invalid template field: {field!r}")
+                pieces.append(f'{{{field}}}')
+                if field not in fields:
+                    fields.append(field)
+        self.fields = tuple(fields)
+        exec(f"def render({', '.join(fields)}):\n    return f'{''.join(pieces)}'", namespace)
+        self.render = namespace['render']
+
+    def __repr__(self):
+        return f"Template({self.text!r})"
+
+
+@functools.lru_cache(maxsize=None)
+def compile_template(name: str, channel: str, locale: str = DEFAULT_LOCALE, **static) -> Template:
+    """Compile one template for a channel and locale, with static fields filled in.
+
+    Static values come from the templates themselves (tier labels), so they are
+    trusted and not escaped; item fields are escaped by the caller.
+    """
+    spec = CHANNELS[channel]
+    source = SOURCES.get(locale, SOURCES[DEFAULT_LOCALE])[name]
+    open_tag, close_tag = spec.bold
+    text = _EMPHASIS.sub(lambda match: f'{open_tag}{match.group(1)}{close_tag}', source)
+    text = text.replace('\n', spec.newline)
+    for field, value in static.items():
+        text = text.replace('{' + field + '}', str(value).replace('{', '{{').replace('}', '}}'))
+    return Template(text)
+
+
+def tier_index(days_left) -> np.ndarray:
+    """Alert tier per item (0 = expired ... 3 = planned), for a whole array at once"""
+    return np.searchsorted(TIER_LIMITS, np.asarray(days_left), side='left')
+
+
+class AlertRenderer:
+    """Renders expiry alerts for one channel and locale from precompiled templates"""
+
+    def __init__(self, channel: str = 'telegram', locale: str = DEFAULT_LOCALE):
+        self.channel = channel
+        self.locale = locale if locale in SOURCES else DEFAULT_LOCALE
+        self.escape = CHANNELS[channel].escape
+        # Per tier: (urgency, message render function, subject render function)
+        self._tiers = [
+            (urgency,
+             compile_template('alert', channel, self.locale, emoji=emoji, urgency=urgency, action=action).render,
+             compile_template('alert_subject', 'plain', self.locale, urgency=urgency).render)
+            for urgency, emoji, action in TIERS[self.locale]
+        ]
+
+    def render(self, item, days_left: int) -> Dict[str, str]:
+        """Alert for one item as {'subject', 'message', 'urgency'}"""
+        return self.render_batch([item], [days_left])[0]
+
+    def render_batch(self, items: List[Any], days_left=None) -> List[Dict[str, str]]:
+        """Render many alerts; tiers are assigned for the whole batch in one step.
+
+        days_left defaults to each item's days_remaining. Titles are checked
+        for characters needing escapes once for the whole batch, and escaped
+        category/source labels are reused since they repeat heavily.
+        """
+        if days_left is None:
+            days_left = [int(item['days_remaining']) for item in items]
+        tiers = tier_index(np.asarray(days_left, dtype=np.int64)).tolist()
+        titles = [str(item['title']) for item in items]
+        joined = '\x00'.join(titles)
+        escape = self.escape
+        escape_title = escape if escape(joined) != joined else _no_escape
+        multiline = '\n' in joined or '\r' in joined
+        labels = {}
+
+        tiers_by_index = self._tiers
+        rendered = []
+        for item, title, days, tier in zip(items, titles, days_left, tiers):
+            urgency, message, subject = tiers_by_index[tier]
+            category, source, expiry_date = item['category'], item['source'], item['expiry_date']
+            if category not in labels:
+                labels[category] = escape(str(category))
+            if source not in labels:
+                labels[source] = escape(str(source))
+            if expiry_date not in labels:
+                labels[expiry_date] = escape(str(expiry_date))
+            rendered.append({
+                'subject': subject(title=' '.join(title.split()) if multiline else title),
+                'message': message(
+                    title=escape_title(title),
+                    category=labels[category],
+                    expiry_date=labels[expiry_date],
+                    source=labels[source],
+                    days_left=days,
+                ),
+                'urgency': urgency,
+            })
+        return rendered
+
+
+def weekly_summary(total_items: int, urgent_count: int, warning_count: int, top_items,
+                   channel: str = 'telegram', locale: str = DEFAULT_LOCALE) -> str:
+    """Weekly summary from counts and (title, days left) pairs"""
+    escape = CHANNELS[channel].escape
+    parts = [compile_template('weekly_summary', channel, locale).render(
+        total_items=total_items, urgent_count=urgent_count, warning_count=warning_count)]
+    urgent_line = compile_template('weekly_line', channel, locale, emoji='🔴').render
+    warning_line = compile_template('weekly_line', channel, locale, emoji='🟡').render
+    for title, days_left in top_items:
+        line = urgent_line if days_left <= 7 else warning_line
+        parts.append(line(title=escape(str(title)), days_left=days_left))
+    return ''.join(parts)
+
+
+def monthly_report(total_items: int, categories: Dict[str, int],
+                   channel: str = 'telegram', locale: str = DEFAULT_LOCALE) -> str:
+    """Monthly report from a per-category count"""
+    escape = CHANNELS[channel].escape
+    line = compile_template('monthly_line', channel, locale).render
+    parts = [compile_template('monthly_report', channel, locale).render(total_items=total_items)]
+    parts.extend(line(category=escape(str(category)), count=count)
+                 for category, count in categories.items())
+    return ''.join(parts)
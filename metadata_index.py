@@ -0,0 +1,100 @@
+# metadata_index.py - فهرسة حقول البيانات الوصفية (metadata) للاستعلام السريع
+import sqlite3
+from typing import Any, Dict, List, Tuple
+
+# Fields declared automatically on every tracker database
+DEFAULT_METADATA_FIELDS = ('employee_id', 'plate_number', 'policy_number')
+
+# json_each() fails on invalid JSON, so such rows are indexed as empty objects
+_INDEXED_VALUES = '''
+    SELECT {item}, j.key, CAST(j.value AS TEXT)
+    FROM json_each(CASE WHEN json_valid({metadata}) THEN {metadata} ELSE '{{}}' END) AS j
+    WHERE j.type NOT IN ('object', 'array', 'null')
+    AND j.key IN (SELECT name FROM metadata_fields)
+'''
+
+
+def _indexed_values(item: str, metadata: str) -> str:
+    return _INDEXED_VALUES.format(item=item, metadata=metadata)
+
+
+def create_metadata_index(cursor: sqlite3.Cursor):
+    """Create the key/value side table and the triggers keeping it in sync"""
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS metadata_fields (
+            name TEXT PRIMARY KEY,
+            backfilled_to INTEGER DEFAULT 0,
+            backfill_done BOOLEAN DEFAULT FALSE,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS item_metadata (
+            key TEXT NOT NULL,
+            value TEXT NOT NULL,
+            item_id INTEGER NOT NULL,
+            PRIMARY KEY (key, value, item_id)
+        ) WITHOUT ROWID
+    ''')
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_item_metadata_item ON item_metadata (item_id)")
+
+    cursor.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS expiry_items_metadata_insert
+        AFTER INSERT ON expiry_items BEGIN
+            INSERT OR IGNORE INTO item_metadata (item_id, key, value)
+            {_indexed_values('NEW.id', 'NEW.metadata')};
+        END
+    ''')
+    cursor.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS expiry_items_metadata_update
+        AFTER UPDATE OF metadata ON expiry_items BEGIN
+            DELETE FROM item_metadata WHERE item_id = OLD.id;
+            INSERT OR IGNORE INTO item_metadata (item_id, key, value)
+            {_indexed_values('NEW.id', 'NEW.metadata')};
+        END
+    ''')
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS expiry_items_metadata_delete
+        AFTER DELETE ON expiry_items BEGIN
+            DELETE FROM item_metadata WHERE item_id = OLD.id;
+        END
+    ''')
+
+    cursor.executemany("INSERT OR IGNORE INTO metadata_fields (name) VALUES (?)",
+                       [(name,) for name in DEFAULT_METADATA_FIELDS])
+
+
+def backfill_batch(cursor: sqlite3.Cursor, field: str, after_id: int, batch_size: int) -> Tuple[int, int]:
+    """Index one batch of existing rows for a field; returns (rows scanned, last id)"""
+    cursor.execute('''
+        SELECT MAX(id), COUNT(*) FROM (
+            SELECT id FROM expiry_items WHERE id > ? ORDER BY id LIMIT ?
+        )
+    ''', (after_id, batch_size))
+    last_id, scanned = cursor.fetchone()
+    if not scanned:
+        cursor.execute("UPDATE metadata_fields SET backfill_done = TRUE WHERE name = ?", (field,))
+        return 0, after_id
+
+    cursor.execute('''
+        INSERT OR IGNORE INTO item_metadata (item_id, key, value)
+        SELECT e.id, j.key, CAST(j.value AS TEXT)
+        FROM expiry_items e,
+             json_each(CASE WHEN json_valid(e.metadata) THEN e.metadata ELSE '{}' END) AS j
+        WHERE e.id > ? AND e.id <= ?
+        AND j.key = ?
+        AND j.type NOT IN ('object', 'array', 'null')
+    ''', (after_id, last_id, field))
+    cursor.execute("UPDATE metadata_fields SET backfilled_to = ? WHERE name = ?", (last_id, field))
+    return scanned, last_id
+
+
+def metadata_filter(filters: Dict[str, Any], declared: List[str]) -> Tuple[str, list]:
+    """Build an id subquery intersecting every key = value filter"""
+    parts, params = [], []
+    for key, value in filters.items():
+        if key not in declared:
+            raise ValueError(f"Metadata field '{key}' is not declared; call declare_metadata_field() first")
+        parts.append("SELECT item_id FROM item_metadata WHERE key = ? AND value = ?")
+        params.extend([key, str(value)])
+    return ' INTERSECT '.join(parts), params
@@ -0,0 +1,285 @@
+# model_registry.py - نماذج أولوية لكل فئة مع مقيّم احتياطي خفيف
+"""Per-category urgency models.
+
+Large categories get a small random forest; categories with few rows get a
+closed-form least-squares scorer. Models are saved one file per category
+and loaded lazily on first use; the least recently used ones are dropped
+when their combined size passes memory_cap_bytes.
+
+Models see days left, days since creation, priority and source. Anything a
+model cannot score (unknown category, unseen priority or source for a
+forest, unknown expiry date) is scored by heuristic_urgency, a vectorized
+formula over days left and priority, instead of a constant. A category whose
+model does not beat the heuristic on held-out rows is served by the
+heuristic too.
+"""
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List
+
+import joblib
+import numpy as np
+import pandas as pd
+from sklearn.ensemble import RandomForestRegressor
+from sklearn.metrics import mean_absolute_error, r2_score
+from sklearn.model_selection import train_test_split
+
+import clock
+
+PRIORITY_WEIGHTS = {'high': 10.0, 'medium': 0.0, 'low': -10.0}
+# Score used when an item's expiry date is unknown
+NEUTRAL_URGENCY = 50.0
+# Bumped when the model features change; saved models of other versions are ignored
+MODEL_VERSION = 2
+
+_EMPTY_STATS = {'loads': 0, 'evictions': 0, 'calls': 0, 'predicted_rows': 0, 'seconds': 0.0}
+
+
+def heuristic_urgency(days_left, priorities) -> np.ndarray:
+    """Urgency 0-100 from days left (NaN = unknown) and priority, for whole arrays"""
+    days = np.asarray(days_left, dtype=float)
+    base = np.where(np.isnan(days), NEUTRAL_URGENCY, 100.0 - days)
+    weights = pd.Series(priorities, dtype=object).map(PRIORITY_WEIGHTS).fillna(0.0).to_numpy(dtype=float)
+    return np.clip(base + weights, 0.0, 100.0)
+
+
+def days_left(frame: pd.DataFrame) -> np.ndarray:
+    """Calendar days from clock.today() to each expiry date, as in the status projection; NaN if unknown"""
+    if 'expiry_date' not in frame:
+        return np.full(len(frame), np.nan)
+    expiry = pd.to_datetime(frame['expiry_date'], errors='coerce').dt.normalize()
+    return (expiry - pd.Timestamp(clock.today())).dt.days.to_numpy(dtype=float)
+
+
+def urgency_target(frame: pd.DataFrame) -> np.ndarray:
+    """Training target: 100 minus days until expiry, clipped to 0-100"""
+    return np.clip(100 - days_left(frame), 0, 100)
+
+
+def _days_created(frame: pd.DataFrame) -> np.ndarray:
+    created = pd.to_datetime(frame['created_at'], errors='coerce')
+    return (clock.now() - created).dt.days.fillna(0).to_numpy(dtype=float)
+
+
+class CategoryModel:
+    """Urgency model of one category: 'forest' or 'linear'"""
+
+    def __init__(self, category: str, kind: str, levels: Dict[str, List[str]], model=None, coef=None):
+        self.category = category
+        self.kind = kind
+        # Known priority/source values; position = code for the forest, one-hot column for linear
+        self.levels = levels
+        self.model = model
+        self.coef = coef
+
+    def _design(self, frame: pd.DataFrame) -> np.ndarray:
+        columns = [np.ones(len(frame))]
+        for field in ('priority', 'source'):
+            values = frame[field].to_numpy(dtype=object)
+            columns.extend((values == level).astype(float) for level in self.levels[field])
+        columns.append(_days_created(frame) / 365.0)
+        columns.append(days_left(frame) / 365.0)
+        return np.column_stack(columns)
+
+    def _features(self, frame: pd.DataFrame) -> np.ndarray:
+        return np.column_stack([
+            pd.Categorical(frame['priority'], categories=self.levels['priority']).codes,
+            pd.Categorical(frame['source'], categories=self.levels['source']).codes,
+            _days_created(frame),
+            days_left(frame),
+        ])
+
+    def known(self, frame: pd.DataFrame) -> np.ndarray:
+        """Rows this model can score (the linear scorer handles unseen values itself)"""
+        dated = ~np.isnan(days_left(frame))
+        if self.kind == 'linear':
+            return dated
+        return dated & (frame['priority'].isin(self.levels['priority'])
+                        & frame['source'].isin(self.levels['source'])).to_numpy()
+
+    def predict(self, frame: pd.DataFrame) -> np.ndarray:
+        if self.kind == 'linear':
+            return np.clip(self._design(frame) @ self.coef, 0.0, 100.0)
+        return np.clip(self.model.predict(self._features(frame)), 0.0, 100.0)
+
+    @classmethod
+    def fit(cls, category: str, frame: pd.DataFrame, target: np.ndarray, kind: str,
+            forest_params: Dict[str, Any]) -> 'CategoryModel':
+        levels = {field: sorted(frame[field].dropna().unique().tolist()) for field in ('priority', 'source')}
+        model = cls(category, kind, levels)
+        if kind == 'linear':
+            model.coef = np.linalg.lstsq(model._design(frame), target, rcond=None)[0]
+        else:
+            model.model = RandomForestRegressor(random_state=42, n_jobs=1, **forest_params)
+            model.model.fit(model._features(frame), target)
+        return model
+
+
+class ModelRegistry:
+    """Lazily loaded per-category models with an LRU memory cap and usage statistics"""
+
+    def __init__(self, model_dir: str = os.path.join('data', 'models'), memory_cap_bytes: int = 64 * 1024 * 1024,
+                 min_forest_rows: int = 500, forest_params: Dict[str, Any] = None):
+        self.model_dir = model_dir
+        self.memory_cap_bytes = memory_cap_bytes
+        self.min_forest_rows = min_forest_rows
+        self.forest_params = forest_params or {'n_estimators': 20, 'max_depth': 8}
+        self._index_path = os.path.join(model_dir, 'index.json')
+        self._index: Dict[str, Dict[str, Any]] = self._read_index()
+        self._loaded: 'OrderedDict[str, CategoryModel]' = OrderedDict()
+        self._loaded_bytes = 0
+        self._lock = threading.Lock()
+        self._stats: Dict[str, Dict[str, float]] = {}
+
+    def _read_index(self) -> Dict[str, Dict[str, Any]]:
+        if os.path.exists(self._index_path):
+            with open(self._index_path, encoding='utf-8') as f:
+                index = json.load(f)
+            return {category: entry for category, entry in index.items()
+                    if entry.get('version') == MODEL_VERSION}
+        return {}
+
+    def __contains__(self, category) -> bool:
+        return category in self._index
+
+    def _stat(self, name: str) -> Dict[str, float]:
+        return self._stats.setdefault(name, dict(_EMPTY_STATS))
+
+    def train(self, frame: pd.DataFrame, test_size: float = 0.2) -> Dict[str, Dict[str, Any]]:
+        """Fit one model per category of frame and replace the saved registry.
+
+        frame needs category, priority, source, created_at and expiry_date;
+        rows without an expiry date are left out. Accuracy is measured on a
+        held-out split, next to the heuristic's.
+        """
+        os.makedirs(self.model_dir, exist_ok=True)
+        index = {}
+        frame = frame[~np.isnan(days_left(frame))]
+        for category, group in frame.groupby('category', sort=True):
+            if len(group) < 10:
+                continue
+            target = urgency_target(group)
+            kind = 'forest' if len(group) >= self.min_forest_rows else 'linear'
+            train, test, y_train, y_test = train_test_split(group, target, test_size=test_size, random_state=42)
+
+            start = time.perf_counter()
+            evaluated = CategoryModel.fit(category, train, y_train, kind, self.forest_params)
+            fit_seconds = time.perf_counter() - start
+            predicted = self._score(evaluated, test)
+            heuristic = heuristic_urgency(days_left(test), test['priority'])
+
+            entry = {
+                'version': MODEL_VERSION,
+                'kind': kind,
+                'file': None,
+                'train_rows': int(len(group)),
+                'size_bytes': 0,
+                'fit_seconds': fit_seconds,
+                'r2': float(r2_score(y_test, predicted)) if len(test) > 1 else None,
+                'mae': float(mean_absolute_error(y_test, predicted)),
+                'heuristic_mae': float(mean_absolute_error(y_test, heuristic)),
+            }
+            if entry['mae'] < entry['heuristic_mae']:
+                model = CategoryModel.fit(category, group, target, kind, self.forest_params)
+                entry['file'] = hashlib.sha1(category.encode('utf-8')).hexdigest()[:16] + '.pkl'
+                path = os.path.join(self.model_dir, entry['file'])
+                joblib.dump(model, path)
+                entry['size_bytes'] = os.path.getsize(path)
+            else:
+                # The model does not beat the heuristic on held-out rows; serve the heuristic
+                entry['kind'] = 'heuristic'
+            index[category] = entry
+
+        with open(self._index_path, 'w', encoding='utf-8') as f:
+            json.dump(index, f, ensure_ascii=False, indent=2)
+        with self._lock:
+            self._index = index
+            self._loaded.clear()
+            self._loaded_bytes = 0
+        return index
+
+    def get(self, category: str) -> CategoryModel:
+        """Model of a category, loading it on first use; None if the heuristic serves it"""
+        with self._lock:
+            model = self._loaded.get(category)
+            if model is not None:
+                self._loaded.move_to_end(category)
+                return model
+            entry = self._index.get(category)
+        if entry is None or entry['file'] is None:
+            return None
+
+        model = joblib.load(os.path.join(self.model_dir, entry['file']))
+        with self._lock:
+            if category not in self._loaded:
+                self._loaded[category] = model
+                self._loaded_bytes += entry['size_bytes']
+                self._stat(category)['loads'] += 1
+                # Keep at least the model just loaded, even if it alone is over the cap
+                while self._loaded_bytes > self.memory_cap_bytes and len(self._loaded) > 1:
+                    evicted, _ = self._loaded.popitem(last=False)
+                    self._loaded_bytes -= self._index[evicted]['size_bytes']
+                    self._stat(evicted)['evictions'] += 1
+            return self._loaded[category]
+
+    def _score(self, model: CategoryModel, frame: pd.DataFrame) -> np.ndarray:
+        scores = heuristic_urgency(days_left(frame), frame['priority'])
+        known = model.known(frame)
+        if known.any():
+            scores[known] = model.predict(frame[known])
+        return scores
+
+    def _timed(self, name: str, rows: int, func, *args) -> np.ndarray:
+        start = time.perf_counter()
+        result = func(*args)
+        seconds = time.perf_counter() - start
+        with self._lock:
+            stat = self._stat(name)
+            stat['calls'] += 1
+            stat['predicted_rows'] += rows
+            stat['seconds'] += seconds
+        return result
+
+    def predict(self, items) -> np.ndarray:
+        """Urgency scores for a DataFrame or list of item dicts, in input order"""
+        if not isinstance(items, pd.DataFrame):
+            items = pd.DataFrame([item.to_dict() if hasattr(item, 'to_dict') else item for item in items])
+        frame = items
+        frame = frame.reset_index(drop=True)
+        for column in ('category', 'priority', 'source', 'created_at'):
+            if column not in frame:
+                frame[column] = None
+
+        scores = np.empty(len(frame))
+        for category, rows in frame.groupby('category', sort=False, dropna=False).indices.items():
+            group = frame.iloc[rows]
+            model = self.get(category) if isinstance(category, str) else None
+            if model is None:
+                name = category if category in self._index else 'heuristic'
+                scores[rows] = self._timed(name, len(rows), heuristic_urgency,
+                                           days_left(group), group['priority'])
+            else:
+                scores[rows] = self._timed(category, len(rows), self._score, model, group)
+        return scores
+
+    def get_stats(self) -> Dict[str, Dict[str, Any]]:
+        """Per model: kind, size, accuracy from training, loads/evictions and mean latency per row"""
+        with self._lock:
+            names = set(self._index) | set(self._stats)
+            stats = {}
+            for name in sorted(names):
+                usage = dict(self._stats.get(name, _EMPTY_STATS))
+                usage['loaded'] = name in self._loaded
+                rows = usage['predicted_rows']
+                usage['mean_us_per_row'] = usage['seconds'] / rows * 1e6 if rows else None
+                stats[name] = dict(self._index.get(name, {'kind': 'heuristic'}), **usage)
+            stats['_registry'] = {
+                'loaded_models': len(self._loaded),
+                'loaded_bytes': self._loaded_bytes,
+                'memory_cap_bytes': self.memory_cap_bytes,
+            }
+            return stats
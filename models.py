@@ -5,14 +5,78 @@ import pandas as pd
 from typing import List, Dict, Any
 import json
 
+import clock
+import metrics
+from alert_ledger import create_alert_ledger
+from archive import HISTORY_VIEW, ensure_archive_schema
+from background_writer import UPDATABLE_COLUMNS
+from change_feed import create_change_log
+from database import ConnectionPool, connect
+from query_cache import QueryCache, cached_query
+from records import ExpiryItem
+from recurrence import parse_rule
+from metadata_index import backfill_batch, create_metadata_index, metadata_filter
+from search_index import FTS_TABLE, build_match_query, create_search_index, filter_clause
+from status_buckets import create_status_projection, refresh_status_projection
+
+ITEMS_INGESTED = metrics.registry.counter(
+    'expiry_items_ingested_total', 'Items added to the tracker', ('source',))
+ACTIVE_ITEMS = metrics.registry.gauge(
+    'expiry_active_items', 'Active items at the last statistics run')
+OVERDUE_ITEMS = metrics.registry.gauge(
+    'expiry_overdue_items', 'Overdue items at the last statistics run')
+
 class ExpiryTracker:
-    def __init__(self, db_path: str = "data/expiry_tracker.db"):
+    def __init__(self, db_path: str = "data/expiry_tracker.db", cache_size: int = 0,
+                 cache_ttl: float = None, pool_size: int = 0):
         self.db_path = db_path
+        self._pool = None
+        # Day the status projection was last known to be current for
+        self._projection_day = None
+        # SnapshotManager that serves analytical reads (see snapshots.py); None reads the live file
+        self.snapshots = None
+        # BackgroundWriter that batches item updates (see background_writer.py); None writes inline
+        self.writer = None
+        # Read-through cache for repeated queries; disabled when cache_size is 0
+        self._cache = QueryCache(cache_size, cache_ttl) if cache_size else None
         self.init_database()
+        # Shared connections for multi-threaded servers; opened after the schema exists
+        if pool_size:
+            self._pool = ConnectionPool(db_path, pool_size)
+    
+    def get_cache_stats(self) -> Dict[str, Any]:
+        """Hit/miss statistics of the query cache"""
+        return self._cache.get_stats() if self._cache else {}
+    
+    def invalidate_cache(self, category: str = None):
+        """Drop cached results; with a category, other categories' lookups are kept"""
+        if self._cache is None:
+            return
+        if category is None:
+            self._cache.invalidate()
+        else:
+            self._cache.invalidate(
+                lambda key: key[0] != 'get_items_by_category' or dict(key[1])['category'] == category)
+    
+    def get_connection(self):
+        """Open a connection to the tracker database (or borrow one from the pool)"""
+        if self._pool is not None:
+            return self._pool.acquire()
+        return connect(self.db_path)
+    
+    def close(self):
+        """Close the connection pool; later calls open their own connections"""
+        pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.close()
+    
+    def analytics(self) -> 'ExpiryTracker':
+        """Tracker for long analytical reads: the latest snapshot when snapshots are enabled"""
+        return self.snapshots.reader() if self.snapshots is not None else self
     
     def init_database(self):
         """Initialize the database with required tables"""
-        conn = sqlite3.connect(self.db_path)
+        conn = self.get_connection()
         cursor = conn.cursor()
         
         # Create expiry items table
@@ -47,6 +111,9 @@ class ExpiryTracker:
             )
         ''')
         
+        # Delivery ledger: channel column and the unique claim key
+        create_alert_ledger(cursor)
+        
         # Create sources table
         cursor.execute('''
             CREATE TABLE IF NOT EXISTS sources (
@@ -59,33 +126,105 @@ class ExpiryTracker:
             )
         ''')
         
+        # Columns added after the first release
+        self._add_missing_columns(cursor, 'expiry_items', {
+            'recurrence_rule': 'TEXT',
+            'recurrence_anchor': 'DATE',
+            'recurrence_until': 'DATE',
+        })
+        
+        # Indexes for the hot-path queries on active items
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_items_status_expiry ON expiry_items (status, expiry_date)")
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_items_status_category ON expiry_items (status, category, expiry_date)")
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_items_recurring ON expiry_items (expiry_date) WHERE recurrence_rule IS NOT NULL")
+        
+        # Materialized days_left / status_bucket, kept current by triggers and a daily rollover
+        create_status_projection(cursor, clock.today())
+        
+        # Full-text search index kept in sync by triggers
+        create_search_index(cursor)
+        
+        # Declared metadata fields indexed in a key/value side table
+        create_metadata_index(cursor)
+        
+        # Append-only change log for downstream consumers
+        create_change_log(cursor)
+        
+        # Archive table for old inactive items and the union view over both
+        ensure_archive_schema(cursor)
+        
         conn.commit()
         conn.close()
+        
+        self.refresh_status_projection()
+        self.backfill_metadata()
+    
+    @staticmethod
+    def _add_missing_columns(cursor, table: str, columns: Dict[str, str]):
+        """Add columns that older databases do not have yet"""
+        cursor.execute(f"PRAGMA table_info({table})")
+        existing = {row[1] for row in cursor.fetchall()}
+        for name, column_type in columns.items():
+            if name not in existing:
+                cursor.execute(f"ALTER TABLE {table} ADD COLUMN {name} {column_type}")
+    
+    def refresh_status_projection(self) -> bool:
+        """Roll days_left/status_bucket over to clock.today(); True if anything was recomputed"""
+        today = clock.today()
+        conn = self.get_connection()
+        try:
+            rolled = refresh_status_projection(conn, today)
+        finally:
+            conn.close()
+        self._projection_day = today
+        if rolled:
+            self.invalidate_cache()
+        return rolled
+    
+    def _ensure_projection_current(self):
+        # Cheap in-memory check; the rollover job normally gets there first
+        if self._projection_day != clock.today():
+            self.refresh_status_projection()
     
+    def get_data_version(self) -> int:
+        """Monotonic number that changes whenever an item is added, changed or removed"""
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        cursor.execute("SELECT seq FROM sqlite_sequence WHERE name = 'change_log'")
+        row = cursor.fetchone()
+        conn.close()
+        return row[0] if row else 0
+    
+    @cached_query
     def get_all_items(self) -> pd.DataFrame:
         """Get all items from the database and calculate remaining days."""
-        conn = sqlite3.connect(self.db_path)
-        query = "SELECT * FROM expiry_items WHERE status = 'active' ORDER BY expiry_date ASC"
+        self._ensure_projection_current()
+        conn = self.get_connection()
+        query = '''
+            SELECT *, days_left AS days_remaining
+            FROM expiry_items WHERE status = 'active' ORDER BY expiry_date ASC
+        '''
         df = pd.read_sql_query(query, conn)
         conn.close()
 
         if not df.empty:
-            # Calculate days_remaining for all items
             df['expiry_date'] = pd.to_datetime(df['expiry_date'])
-            df['days_remaining'] = (df['expiry_date'] - datetime.now()).dt.days
         
         return df
 
     def add_item(self, item_data: Dict[str, Any]) -> int:
         """Add a new expiry item"""
-        conn = sqlite3.connect(self.db_path)
+        rule = parse_rule(item_data.get('recurrence_rule'))
+        
+        conn = self.get_connection()
         cursor = conn.cursor()
         
         cursor.execute('''
             INSERT INTO expiry_items 
             (title, category, expiry_date, source, source_url, description, 
-             priority, status, metadata, days_before_alert)
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+             priority, status, metadata, days_before_alert,
+             recurrence_rule, recurrence_anchor, recurrence_until)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
         ''', (
             item_data['title'],
             item_data['category'],
@@ -96,18 +235,26 @@ class ExpiryTracker:
             item_data.get('priority', 'medium'),
             item_data.get('status', 'active'),
             json.dumps(item_data.get('metadata', {})),
-            item_data.get('days_before_alert', 30)
+            item_data.get('days_before_alert', 30),
+            str(rule) if rule else None,
+            item_data['expiry_date'] if rule else None,
+            item_data.get('recurrence_until')
         ))
         
         item_id = cursor.lastrowid
         conn.commit()
         conn.close()
         
+        self.invalidate_cache(item_data['category'])
+        ITEMS_INGESTED.inc(source=item_data['source'])
         return item_id
 
     def update_item(self, item_id: int, item_data: Dict[str, Any]):
         """Update an existing item's data."""
-        conn = sqlite3.connect(self.db_path)
+        if self.writer is not None:
+            self.writer.update_item(item_id, {column: item_data[column] for column in UPDATABLE_COLUMNS}).result()
+            return
+        conn = self.get_connection()
         cursor = conn.cursor()
         
         cursor.execute('''
@@ -134,43 +281,57 @@ class ExpiryTracker:
         
         conn.commit()
         conn.close()
+        self.invalidate_cache()
 
     def delete_item(self, item_id: int):
         """Delete an item from the database."""
-        conn = sqlite3.connect(self.db_path)
+        conn = self.get_connection()
         cursor = conn.cursor()
         cursor.execute("DELETE FROM expiry_items WHERE id = ?", (item_id,))
         conn.commit()
         conn.close()
+        self.invalidate_cache()
     
-    def get_upcoming_expirations(self, days: int = 30) -> pd.DataFrame:
-        """Get items expiring within specified days"""
-        conn = sqlite3.connect(self.db_path)
+    @cached_query
+    def get_upcoming_expirations(self, days: int = 30, expand_recurring: bool = False) -> pd.DataFrame:
+        """Get items expiring within specified days.
+        
+        With expand_recurring, later cycles of recurring items that also fall
+        inside the window are added as extra rows (with an occurrence number).
+        """
+        self._ensure_projection_current()
+        window_end = clock.today() + timedelta(days=days)
+        conn = self.get_connection()
         
         query = '''
-            SELECT *, 
-                   julianday(expiry_date) - julianday('now') as days_remaining
+            SELECT *, days_left AS days_remaining
             FROM expiry_items 
-            WHERE expiry_date <= date('now', '+' || ? || ' days')
+            WHERE expiry_date <= ?
             AND status = 'active'
             ORDER BY expiry_date ASC
         '''
         
-        df = pd.read_sql_query(query, conn, params=[days])
+        df = pd.read_sql_query(query, conn, params=[window_end.isoformat()])
         conn.close()
         
+        if expand_recurring:
+            extra = pd.DataFrame(list(self.iter_occurrences(days)))
+            if not extra.empty:
+                df = pd.concat([df, extra], ignore_index=True).sort_values('expiry_date', kind='stable')
+                df = df.reset_index(drop=True)
+        
         return df
     
+    @cached_query
     def get_overdue_items(self) -> pd.DataFrame:
         """Get items that have already expired"""
-        conn = sqlite3.connect(self.db_path)
+        self._ensure_projection_current()
+        conn = self.get_connection()
         
         query = '''
-            SELECT *, 
-                   julianday('now') - julianday(expiry_date) as days_overdue
+            SELECT *, -days_left as days_overdue
             FROM expiry_items 
-            WHERE expiry_date < date('now')
-            AND status = 'active'
+            WHERE status = 'active' AND status_bucket = 'overdue'
             ORDER BY expiry_date DESC
         '''
         
@@ -180,10 +341,19 @@ class ExpiryTracker:
         return df
     
     def update_item_status(self, item_id: int, status: str):
-        """Update item status"""
-        conn = sqlite3.connect(self.db_path)
+        """Update item status; renewing a recurring item rolls it to its next cycle"""
+        if self.writer is not None:
+            self.writer.update_status(item_id, status).result()
+            return
+        conn = self.get_connection()
         cursor = conn.cursor()
         
+        if status == 'renewed' and self._roll_forward(cursor, item_id):
+            conn.commit()
+            conn.close()
+            self.invalidate_cache()
+            return
+        
         cursor.execute('''
             UPDATE expiry_items 
             SET status = ?, updated_at = CURRENT_TIMESTAMP
@@ -192,10 +362,12 @@ class ExpiryTracker:
         
         conn.commit()
         conn.close()
+        self.invalidate_cache()
     
+    @cached_query
     def get_items_by_category(self, category: str) -> pd.DataFrame:
         """Get items by category"""
-        conn = sqlite3.connect(self.db_path)
+        conn = self.get_connection()
         
         query = '''
             SELECT * FROM expiry_items 
@@ -208,9 +380,110 @@ class ExpiryTracker:
         
         return df
     
+    def get_item(self, item_id: int) -> Dict[str, Any]:
+        """Get one item as a dict, or None if it does not exist"""
+        conn = self.get_connection()
+        conn.row_factory = sqlite3.Row
+        row = conn.execute("SELECT * FROM expiry_items WHERE id = ?", (item_id,)).fetchone()
+        conn.close()
+        return dict(row) if row else None
+    
+    def get_items_page(self, limit: int = 100, offset: int = 0, category: str = None,
+                       status: str = 'active') -> List[Dict[str, Any]]:
+        """Get one page of items ordered by expiry date"""
+        where, params = self._page_filter(category, status)
+        conn = self.get_connection()
+        conn.row_factory = sqlite3.Row
+        rows = conn.execute(f'''
+            SELECT * FROM expiry_items {where}
+            ORDER BY expiry_date ASC, id ASC
+            LIMIT ? OFFSET ?
+        ''', params + [limit, offset]).fetchall()
+        conn.close()
+        return [dict(row) for row in rows]
+    
+    def count_items(self, category: str = None, status: str = 'active') -> int:
+        """Count items matching the same filters as get_items_page"""
+        where, params = self._page_filter(category, status)
+        conn = self.get_connection()
+        count = conn.execute(f"SELECT COUNT(*) FROM expiry_items {where}", params).fetchone()[0]
+        conn.close()
+        return count
+    
+    def iter_item_batches(self, batch_size: int = 1000, category: str = None, status: str = 'active'):
+        """Yield lists of item dicts using keyset pagination, one short query per batch"""
+        where, params = self._page_filter(category, status)
+        where = where + (' AND' if where else 'WHERE') + ' id > ?'
+        last_id = 0
+        while True:
+            conn = self.get_connection()
+            conn.row_factory = sqlite3.Row
+            rows = conn.execute(f"SELECT * FROM expiry_items {where} ORDER BY id LIMIT ?",
+                                params + [last_id, batch_size]).fetchall()
+            conn.close()
+            if not rows:
+                return
+            yield [dict(row) for row in rows]
+            last_id = rows[-1]['id']
+    
+    def get_item_records(self, status: str = 'active', days: int = None) -> List[ExpiryItem]:
+        """Items as compact ExpiryItem records ordered by expiry date.
+        
+        With days, only items expiring within the next days (overdue included).
+        """
+        query = f"SELECT {ExpiryItem.SELECT} FROM expiry_items WHERE status = ?"
+        params = [status]
+        if days is not None:
+            query += " AND expiry_date <= ?"
+            params.append((clock.today() + timedelta(days=days)).isoformat())
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        cursor.row_factory = ExpiryItem.row_factory
+        cursor.execute(query + " ORDER BY expiry_date ASC", params)
+        records = cursor.fetchall()
+        conn.close()
+        return records
+    
+    def get_upcoming_records(self, days: int = 30, expand_recurring: bool = False) -> List[ExpiryItem]:
+        """Record-based get_upcoming_expirations for code that walks items one by one"""
+        records = self.get_item_records('active', days)
+        if not expand_recurring:
+            return records
+        
+        today = clock.today()
+        window_end = today + timedelta(days=days)
+        extra = []
+        for record in records:
+            if record.recurrence_rule is None:
+                continue
+            rule = parse_rule(record.recurrence_rule)
+            current = record.expiry
+            occurrences = rule.occurrences(record.recurrence_anchor or current,
+                                           max(current + timedelta(days=1), today),
+                                           window_end, record.recurrence_until)
+            for number, occurrence in enumerate(occurrences, start=1):
+                extra.append(record.with_expiry(occurrence, number))
+        if extra:
+            records.extend(extra)
+            records.sort(key=lambda record: record.expiry_ordinal)
+        return records
+    
+    @staticmethod
+    def _page_filter(category: str = None, status: str = 'active'):
+        clauses, params = [], []
+        if category is not None:
+            clauses.append("category = ?")
+            params.append(category)
+        if status is not None:
+            clauses.append("status = ?")
+            params.append(status)
+        return ('WHERE ' + ' AND '.join(clauses)) if clauses else '', params
+    
+    @cached_query
     def get_statistics(self) -> Dict[str, Any]:
         """Get system statistics"""
-        conn = sqlite3.connect(self.db_path)
+        self._ensure_projection_current()
+        conn = self.get_connection()
         cursor = conn.cursor()
         
         stats = {}
@@ -219,26 +492,21 @@ class ExpiryTracker:
         cursor.execute("SELECT COUNT(*) FROM expiry_items")
         stats['total_items'] = cursor.fetchone()[0]
         
-        # Active items
-        cursor.execute("SELECT COUNT(*) FROM expiry_items WHERE status = 'active'")
-        stats['active_items'] = cursor.fetchone()[0]
-        
-        # Expiring soon (next 7 days)
+        # Active items per status bucket (overdue / week / month / later)
         cursor.execute("""
-            SELECT COUNT(*) FROM expiry_items 
-            WHERE expiry_date <= date('now', '+7 days') 
-            AND expiry_date >= date('now')
-            AND status = 'active'
+            SELECT status_bucket, COUNT(*) FROM expiry_items 
+            WHERE status = 'active'
+            GROUP BY status_bucket
         """)
-        stats['expiring_soon'] = cursor.fetchone()[0]
+        buckets = dict(cursor.fetchall())
+        stats['active_items'] = sum(buckets.values())
+        
+        # Expiring soon (next 7 days)
+        stats['expiring_soon'] = buckets.get('week', 0)
         
         # Overdue items
-        cursor.execute("""
-            SELECT COUNT(*) FROM expiry_items 
-            WHERE expiry_date < date('now') 
-            AND status = 'active'
-        """)
-        stats['overdue_items'] = cursor.fetchone()[0]
+        stats['overdue_items'] = buckets.get('overdue', 0)
+        stats['by_bucket'] = buckets
         
         # Items by category
         cursor.execute("""
@@ -249,6 +517,216 @@ class ExpiryTracker:
         """)
         stats['by_category'] = dict(cursor.fetchall())
         
+        # Recurring items
+        cursor.execute("""
+            SELECT COUNT(*) FROM expiry_items 
+            WHERE recurrence_rule IS NOT NULL 
+            AND status = 'active'
+        """)
+        stats['recurring_items'] = cursor.fetchone()[0]
+        
         conn.close()
         
+        # Later cycles of recurring items due in the next 7 days
+        stats['recurring_due_soon'] = sum(1 for _ in self.iter_occurrences(7))
+        
+        ACTIVE_ITEMS.set(stats['active_items'])
+        OVERDUE_ITEMS.set(stats['overdue_items'])
         return stats
+    
+    def search_items(self, query: str, filters: Dict[str, Any] = None, limit: int = 50) -> pd.DataFrame:
+        """Full-text search over title, description, source and metadata.
+        
+        Every term is matched as a prefix after Arabic normalization. Filters
+        accept category, source, priority, status, expires_before and
+        expires_after; only active items are returned unless a status is given.
+        """
+        match = build_match_query(query)
+        if not match:
+            return pd.DataFrame()
+        
+        filters = dict(filters or {})
+        filters.setdefault('status', 'active')
+        where, params = filter_clause(filters, ('category', 'source', 'priority', 'status'))
+        
+        sql = f'''
+            SELECT e.*, {FTS_TABLE}.rank AS search_rank
+            FROM {FTS_TABLE}
+            JOIN expiry_items e ON e.id = {FTS_TABLE}.rowid
+            WHERE {FTS_TABLE} MATCH ?
+            {'AND ' + where if where else ''}
+            ORDER BY {FTS_TABLE}.rank
+            LIMIT ?
+        '''
+        
+        conn = self.get_connection()
+        df = pd.read_sql_query(sql, conn, params=[match] + params + [limit])
+        conn.close()
+        
+        return df
+    
+    def declare_metadata_field(self, name: str, backfill: bool = True):
+        """Index a metadata key so it can be used with find_by_metadata"""
+        conn = self.get_connection()
+        conn.execute("INSERT OR IGNORE INTO metadata_fields (name) VALUES (?)", (name,))
+        conn.commit()
+        conn.close()
+        
+        if backfill:
+            self.backfill_metadata(name)
+    
+    def get_metadata_fields(self) -> List[str]:
+        """Get the declared metadata fields"""
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        cursor.execute("SELECT name FROM metadata_fields ORDER BY name")
+        fields = [row[0] for row in cursor.fetchall()]
+        conn.close()
+        return fields
+    
+    def backfill_metadata(self, name: str = None, batch_size: int = 5000) -> int:
+        """Index existing rows for declared fields in batches, one commit per batch.
+        
+        Progress is stored per field, so an interrupted backfill resumes where
+        it stopped. Returns the number of rows scanned.
+        """
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        
+        query = "SELECT name, backfilled_to FROM metadata_fields WHERE NOT backfill_done"
+        params = []
+        if name is not None:
+            query += " AND name = ?"
+            params.append(name)
+        cursor.execute(query, params)
+        pending = cursor.fetchall()
+        
+        total = 0
+        for field, last_id in pending:
+            while True:
+                scanned, last_id = backfill_batch(cursor, field, last_id, batch_size)
+                conn.commit()
+                total += scanned
+                if not scanned:
+                    break
+        
+        conn.close()
+        return total
+    
+    def find_by_metadata(self, filters: Dict[str, Any], status: str = 'active',
+                         limit: int = None) -> pd.DataFrame:
+        """Get items whose declared metadata fields equal all given values"""
+        declared = self.get_metadata_fields()
+        subquery, params = metadata_filter(filters, declared)
+        if not subquery:
+            return pd.DataFrame()
+        
+        query = f'''
+            SELECT * FROM expiry_items
+            WHERE id IN ({subquery})
+        '''
+        if status is not None:
+            query += " AND status = ?"
+            params.append(status)
+        query += " ORDER BY expiry_date ASC"
+        if limit is not None:
+            query += " LIMIT ?"
+            params.append(limit)
+        
+        conn = self.get_connection()
+        df = pd.read_sql_query(query, conn, params=params)
+        conn.close()
+        
+        return df
+    
+    def get_history_items(self, start_date: str = None, end_date: str = None) -> pd.DataFrame:
+        """Get hot and archived items for historical reporting"""
+        query = f"SELECT * FROM {HISTORY_VIEW} WHERE 1 = 1"
+        params = []
+        if start_date:
+            query += " AND expiry_date >= ?"
+            params.append(start_date)
+        if end_date:
+            query += " AND expiry_date <= ?"
+            params.append(end_date)
+        query += " ORDER BY expiry_date ASC"
+        
+        conn = self.get_connection()
+        df = pd.read_sql_query(query, conn, params=params)
+        conn.close()
+        
+        return df
+    
+    def set_recurrence(self, item_id: int, rule: str = None, until: str = None):
+        """Attach a recurrence rule to an item (or remove it with rule=None)"""
+        parsed = parse_rule(rule)
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        cursor.execute('''
+            UPDATE expiry_items SET
+                recurrence_rule = ?,
+                recurrence_anchor = CASE WHEN ? IS NULL THEN NULL ELSE expiry_date END,
+                recurrence_until = ?,
+                updated_at = CURRENT_TIMESTAMP
+            WHERE id = ?
+        ''', (str(parsed) if parsed else None, rule, until, item_id))
+        conn.commit()
+        conn.close()
+        self.invalidate_cache()
+    
+    def _roll_forward(self, cursor, item_id: int) -> bool:
+        """Move a recurring item to its next cycle; False if it does not recur"""
+        cursor.execute('''
+            SELECT expiry_date, recurrence_rule, recurrence_anchor, recurrence_until
+            FROM expiry_items WHERE id = ?
+        ''', (item_id,))
+        row = cursor.fetchone()
+        if row is None or not row[1]:
+            return False
+        
+        expiry_date, rule, anchor, until = row
+        next_date = parse_rule(rule).next_after(anchor or expiry_date, expiry_date).isoformat()
+        if until and next_date > until:
+            # The last cycle has been renewed; the item no longer recurs
+            return False
+        
+        cursor.execute('''
+            UPDATE expiry_items
+            SET expiry_date = ?, status = 'active', updated_at = CURRENT_TIMESTAMP
+            WHERE id = ?
+        ''', (next_date, item_id))
+        return True
+    
+    def iter_occurrences(self, days: int = 30, include_current: bool = False):
+        """Lazily yield future cycles of active recurring items within the next days.
+        
+        The stored expiry_date is the current cycle and is only yielded with
+        include_current; later cycles are generated, never stored.
+        """
+        today = clock.today()
+        window_end = today + timedelta(days=days)
+        
+        conn = self.get_connection()
+        conn.row_factory = sqlite3.Row
+        cursor = conn.cursor()
+        cursor.execute('''
+            SELECT * FROM expiry_items
+            WHERE recurrence_rule IS NOT NULL
+            AND status = 'active'
+            AND expiry_date <= ?
+        ''', (window_end.isoformat(),))
+        rows = cursor.fetchall()
+        conn.close()
+        
+        for row in rows:
+            item = dict(row)
+            rule = parse_rule(item['recurrence_rule'])
+            current = datetime.strptime(item['expiry_date'], '%Y-%m-%d').date()
+            start = current if include_current else current + timedelta(days=1)
+            occurrences = rule.occurrences(item['recurrence_anchor'] or current, max(start, today),
+                                           window_end, item['recurrence_until'])
+            for number, occurrence in enumerate(occurrences, start=1):
+                yield dict(item,
+                           expiry_date=occurrence.isoformat(),
+                           days_remaining=(occurrence - today).days,
+                           occurrence=number)
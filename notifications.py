@@ -7,9 +7,24 @@ from datetime import datetime, timedelta
 import os
 from typing import List, Dict, Any
 
+import numpy as np
+
+import clock
+import message_templates
+import metrics
+from alert_ledger import AlertLedger
+from message_templates import AlertRenderer
+
+NOTIFICATIONS_SENT = metrics.registry.counter(
+    'expiry_notifications_total', 'Notification send attempts', ('channel', 'result'))
+NOTIFICATION_SECONDS = metrics.registry.histogram(
+    'expiry_notification_send_seconds', 'Notification send latency', ('channel',))
+
 class NotificationManager:
     def __init__(self, config: Dict[str, Any] = None):
         self.config = config or {}
+        self.locale = self.config.get('locale', message_templates.DEFAULT_LOCALE)
+        self._renderers = {}
         self.setup_providers()
     
     def setup_providers(self):
@@ -18,6 +33,14 @@ class NotificationManager:
         self.telegram_config = self.config.get('telegram', {})
         self.whatsapp_config = self.config.get('whatsapp', {})
     
+    def get_renderer(self, channel: str) -> AlertRenderer:
+        """Alert renderer for a channel, compiled once per manager"""
+        renderer = self._renderers.get(channel)
+        if renderer is None:
+            renderer = self._renderers[channel] = AlertRenderer(channel, self.locale)
+        return renderer
+    
+    @metrics.timed(NOTIFICATION_SECONDS, NOTIFICATIONS_SENT, channel='email')
     def send_email(self, to_email: str, subject: str, message: str, html: bool = True):
         """Send email notification"""
         try:
@@ -50,6 +73,7 @@ class NotificationManager:
             print(f"Email sending failed: {e}")
             return False
     
+    @metrics.timed(NOTIFICATION_SECONDS, NOTIFICATIONS_SENT, channel='telegram')
     def send_telegram(self, chat_id: str, message: str):
         """Send Telegram notification"""
         try:
@@ -70,6 +94,7 @@ class NotificationManager:
             print(f"Telegram sending failed: {e}")
             return False
     
+    @metrics.timed(NOTIFICATION_SECONDS, NOTIFICATIONS_SENT, channel='whatsapp')
     def send_whatsapp(self, phone: str, message: str):
         """Send WhatsApp notification via WhatsApp Business API"""
         try:
@@ -86,134 +111,120 @@ class NotificationManager:
             print(f"WhatsApp sending failed: {e}")
             return False
     
-    def create_expiry_alert(self, item: Dict[str, Any], days_left: int) -> Dict[str, str]:
+    def create_expiry_alert(self, item: Dict[str, Any], days_left: int,
+                            channel: str = 'telegram') -> Dict[str, str]:
         """Create formatted expiry alert"""
-        if days_left <= 0:
-            urgency = "منتهية"
-            emoji = "🔴"
-            action = "فوري"
-        elif days_left <= 7:
-            urgency = "عاجلة"
-            emoji = "🟠"
-            action = "خلال أسبوع"
-        elif days_left <= 30:
-            urgency = "قريبة"
-            emoji = "🟡"
-            action = "خلال شهر"
-        else:
-            urgency = "مخططة"
-            emoji = "🟢"
-            action = "مراقبة"
+        return self.get_renderer(channel).render(item, days_left)
+    
+    def send_bulk_notifications(self, items: List[Dict[str, Any]], notification_config: Dict[str, Any],
+                                ledger: AlertLedger = None):
+        """Send bulk notifications for multiple items.
         
-        message = f"""
-{emoji} <b>تنبيه انتهاء الصلاحية</b>
-
-<b>العنصر:</b> {item['title']}
-<b>الفئة:</b> {item['category']}
-<b>تاريخ الانتهاء:</b> {item['expiry_date']}
-<b>الأيام المتبقية:</b> {days_left} يوم
-<b>الأولوية:</b> {urgency}
-<b>الإجراء المطلوب:</b> {action}
-
-المصدر: {item['source']}
+        With a ledger, only alerts this call manages to claim are sent, and
+        each is recorded as sent or released again when rendering or sending
+        fails, so a later run retries it.
         """
-        
-        return {
-            'subject': f"تنبيه: {item['title']} - {urgency}",
-            'message': message,
-            'urgency': urgency
-        }
-    
-    def send_bulk_notifications(self, items: List[Dict[str, Any]], notification_config: Dict[str, Any]):
-        """Send bulk notifications for multiple items"""
         results = []
         
-        for item in items:
-            days_left = int(item['days_remaining'])
-            alert = self.create_expiry_alert(item, days_left)
-            
-            # Send based on configuration
-            if notification_config.get('email', {}).get('enabled'):
-                email_result = self.send_email(
-                    notification_config['email']['to'],
-                    alert['subject'],
-                    alert['message']
-                )
-                results.append({'type': 'email', 'success': email_result})
-            
-            if notification_config.get('telegram', {}).get('enabled'):
-                telegram_result = self.send_telegram(
-                    notification_config['telegram']['chat_id'],
-                    alert['message']
-                )
-                results.append({'type': 'telegram', 'success': telegram_result})
-            
-            if notification_config.get('whatsapp', {}).get('enabled'):
-                whatsapp_result = self.send_whatsapp(
-                    notification_config['whatsapp']['phone'],
-                    alert['message']
-                )
-                results.append({'type': 'whatsapp', 'success': whatsapp_result})
+        # (channel, send function, recipient key) of every enabled channel
+        senders = [
+            (channel, send, notification_config[channel][recipient])
+            for channel, send, recipient in (
+                ('email', lambda to, alert: self.send_email(to, alert['subject'], alert['message']), 'to'),
+                ('telegram', lambda chat_id, alert: self.send_telegram(chat_id, alert['message']), 'chat_id'),
+                ('whatsapp', lambda phone, alert: self.send_whatsapp(phone, alert['message']), 'phone'),
+            )
+            if notification_config.get(channel, {}).get('enabled')
+        ]
+        if not senders or not items:
+            return results
+        
+        days_left = [int(item['days_remaining']) for item in items]
+        
+        # (item index, channel) pairs to send; with a ledger, only the claimed ones
+        keys = {}
+        if ledger is None:
+            pending = [(index, channel) for index in range(len(items)) for channel, _, _ in senders]
+        else:
+            keys = {channel: ledger.keys(items, days_left, channel) for channel, _, _ in senders}
+            claimed = ledger.claim([key for channel_keys in keys.values() for key in channel_keys])
+            pending = [(index, channel) for index in range(len(items)) for channel, _, _ in senders
+                       if keys[channel][index] in claimed]
         
+        # Claims not marked sent by the end, including after an exception, are released for a retry
+        sent = []
+        try:
+            # Each channel renders the items it sends once, with its own markup and escaping
+            rendered = {}
+            for channel, _, _ in senders:
+                indices = [index for index, pending_channel in pending if pending_channel == channel]
+                alerts = self.get_renderer(channel).render_batch(
+                    [items[index] for index in indices], [days_left[index] for index in indices])
+                rendered.update(((index, channel), alert) for index, alert in zip(indices, alerts))
+            
+            send_by_channel = {channel: (send, recipient) for channel, send, recipient in senders}
+            for index, channel in pending:
+                send, recipient = send_by_channel[channel]
+                try:
+                    success = send(recipient, rendered[index, channel])
+                except Exception as e:
+                    print(f"{channel} sending failed: {e}")
+                    success = False
+                results.append({'type': channel, 'success': success})
+                if success and ledger is not None:
+                    sent.append(keys[channel][index])
+        finally:
+            if ledger is not None:
+                done = set(sent)
+                ledger.finish(sent, [keys[channel][index] for index, channel in pending
+                                     if keys[channel][index] not in done])
         return results
     
     def schedule_daily_notifications(self, tracker, notification_config: Dict[str, Any]):
         """Schedule daily notifications for upcoming expirations"""
-        upcoming = tracker.get_upcoming_expirations(30)
+        upcoming = tracker.get_upcoming_records(30, expand_recurring=True)
+        today = clock.today()
+        urgent_items = [item for item in upcoming if item.days_until(today) <= 30]
         
-        if not upcoming.empty:
-            urgent_items = upcoming[upcoming['days_remaining'] <= 30]
-            
-            if not urgent_items.empty:
-                return self.send_bulk_notifications(
-                    urgent_items.to_dict('records'),
-                    notification_config
-                )
+        if urgent_items:
+            # The ledger keeps repeated or overlapping runs from re-sending an alert
+            return self.send_bulk_notifications(urgent_items, notification_config, AlertLedger(tracker))
         
         return []
 
 # Notification templates
 class NotificationTemplates:
     @staticmethod
-    def weekly_summary(items: List[Dict[str, Any]]) -> str:
+    def weekly_summary(items: List[Dict[str, Any]], channel: str = 'telegram', locale: str = None) -> str:
         """Create weekly summary notification"""
-        total_items = len(items)
-        urgent_count = sum(1 for item in items if item['days_remaining'] <= 7)
-        warning_count = sum(1 for item in items if 7 < item['days_remaining'] <= 30)
-        
-        message = f"""
-📊 <b>ملخص أسبوعي لتنبيهات الانتهاء</b>
-
-إجمالي العناصر: {total_items}
-عناصر عاجلة: {urgent_count}
-عناصر تحت المراقبة: {warning_count}
-
-<b>أهم العناصر:</b>
-"""
-        
-        for item in items[:5]:
-            days_left = int(item['days_remaining'])
-            emoji = "🔴" if days_left <= 7 else "🟡"
-            message += f"\n{emoji} {item['title']} - {days_left} يوم"
-        
-        return message
+        days = np.fromiter((item['days_remaining'] for item in items), dtype=float, count=len(items))
+        urgent_count = int(np.count_nonzero(days <= 7))
+        warning_count = int(np.count_nonzero((days > 7) & (days <= 30)))
+        top_items = [(item['title'], int(item['days_remaining'])) for item in items[:5]]
+        return NotificationTemplates.format_weekly_summary(
+            len(items), urgent_count, warning_count, top_items, channel, locale)
+    
+    @staticmethod
+    def format_weekly_summary(total_items: int, urgent_count: int, warning_count: int, top_items,
+                              channel: str = 'telegram', locale: str = None) -> str:
+        """Weekly summary from precomputed counts and (title, days left) pairs"""
+        return message_templates.weekly_summary(
+            total_items, urgent_count, warning_count, top_items,
+            channel, locale or message_templates.DEFAULT_LOCALE)
     
     @staticmethod
-    def monthly_report(items: List[Dict[str, Any]]) -> str:
+    def monthly_report(items: List[Dict[str, Any]], channel: str = 'telegram', locale: str = None) -> str:
         """Create monthly report"""
         categories = {}
         for item in items:
             cat = item['category']
             categories[cat] = categories.get(cat, 0) + 1
         
-        message = f"""
-📈 <b>تقرير شهري لتنبيهات الانتهاء</b>
-
-<b>إجمالي العناصر:</b> {len(items)}
-<b>التصنيفات:</b>
-"""
-        
-        for cat, count in categories.items():
-            message += f"\n• {cat}: {count} عنصر"
-        
-        return message
\ No newline at end of file
+        return NotificationTemplates.format_monthly_report(len(items), categories, channel, locale)
+    
+    @staticmethod
+    def format_monthly_report(total_items: int, categories: Dict[str, int],
+                              channel: str = 'telegram', locale: str = None) -> str:
+        """Monthly report from a precomputed per-category count"""
+        return message_templates.monthly_report(
+            total_items, categories, channel, locale or message_templates.DEFAULT_LOCALE)
@@ -0,0 +1,38 @@
+# periodic.py - خيط خلفي يشغّل مهمة على فترات منتظمة
+import threading
+from typing import Callable
+
+
+class PeriodicWorker:
+    """Daemon thread that calls func every interval_seconds until stop().
+
+    A failing call is printed and retried at the next interval. stopping is
+    set by stop(), so long-running calls can check it and return early.
+    """
+
+    def __init__(self, func: Callable[[], object], name: str, description: str):
+        self.func = func
+        self.name = name
+        self.description = description
+        self.stopping = threading.Event()
+        self._thread = None
+
+    def start(self, interval_seconds: float):
+        def loop():
+            while not self.stopping.is_set():
+                try:
+                    self.func()
+                except Exception as e:
+                    print(f"{self.description} failed: {e}")
+                self.stopping.wait(interval_seconds)
+
+        self.stopping.clear()
+        self._thread = threading.Thread(target=loop, name=self.name, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.stopping.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
@@ -0,0 +1,119 @@
+# query_cache.py - ذاكرة مؤقتة (LRU) لنتائج الاستعلامات المتكررة
+import copy
+import functools
+import inspect
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable
+
+import clock
+
+# Returned by QueryCache.get for absent or expired keys (None is a valid cached value)
+MISSING = object()
+
+
+def _copy(value):
+    # Callers may modify returned DataFrames/dicts; the cached value must stay intact
+    if hasattr(value, 'copy') and not isinstance(value, dict):
+        return value.copy()
+    return copy.deepcopy(value)
+
+
+class QueryCache:
+    """Bounded, thread-safe LRU cache with optional TTL that empties on date rollover"""
+
+    def __init__(self, maxsize: int = 128, ttl: float = None):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries: 'OrderedDict[Hashable, tuple]' = OrderedDict()
+        self._lock = threading.RLock()
+        self._day = clock.today()
+        # Bumped on every invalidation so a read racing a write is not stored
+        self._generation = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def _check_rollover(self):
+        today = clock.today()
+        if today != self._day:
+            self._day = today
+            self._clear()
+
+    def _clear(self):
+        self._entries.clear()
+        self._generation += 1
+        self.invalidations += 1
+
+    def get(self, key: Hashable):
+        with self._lock:
+            self._check_rollover()
+            entry = self._entries.get(key)
+            if entry is None or (self.ttl is not None and time.monotonic() - entry[1] > self.ttl):
+                if entry is not None:
+                    del self._entries[key]
+                self.misses += 1
+                return MISSING, self._generation
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0], self._generation
+
+    def put(self, key: Hashable, value: Any, generation: int):
+        with self._lock:
+            if generation != self._generation:
+                return
+            self._entries[key] = (value, time.monotonic())
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, predicate: Callable[[Hashable], bool] = None):
+        """Drop all entries, or only those whose key matches predicate"""
+        with self._lock:
+            if predicate is None:
+                self._clear()
+                return
+            for key in [key for key in self._entries if predicate(key)]:
+                del self._entries[key]
+            self._generation += 1
+            self.invalidations += 1
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'size': len(self._entries),
+                'maxsize': self.maxsize,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_ratio': round(self.hits / lookups, 4) if lookups else 0.0,
+                'evictions': self.evictions,
+                'invalidations': self.invalidations,
+            }
+
+
+def cached_query(method):
+    """Serve an ExpiryTracker read method from self._cache when caching is enabled.
+
+    The key is (method name, ((parameter, value), ...)) with defaults applied,
+    so positional, keyword and omitted arguments share one entry.
+    """
+    signature = inspect.signature(method)
+
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        cache = self._cache
+        if cache is None:
+            return method(self, *args, **kwargs)
+        bound = signature.bind(self, *args, **kwargs)
+        bound.apply_defaults()
+        key = (method.__name__, tuple(list(bound.arguments.items())[1:]))
+        value, generation = cache.get(key)
+        if value is MISSING:
+            value = method(self, *args, **kwargs)
+            cache.put(key, value, generation)
+        return _copy(value)
+    return wrapper
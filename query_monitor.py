@@ -0,0 +1,276 @@
+# query_monitor.py - مراقبة استعلامات SQL وسجل الاستعلامات البطيئة
+import json
+import logging
+import os
+import re
+import sqlite3
+import sys
+import threading
+import time
+from collections import deque
+from datetime import datetime
+from typing import Any, Dict, List
+
+logger = logging.getLogger("expiry_tracker.sql")
+
+# Upper bounds (milliseconds) of the latency histogram buckets
+LATENCY_BUCKETS_MS = (0.5, 1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000)
+
+# Modules that are never reported as the caller of a statement
+_INTERNAL_MODULES = ('query_monitor', 'database', 'sqlite3', 'pandas')
+
+_STRING_LITERAL = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_LITERAL = re.compile(r"\b\d+(?:\.\d+)?\b")
+_IN_LIST = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)")
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_sql(sql: str) -> str:
+    """Collapse whitespace and replace literals so similar statements group together"""
+    sql = _STRING_LITERAL.sub('?', sql)
+    sql = _NUMBER_LITERAL.sub('?', sql)
+    sql = _IN_LIST.sub('(?)', sql)
+    return _WHITESPACE.sub(' ', sql).strip()
+
+
+def find_caller() -> str:
+    """Return 'module.function' of the first frame outside the database layer"""
+    frame = sys._getframe(1)
+    while frame is not None:
+        module = frame.f_globals.get('__name__', '')
+        if module.split('.')[0] not in _INTERNAL_MODULES:
+            code = frame.f_code
+            return f"{module}.{getattr(code, 'co_qualname', code.co_name)}"
+        frame = frame.f_back
+    return 'unknown'
+
+
+class QueryStats:
+    """Aggregated timings for one normalized statement issued from one caller"""
+
+    def __init__(self, sql: str, caller: str):
+        self.sql = sql
+        self.caller = caller
+        self.count = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+        self.rows = 0
+        self.slow_count = 0
+        self.buckets = [0] * (len(LATENCY_BUCKETS_MS) + 1)
+
+    def observe(self, elapsed_ms: float, rows: int, slow: bool):
+        self.count += 1
+        self.total_ms += elapsed_ms
+        self.max_ms = max(self.max_ms, elapsed_ms)
+        self.rows += rows
+        if slow:
+            self.slow_count += 1
+        for index, bound in enumerate(LATENCY_BUCKETS_MS):
+            if elapsed_ms <= bound:
+                self.buckets[index] += 1
+                break
+        else:
+            self.buckets[-1] += 1
+
+    def to_dict(self) -> Dict[str, Any]:
+        labels = [str(bound) for bound in LATENCY_BUCKETS_MS] + ['+Inf']
+        return {
+            'sql': self.sql,
+            'caller': self.caller,
+            'count': self.count,
+            'total_ms': round(self.total_ms, 3),
+            'avg_ms': round(self.total_ms / self.count, 3) if self.count else 0.0,
+            'max_ms': round(self.max_ms, 3),
+            'rows': self.rows,
+            'slow_count': self.slow_count,
+            'histogram_ms': dict(zip(labels, self.buckets)),
+        }
+
+
+class QueryMonitor:
+    """Collects per-statement latency, row counts and slow-query plans"""
+
+    def __init__(self):
+        self.enabled = os.environ.get('EXPIRY_SQL_MONITOR', '') not in ('', '0')
+        self.slow_threshold_ms = float(os.environ.get('EXPIRY_SQL_SLOW_MS', 100))
+        self.slow_log_path = os.environ.get('EXPIRY_SQL_SLOW_LOG') or None
+        self.explain_slow = True
+        self._stats: Dict[tuple, QueryStats] = {}
+        self._slow_queries = deque(maxlen=200)
+        self._lock = threading.Lock()
+
+    def configure(self, enabled: bool = True, slow_threshold_ms: float = None,
+                  slow_log_path: str = None, explain_slow: bool = None):
+        """Enable or tune the monitor at runtime"""
+        self.enabled = enabled
+        if slow_threshold_ms is not None:
+            self.slow_threshold_ms = slow_threshold_ms
+        if slow_log_path is not None:
+            self.slow_log_path = slow_log_path
+        if explain_slow is not None:
+            self.explain_slow = explain_slow
+
+    def reset(self):
+        """Forget all collected statistics"""
+        with self._lock:
+            self._stats.clear()
+            self._slow_queries.clear()
+
+    def record(self, connection: sqlite3.Connection, sql: str, params: Any,
+               caller: str, elapsed_ms: float, rows: int):
+        """Record one finished statement"""
+        normalized = normalize_sql(sql)
+        slow = elapsed_ms >= self.slow_threshold_ms
+        with self._lock:
+            key = (normalized, caller)
+            stats = self._stats.get(key)
+            if stats is None:
+                stats = self._stats[key] = QueryStats(normalized, caller)
+            stats.observe(elapsed_ms, rows, slow)
+
+        if slow:
+            self._log_slow_query(connection, sql, params, normalized, caller, elapsed_ms, rows)
+
+    def _log_slow_query(self, connection, sql, params, normalized, caller, elapsed_ms, rows):
+        plan = self.explain(connection, sql, params) if self.explain_slow else []
+        entry = {
+            'timestamp': datetime.now().isoformat(timespec='seconds'),
+            'sql': normalized,
+            'caller': caller,
+            'elapsed_ms': round(elapsed_ms, 3),
+            'rows': rows,
+            'plan': plan,
+        }
+        with self._lock:
+            self._slow_queries.append(entry)
+            if self.slow_log_path:
+                try:
+                    with open(self.slow_log_path, 'a', encoding='utf-8') as f:
+                        f.write(json.dumps(entry, ensure_ascii=False) + '\n')
+                except OSError as e:
+                    logger.warning("Could not write slow query log: %s", e)
+
+        logger.warning("Slow query (%.1f ms, %d rows) from %s: %s | plan: %s",
+                       elapsed_ms, rows, caller, normalized, ' / '.join(plan))
+
+    @staticmethod
+    def explain(connection: sqlite3.Connection, sql: str, params: Any = ()) -> List[str]:
+        """Return the EXPLAIN QUERY PLAN lines for a statement"""
+        if not sql.lstrip().upper().startswith(('SELECT', 'WITH', 'UPDATE', 'DELETE', 'INSERT')):
+            return []
+        try:
+            # A plain cursor is used so the EXPLAIN itself is not recorded
+            cursor = sqlite3.Cursor(connection)
+            cursor.execute('EXPLAIN QUERY PLAN ' + sql, params or ())
+            return [row[3] for row in cursor.fetchall()]
+        except sqlite3.Error as e:
+            return [f'EXPLAIN failed: {e}']
+
+    def get_stats(self) -> List[Dict[str, Any]]:
+        """Return collected statistics, slowest total time first"""
+        with self._lock:
+            stats = [s.to_dict() for s in self._stats.values()]
+        return sorted(stats, key=lambda s: s['total_ms'], reverse=True)
+
+    def get_slow_queries(self) -> List[Dict[str, Any]]:
+        """Return the most recent slow queries"""
+        with self._lock:
+            return list(self._slow_queries)
+
+    def dump(self, path: str = 'data/query_stats.json') -> str:
+        """Write statistics and slow queries to a JSON file"""
+        report = {
+            'generated_at': datetime.now().isoformat(timespec='seconds'),
+            'slow_threshold_ms': self.slow_threshold_ms,
+            'queries': self.get_stats(),
+            'slow_queries': self.get_slow_queries(),
+        }
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        return path
+
+
+class MonitoredCursor(sqlite3.Cursor):
+    """Cursor that times each statement, including fetching its rows"""
+
+    _pending = None
+
+    def execute(self, sql, parameters=()):
+        self._finish()
+        caller = find_caller()
+        start = time.perf_counter()
+        result = super().execute(sql, parameters)
+        self._begin(sql, parameters, caller, start)
+        return result
+
+    def executemany(self, sql, seq_of_parameters):
+        self._finish()
+        caller = find_caller()
+        start = time.perf_counter()
+        result = super().executemany(sql, seq_of_parameters)
+        self._begin(sql, (), caller, start)
+        return result
+
+    def _begin(self, sql, parameters, caller, start):
+        elapsed = time.perf_counter() - start
+        self._pending = [sql, parameters, caller, elapsed, 0]
+        if self.description is None:
+            # Statements without a result set are complete after execute()
+            self._pending[4] = max(self.rowcount, 0)
+            self._finish()
+
+    def _fetched(self, start, rows, exhausted):
+        if self._pending is not None:
+            self._pending[3] += time.perf_counter() - start
+            self._pending[4] += rows
+            if exhausted:
+                self._finish()
+
+    def _finish(self):
+        pending, self._pending = self._pending, None
+        if pending is not None:
+            sql, parameters, caller, elapsed, rows = pending
+            monitor.record(self.connection, sql, parameters, caller, elapsed * 1000, rows)
+
+    def fetchone(self):
+        start = time.perf_counter()
+        row = super().fetchone()
+        self._fetched(start, 0 if row is None else 1, row is None)
+        return row
+
+    def fetchmany(self, size=None):
+        size = self.arraysize if size is None else size
+        start = time.perf_counter()
+        rows = super().fetchmany(size)
+        self._fetched(start, len(rows), len(rows) < size)
+        return rows
+
+    def fetchall(self):
+        start = time.perf_counter()
+        rows = super().fetchall()
+        self._fetched(start, len(rows), True)
+        return rows
+
+    def __next__(self):
+        start = time.perf_counter()
+        try:
+            row = super().__next__()
+        except StopIteration:
+            self._fetched(start, 0, True)
+            raise
+        self._fetched(start, 1, False)
+        return row
+
+    def close(self):
+        self._finish()
+        super().close()
+
+    def __del__(self):
+        try:
+            self._finish()
+        except Exception:
+            pass
+
+
+# Process-wide monitor used by database.connect()
+monitor = QueryMonitor()
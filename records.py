@@ -0,0 +1,113 @@
+# records.py - تمثيل مضغوط للعناصر في الذاكرة
+"""Compact in-memory representation of expiry items.
+
+ExpiryItem is a slotted record used by the code paths that walk items one by
+one (dashboard, notifications, recommendations) instead of pandas rows or
+dict(sqlite3.Row). Category, source, priority and status are interned so the
+few distinct labels are shared across all records, and dates are kept as
+integer ordinals. Records still support item['title'] style access so they
+can be passed to code written against row dicts.
+"""
+import sys
+from datetime import date
+from typing import Any, Dict
+
+import clock
+
+_intern = sys.intern
+
+
+def _ordinal(value) -> int:
+    if value is None or isinstance(value, int):
+        return value
+    if isinstance(value, date):
+        return value.toordinal()
+    return date.fromisoformat(str(value)[:10]).toordinal()
+
+
+def _label(value):
+    return _intern(value) if isinstance(value, str) else value
+
+
+class ExpiryItem:
+    """Slotted expiry item with interned labels and ordinal dates"""
+
+    __slots__ = ('id', 'title', 'category', 'expiry_ordinal', 'source', 'source_url',
+                 'description', 'status', 'priority', 'days_before_alert',
+                 'recurrence_rule', 'recurrence_anchor', 'recurrence_until', 'occurrence')
+
+    # Column order expected by row_factory; keep in sync with __init__
+    COLUMNS = ('id', 'title', 'category', 'expiry_date', 'source', 'source_url',
+               'description', 'status', 'priority', 'days_before_alert',
+               'recurrence_rule', 'recurrence_anchor', 'recurrence_until')
+    SELECT = ', '.join(COLUMNS)
+
+    def __init__(self, id, title, category, expiry_date, source, source_url=None,
+                 description=None, status='active', priority='medium', days_before_alert=30,
+                 recurrence_rule=None, recurrence_anchor=None, recurrence_until=None,
+                 occurrence=None):
+        self.id = id
+        self.title = title
+        self.category = _label(category)
+        self.expiry_ordinal = _ordinal(expiry_date)
+        self.source = _label(source)
+        self.source_url = source_url
+        self.description = description
+        self.status = _label(status)
+        self.priority = _label(priority)
+        self.days_before_alert = days_before_alert
+        self.recurrence_rule = _label(recurrence_rule)
+        self.recurrence_anchor = recurrence_anchor
+        self.recurrence_until = recurrence_until
+        self.occurrence = occurrence
+
+    @staticmethod
+    def row_factory(cursor, row) -> 'ExpiryItem':
+        """sqlite3 row factory for queries selecting ExpiryItem.SELECT"""
+        return ExpiryItem(*row)
+
+    @classmethod
+    def from_mapping(cls, mapping) -> 'ExpiryItem':
+        return cls(*(mapping.get(column) for column in cls.COLUMNS),
+                   occurrence=mapping.get('occurrence'))
+
+    @property
+    def expiry(self) -> date:
+        return date.fromordinal(self.expiry_ordinal)
+
+    @property
+    def expiry_date(self) -> str:
+        return date.fromordinal(self.expiry_ordinal).isoformat()
+
+    def days_until(self, today: date = None) -> int:
+        today = today or clock.today()
+        return self.expiry_ordinal - today.toordinal()
+
+    @property
+    def days_remaining(self) -> int:
+        return self.days_until()
+
+    def with_expiry(self, expiry: date, occurrence: int) -> 'ExpiryItem':
+        """Copy of this item for a later recurrence cycle"""
+        return ExpiryItem(self.id, self.title, self.category, expiry, self.source, self.source_url,
+                          self.description, self.status, self.priority, self.days_before_alert,
+                          self.recurrence_rule, self.recurrence_anchor, self.recurrence_until,
+                          occurrence)
+
+    def __getitem__(self, key: str) -> Any:
+        try:
+            return getattr(self, key)
+        except AttributeError:
+            raise KeyError(key)
+
+    def get(self, key: str, default=None) -> Any:
+        return getattr(self, key, default)
+
+    def to_dict(self) -> Dict[str, Any]:
+        item = {column: getattr(self, column) for column in self.COLUMNS}
+        if self.occurrence is not None:
+            item['occurrence'] = self.occurrence
+        return item
+
+    def __repr__(self):
+        return f"ExpiryItem(id={self.id!r}, title={self.title!r}, expiry_date={self.expiry_date!r})"
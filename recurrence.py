@@ -0,0 +1,88 @@
+# recurrence.py - قواعد التكرار للعناصر المتجددة (تأشيرات، استمارات، تأمين...)
+import re
+from datetime import date, datetime
+from typing import Iterator, Optional
+
+from dateutil.relativedelta import relativedelta
+
+_NAMED_RULES = {
+    'yearly': ('years', 1),
+    'semiannual': ('months', 6),
+    'quarterly': ('months', 3),
+    'monthly': ('months', 1),
+    'weekly': ('days', 7),
+}
+_CUSTOM_RULE = re.compile(r'^(days|weeks|months|years):(\d+)$')
+
+
+def _to_date(value) -> date:
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    return datetime.strptime(str(value)[:10], '%Y-%m-%d').date()
+
+
+class RecurrenceRule:
+    """A fixed renewal cycle: 'yearly', 'monthly', 'quarterly', or 'days:N' / 'months:N' / 'years:N'"""
+
+    def __init__(self, unit: str, interval: int):
+        if interval < 1:
+            raise ValueError("Recurrence interval must be at least 1")
+        if unit == 'weeks':
+            unit, interval = 'days', interval * 7
+        self.unit = unit
+        self.interval = interval
+
+    @classmethod
+    def parse(cls, text: str) -> 'RecurrenceRule':
+        text = (text or '').strip().lower()
+        if text in _NAMED_RULES:
+            return cls(*_NAMED_RULES[text])
+        match = _CUSTOM_RULE.match(text)
+        if not match:
+            raise ValueError(f"Invalid recurrence rule: {text!r}")
+        return cls(match.group(1), int(match.group(2)))
+
+    def __str__(self):
+        return f'{self.unit}:{self.interval}'
+
+    def nth(self, anchor: date, n: int) -> date:
+        """The n-th occurrence counted from the anchor (no month-end drift)"""
+        return anchor + relativedelta(**{self.unit: self.interval * n})
+
+    def _index_after(self, anchor: date, after: date) -> int:
+        """Smallest n with nth(anchor, n) > after"""
+        if self.unit == 'days':
+            n = max((after - anchor).days // self.interval + 1, 0)
+        else:
+            months = (after.year - anchor.year) * 12 + after.month - anchor.month
+            step = self.interval * (12 if self.unit == 'years' else 1)
+            n = max(months // step - 1, 0)
+        while self.nth(anchor, n) <= after:
+            n += 1
+        return n
+
+    def next_after(self, anchor, after) -> date:
+        """First occurrence strictly after the given date"""
+        anchor, after = _to_date(anchor), _to_date(after)
+        return self.nth(anchor, self._index_after(anchor, after))
+
+    def occurrences(self, anchor, start, end, until=None) -> Iterator[date]:
+        """Lazily yield occurrences in [start, end], stopping at the optional until date"""
+        anchor, start, end = _to_date(anchor), _to_date(start), _to_date(end)
+        if until is not None:
+            end = min(end, _to_date(until))
+        n = self._index_after(anchor, start - relativedelta(days=1))
+        occurrence = self.nth(anchor, n)
+        while occurrence <= end:
+            yield occurrence
+            n += 1
+            occurrence = self.nth(anchor, n)
+
+
+def parse_rule(text: Optional[str]) -> Optional[RecurrenceRule]:
+    """Parse a stored rule, treating empty values as non-recurring"""
+    if not text:
+        return None
+    return RecurrenceRule.parse(text)
@@ -0,0 +1,320 @@
+# reports.py - محرك التقارير: مسح واحد للعناصر وبناء عدة تقارير بالتوازي
+"""Report engine for the nightly report job.
+
+Active items are read once into ItemColumns: parallel numpy arrays with the
+category, source, priority and status-bucket labels dictionary-encoded as
+small integer codes. Every report is a function over those arrays, so a run
+that needs category counts, urgency tiers, the soonest items and the
+per-source breakdown pays for one scan instead of one query each.
+
+Fan-out (one report set per tenant, category or recipient) is expressed as
+ReportJobs with label filters. With workers > 1 the jobs run in a process
+pool whose workers receive the columns once, at start-up.
+
+Usage:
+    python reports.py --db data/expiry_tracker.db --by category --workers 4
+    python reports.py --tenants --by tenant --reports statistics,top_soonest
+"""
+import argparse
+import json
+import os
+import sys
+from typing import Any, Callable, Dict, List, NamedTuple
+
+import numpy as np
+import pandas as pd
+
+import metrics
+import worker_pool
+from notifications import NotificationTemplates
+from status_buckets import BUCKETS
+
+BUILD_SECONDS = metrics.registry.histogram(
+    'expiry_report_build_seconds', 'Time spent scanning items and building a report set')
+
+# Days since 0001-01-01 of 1970-01-01, to turn datetime64[D] into date ordinals
+_EPOCH_ORDINAL = 719163
+
+# Dictionary-encoded label columns: name -> (codes attribute, labels attribute)
+LABEL_FIELDS = {
+    'category': ('category_codes', 'categories'),
+    'source': ('source_codes', 'sources'),
+    'priority': ('priority_codes', 'priorities'),
+    'bucket': ('bucket_codes', 'buckets'),
+    'tenant': ('tenant_codes', 'tenants'),
+}
+
+
+def _encode(values, labels=None):
+    codes, uniques = pd.factorize(np.asarray(values, dtype=object), sort=True)
+    if labels is None:
+        return codes.astype(np.int32), [str(label) for label in uniques]
+    # Fixed label order (e.g. buckets); unknown values get -1
+    index = {label: code for code, label in enumerate(labels)}
+    return np.array([index.get(value, -1) for value in uniques], dtype=np.int32)[codes], list(labels)
+
+
+class ItemColumns:
+    """Active items as parallel arrays with dictionary-encoded labels"""
+
+    def __init__(self, ids, titles, expiry_ordinals, days_left, categories, sources, priorities,
+                 buckets, tenant: str = ''):
+        self.ids = np.asarray(ids, dtype=np.int64)
+        self.titles = np.asarray(titles, dtype=object)
+        self.expiry_ordinals = np.asarray(expiry_ordinals, dtype=np.int64)
+        self.days_left = np.asarray(days_left, dtype=np.int64)
+        self.category_codes, self.categories = _encode(categories)
+        self.source_codes, self.sources = _encode(sources)
+        self.priority_codes, self.priorities = _encode(priorities)
+        self.bucket_codes, self.buckets = _encode(buckets, BUCKETS)
+        self.tenant_codes = np.zeros(len(self.ids), dtype=np.int32)
+        self.tenants = [tenant]
+
+    def __len__(self):
+        return len(self.ids)
+
+    @classmethod
+    def scan(cls, tracker, tenant: str = '') -> 'ItemColumns':
+        """Read all active items of a tracker in one query (from its snapshot if it has one)"""
+        tracker.refresh_status_projection()
+        tracker = tracker.analytics()
+        conn = tracker.get_connection()
+        rows = conn.execute('''
+            SELECT id, title, expiry_date, days_left, category, source, priority, status_bucket
+            FROM expiry_items WHERE status = 'active'
+        ''').fetchall()
+        conn.close()
+
+        if not rows:
+            return cls([], [], [], [], [], [], [], [], tenant)
+        ids, titles, expiry_dates, days_left, categories, sources, priorities, buckets = zip(*rows)
+        ordinals = np.array(expiry_dates, dtype='datetime64[D]').astype(np.int64) + _EPOCH_ORDINAL
+        return cls(ids, titles, ordinals, days_left, categories, sources, priorities, buckets, tenant)
+
+    @classmethod
+    def concat(cls, parts: Dict[str, 'ItemColumns']) -> 'ItemColumns':
+        """Stack per-tenant columns; the tenant id becomes a label column"""
+        def labels(part, field):
+            codes_attr, labels_attr = LABEL_FIELDS[field]
+            return np.asarray(getattr(part, labels_attr), dtype=object)[getattr(part, codes_attr)]
+
+        parts = {tenant: part for tenant, part in parts.items() if len(part)}
+        if not parts:
+            return cls([], [], [], [], [], [], [], [])
+        merged = cls(
+            np.concatenate([p.ids for p in parts.values()]),
+            np.concatenate([p.titles for p in parts.values()]),
+            np.concatenate([p.expiry_ordinals for p in parts.values()]),
+            np.concatenate([p.days_left for p in parts.values()]),
+            *(np.concatenate([labels(p, field) for p in parts.values()])
+              for field in ('category', 'source', 'priority', 'bucket')),
+        )
+        merged.tenant_codes, merged.tenants = _encode(
+            np.concatenate([np.full(len(p), tenant, dtype=object) for tenant, p in parts.items()]))
+        return merged
+
+    def mask(self, filters: Dict[str, Any]) -> np.ndarray:
+        """Boolean mask for label filters such as {'category': ['العقود'], 'tenant': 'acme'}"""
+        mask = np.ones(len(self), dtype=bool)
+        for field, wanted in (filters or {}).items():
+            codes_attr, labels_attr = LABEL_FIELDS[field]
+            wanted = [wanted] if isinstance(wanted, str) else wanted
+            labels = getattr(self, labels_attr)
+            wanted_codes = [labels.index(value) for value in wanted if value in labels]
+            mask &= np.isin(getattr(self, codes_attr), wanted_codes)
+        return mask
+
+
+# Registered reports: name -> function(columns, mask, **params)
+REPORTS: Dict[str, Callable] = {}
+
+
+def report(name: str):
+    """Register a report built from ItemColumns and a row mask"""
+    def decorator(func):
+        REPORTS[name] = func
+        return func
+    return decorator
+
+
+def _label_counts(codes, labels, mask) -> Dict[str, int]:
+    counts = np.bincount(codes[mask], minlength=len(labels))
+    return {label: int(count) for label, count in zip(labels, counts) if count}
+
+
+def _soonest(cols, mask, limit: int) -> np.ndarray:
+    """Indexes of the limit rows with the smallest (expiry, id) among mask"""
+    candidates = np.flatnonzero(mask)
+    if len(candidates) > limit:
+        keep = np.argpartition(cols.expiry_ordinals[candidates], limit - 1)[:limit]
+        candidates = candidates[keep]
+    order = np.lexsort((cols.ids[candidates], cols.expiry_ordinals[candidates]))
+    return candidates[order]
+
+
+@report('by_category')
+def category_counts(cols, mask):
+    return _label_counts(cols.category_codes, cols.categories, mask)
+
+
+@report('by_source')
+def source_breakdown(cols, mask):
+    """Per source: total and per-bucket counts"""
+    width = len(cols.buckets)
+    cells = np.bincount(cols.source_codes[mask] * width + cols.bucket_codes[mask],
+                        minlength=len(cols.sources) * width).reshape(len(cols.sources), width)
+    return {
+        source: {'total': int(row.sum()), **{bucket: int(n) for bucket, n in zip(cols.buckets, row) if n}}
+        for source, row in zip(cols.sources, cells) if row.any()
+    }
+
+
+@report('urgency_tiers')
+def urgency_tiers(cols, mask):
+    counts = np.bincount(cols.bucket_codes[mask], minlength=len(cols.buckets))
+    return {bucket: int(count) for bucket, count in zip(cols.buckets, counts)}
+
+
+@report('top_soonest')
+def top_soonest(cols, mask, limit: int = 10, include_overdue: bool = False):
+    if not include_overdue:
+        mask = mask & (cols.days_left >= 0)
+    return [
+        {
+            'id': int(cols.ids[i]),
+            'title': cols.titles[i],
+            'category': cols.categories[cols.category_codes[i]],
+            'tenant': cols.tenants[cols.tenant_codes[i]],
+            'days_left': int(cols.days_left[i]),
+        }
+        for i in _soonest(cols, mask, limit)
+    ]
+
+
+@report('statistics')
+def statistics(cols, mask):
+    tiers = urgency_tiers(cols, mask)
+    return {
+        'active_items': int(mask.sum()),
+        'overdue_items': tiers['overdue'],
+        'expiring_soon': tiers['week'],
+        'by_bucket': {bucket: count for bucket, count in tiers.items() if count},
+        'by_category': category_counts(cols, mask),
+    }
+
+
+@report('weekly_summary')
+def weekly_summary(cols, mask, days: int = 30):
+    """NotificationTemplates.weekly_summary over items due within days"""
+    upcoming = mask & (cols.days_left <= days)
+    top = _soonest(cols, upcoming, 5)
+    return NotificationTemplates.format_weekly_summary(
+        int(upcoming.sum()),
+        int((upcoming & (cols.days_left <= 7)).sum()),
+        int((upcoming & (cols.days_left > 7)).sum()),
+        [(cols.titles[i], int(cols.days_left[i])) for i in top],
+    )
+
+
+@report('monthly_report')
+def monthly_report(cols, mask, days: int = 30):
+    """NotificationTemplates.monthly_report over items due within days"""
+    upcoming = mask & (cols.days_left <= days)
+    return NotificationTemplates.format_monthly_report(
+        int(upcoming.sum()), _label_counts(cols.category_codes, cols.categories, upcoming))
+
+
+class ReportJob(NamedTuple):
+    """One report set: key identifies the recipient/tenant, filters select its rows"""
+    key: str
+    reports: Dict[str, Dict[str, Any]]
+    filters: Dict[str, Any] = {}
+
+
+def build_reports(cols: ItemColumns, job: ReportJob) -> Dict[str, Any]:
+    mask = cols.mask(job.filters)
+    return {name: REPORTS[name](cols, mask, **(params or {})) for name, params in job.reports.items()}
+
+
+def _run_job(job: ReportJob):
+    return job.key, build_reports(worker_pool.shared(), job)
+
+
+def _run_job_inline(cols: ItemColumns, job: ReportJob):
+    return job.key, build_reports(cols, job)
+
+
+class ReportEngine:
+    """Builds many report sets from one scan, in parallel when workers > 1"""
+
+    def __init__(self, workers: int = None, min_jobs_per_worker: int = 2):
+        self.workers = workers if workers is not None else (os.cpu_count() or 1)
+        # Small fan-outs are cheaper inline than starting processes
+        self.min_jobs_per_worker = min_jobs_per_worker
+
+    def scan(self, tracker) -> ItemColumns:
+        return ItemColumns.scan(tracker)
+
+    def scan_tenants(self, router, tenants: List[str] = None) -> ItemColumns:
+        """One scan per tenant shard, stacked with a tenant label column"""
+        return ItemColumns.concat(router.map_tenants(lambda tracker: ItemColumns.scan(tracker), tenants))
+
+    @staticmethod
+    def jobs_by(cols: ItemColumns, field: str, reports: Dict[str, Dict[str, Any]]) -> List[ReportJob]:
+        """One job per distinct label of field (tenant, category, source, ...)"""
+        labels = getattr(cols, LABEL_FIELDS[field][1])
+        return [ReportJob(label, reports, {field: label}) for label in labels]
+
+    def run(self, cols: ItemColumns, jobs: List[ReportJob]) -> Dict[str, Dict[str, Any]]:
+        """Build every job's reports; returns {job key: {report name: result}}"""
+        with BUILD_SECONDS.time():
+            workers = min(self.workers, len(jobs) // max(self.min_jobs_per_worker, 1))
+            if workers <= 1:
+                return dict(_run_job_inline(cols, job) for job in jobs)
+            with worker_pool.executor(workers, cols) as pool:
+                return dict(pool.map(_run_job, jobs, chunksize=max(1, len(jobs) // (workers * 4))))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Nightly report job')
+    parser.add_argument('--db', default='data/expiry_tracker.db')
+    parser.add_argument('--tenants', action='store_true', help='scan every tenant shard instead of --db')
+    parser.add_argument('--reports', default=','.join(REPORTS), help='comma separated report names')
+    parser.add_argument('--by', default='', help='one report set per tenant, category, source or priority')
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--output', default='', help='write the reports as JSON')
+    parser.add_argument('--snapshot', action='store_true', help='read from a read-only snapshot of --db')
+    args = parser.parse_args(argv)
+
+    unknown = set(filter(None, args.reports.split(','))) - set(REPORTS)
+    if unknown:
+        parser.error(f"unknown reports: {', '.join(sorted(unknown))}")
+    reports = {name: {} for name in args.reports.split(',') if name}
+
+    engine = ReportEngine(args.workers)
+    if args.tenants:
+        from tenancy import ShardRouter
+        cols = engine.scan_tenants(ShardRouter())
+    else:
+        from models import ExpiryTracker
+        tracker = ExpiryTracker(args.db)
+        if args.snapshot:
+            from snapshots import SnapshotManager
+            tracker.snapshots = SnapshotManager(tracker)
+        cols = engine.scan(tracker)
+
+    jobs = engine.jobs_by(cols, args.by, reports) if args.by else [ReportJob('all', reports)]
+    results = engine.run(cols, jobs)
+
+    text = json.dumps(results, ensure_ascii=False, indent=2)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(text)
+        print(f"✅ تم إنشاء {len(results)} مجموعة تقارير في {args.output}")
+    else:
+        print(text)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,157 @@
+# search_index.py - فهرس البحث النصي الكامل (FTS5) للعناصر
+import json
+import re
+import sqlite3
+from typing import Iterable
+
+FTS_TABLE = 'expiry_items_fts'
+
+# Metadata keys whose values are searchable (employee, vehicle, policy...)
+SEARCHABLE_METADATA_KEYS = (
+    'employee_id', 'employee_name', 'holder', 'name',
+    'plate_number', 'vehicle_plate', 'policy_number', 'contract_number',
+    'license_number', 'passport_number',
+)
+
+# Harakat (tanween to sukun), superscript alef and tatweel; kept short because
+# the triggers apply them as nested replace() calls and SQLite limits the nesting
+_ARABIC_DIACRITICS = ''.join(map(chr, (*range(0x064b, 0x0653), 0x0670, 0x0640)))
+_ARABIC_LETTERS = {
+    'أ': 'ا', 'إ': 'ا', 'آ': 'ا', 'ٱ': 'ا',
+    'ى': 'ي', 'ئ': 'ي',
+}
+# Every replacement the normalization makes, shared by Python and the SQL triggers
+_REPLACEMENTS = tuple((mark, '') for mark in _ARABIC_DIACRITICS) + tuple(_ARABIC_LETTERS.items())
+_TRANSLATION = str.maketrans(dict(_REPLACEMENTS))
+_TOKEN = re.compile(r'\w+')
+
+
+def normalize_text(text) -> str:
+    """Lowercase, strip Arabic diacritics and unify alef/yaa forms"""
+    if text is None:
+        return ''
+    return str(text).translate(_TRANSLATION).lower()
+
+
+def metadata_text(metadata) -> str:
+    """Normalized values of the searchable metadata keys"""
+    if not metadata:
+        return ''
+    try:
+        data = json.loads(metadata)
+    except (TypeError, ValueError):
+        return ''
+    if not isinstance(data, dict):
+        return ''
+    return ' '.join(normalize_text(data[key]) for key in SEARCHABLE_METADATA_KEYS
+                    if data.get(key) not in (None, ''))
+
+
+def normalize_sql(expr: str) -> str:
+    """SQL expression applying normalize_text's replacements to expr.
+
+    Built from core SQL functions only, so the triggers work on any connection
+    (sqlite3 CLI, migrations, other scripts); case is folded by the tokenizer.
+    """
+    for old, new in _REPLACEMENTS:
+        expr = f"replace({expr}, '{old}', '{new}')"
+    return f"COALESCE({expr}, '')"
+
+
+def metadata_sql(expr: str) -> str:
+    """SQL counterpart of metadata_text for a metadata column"""
+    values = ' || '.join(f"COALESCE(' ' || json_extract({expr}, '$.{key}'), '')"
+                         for key in SEARCHABLE_METADATA_KEYS)
+    return (f"CASE WHEN json_valid({expr}) AND json_type({expr}) = 'object' "
+            f"THEN {normalize_sql(f'ltrim({values})')} ELSE '' END")
+
+
+def build_match_query(query: str) -> str:
+    """Turn free text into an FTS5 query where every term is a prefix match"""
+    tokens = _TOKEN.findall(normalize_text(query))
+    return ' AND '.join(f'"{token}"*' for token in tokens)
+
+
+def _columns(prefix: str) -> str:
+    return (f"{normalize_sql(f'{prefix}.title')}, {normalize_sql(f'{prefix}.description')}, "
+            f"{normalize_sql(f'{prefix}.source')}, {metadata_sql(f'{prefix}.metadata')}")
+
+
+TRIGGERS = ('expiry_items_fts_insert', 'expiry_items_fts_delete', 'expiry_items_fts_update')
+
+
+def create_search_index(cursor: sqlite3.Cursor):
+    """Create the contentless FTS5 table and its sync triggers, indexing existing rows"""
+    cursor.execute("SELECT 1 FROM sqlite_master WHERE name = ?", (FTS_TABLE,))
+    exists = cursor.fetchone() is not None
+
+    # Contentless table: only the index is stored, rows are joined back by id
+    cursor.execute(f'''
+        CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5(
+            title, description, source, metadata,
+            content='', prefix='2 3',
+            tokenize='unicode61 remove_diacritics 2'
+        )
+    ''')
+
+    # Older databases have triggers calling Python functions that plain connections lack
+    cursor.execute(f"""
+        SELECT name FROM sqlite_master WHERE type = 'trigger' AND name IN ({', '.join('?' * len(TRIGGERS))})
+        AND sql LIKE '%fts_normalize(%'
+    """, TRIGGERS)
+    for (name,) in cursor.fetchall():
+        cursor.execute(f"DROP TRIGGER {name}")
+
+    cursor.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS expiry_items_fts_insert
+        AFTER INSERT ON expiry_items BEGIN
+            INSERT INTO {FTS_TABLE} (rowid, title, description, source, metadata)
+            VALUES (NEW.id, {_columns('NEW')});
+        END
+    ''')
+    cursor.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS expiry_items_fts_delete
+        AFTER DELETE ON expiry_items BEGIN
+            INSERT INTO {FTS_TABLE} ({FTS_TABLE}, rowid, title, description, source, metadata)
+            VALUES ('delete', OLD.id, {_columns('OLD')});
+        END
+    ''')
+    cursor.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS expiry_items_fts_update
+        AFTER UPDATE OF title, description, source, metadata ON expiry_items BEGIN
+            INSERT INTO {FTS_TABLE} ({FTS_TABLE}, rowid, title, description, source, metadata)
+            VALUES ('delete', OLD.id, {_columns('OLD')});
+            INSERT INTO {FTS_TABLE} (rowid, title, description, source, metadata)
+            VALUES (NEW.id, {_columns('NEW')});
+        END
+    ''')
+
+    if not exists:
+        # Title matches weigh most, then metadata, description and source
+        cursor.execute(f"INSERT INTO {FTS_TABLE} ({FTS_TABLE}, rank) VALUES ('rank', 'bm25(10.0, 2.0, 1.0, 5.0)')")
+        rebuild_search_index(cursor)
+
+
+def rebuild_search_index(cursor: sqlite3.Cursor):
+    """Re-index every row, e.g. after changing the normalization rules"""
+    cursor.execute(f"INSERT INTO {FTS_TABLE} ({FTS_TABLE}) VALUES ('delete-all')")
+    cursor.execute(f'''
+        INSERT INTO {FTS_TABLE} (rowid, title, description, source, metadata)
+        SELECT id, {_columns('expiry_items')} FROM expiry_items
+    ''')
+
+
+def filter_clause(filters: dict, allowed: Iterable[str]) -> tuple:
+    """Build an AND-ed WHERE fragment for equality and expiry range filters"""
+    clauses, params = [], []
+    for key, value in (filters or {}).items():
+        if key == 'expires_before':
+            clauses.append('e.expiry_date <= ?')
+        elif key == 'expires_after':
+            clauses.append('e.expiry_date >= ?')
+        elif key in allowed:
+            clauses.append(f'e.{key} = ?')
+        else:
+            raise ValueError(f"Unsupported search filter: {key}")
+        params.append(value)
+    return ' AND '.join(clauses), params
@@ -3,28 +3,43 @@ import json
 from datetime import datetime, timedelta
 import os
 
+import clock
+import metrics
+from database import connect
+from records import ExpiryItem
+from status_buckets import bucket_for
+
+RENDER_SECONDS = metrics.registry.histogram(
+    'expiry_dashboard_render_seconds', 'Time spent rendering the HTML dashboard')
+
+# status bucket -> card CSS class, and CSS class -> stats key
+STATUS_CLASSES = {'overdue': 'overdue', 'week': 'expiring', 'month': 'expiring', 'later': 'safe'}
+STATUS_STATS = {'overdue': 'overdue', 'expiring': 'expiring_soon', 'safe': 'safe'}
+
 class SimpleDashboard:
-    def __init__(self):
-        self.db_path = "data/expiry_tracker.db"
+    def __init__(self, db_path: str = "data/expiry_tracker.db", snapshots=None):
+        self.db_path = db_path
+        # Optional SnapshotManager; the dashboard then reads the latest snapshot
+        self.snapshots = snapshots
     
     def get_dashboard_data(self):
         """Get all dashboard data"""
-        conn = sqlite3.connect(self.db_path)
-        conn.row_factory = sqlite3.Row
+        conn = self.snapshots.reader().get_connection() if self.snapshots else connect(self.db_path)
         
         # Get all items
         cursor = conn.cursor()
-        cursor.execute("""
-            SELECT * FROM expiry_items 
+        cursor.row_factory = ExpiryItem.row_factory
+        cursor.execute(f"""
+            SELECT {ExpiryItem.SELECT} FROM expiry_items 
             WHERE status = 'active' 
             ORDER BY expiry_date ASC
         """)
         
         items = cursor.fetchall()
+        conn.close()
         
         # Get statistics
-        today = datetime.now().date()
-        thirty_days = today + timedelta(days=30)
+        today = clock.today()
         
         stats = {
             'total': len(items),
@@ -33,29 +48,16 @@ class SimpleDashboard:
             'safe': 0
         }
         
-        processed_items = []
         for item in items:
-            item_dict = dict(item)
-            expiry_date = datetime.strptime(item_dict['expiry_date'], '%Y-%m-%d').date()
-            days_left = (expiry_date - today).days
-            
-            item_dict['days_left'] = days_left
-            
-            if days_left < 0:
-                stats['overdue'] += 1
-                item_dict['status_class'] = 'overdue'
-            elif days_left <= 30:
-                stats['expiring_soon'] += 1
-                item_dict['status_class'] = 'expiring'
-            else:
-                stats['safe'] += 1
-                item_dict['status_class'] = 'safe'
-            
-            processed_items.append(item_dict)
+            stats[STATUS_STATS[self.status_class(item.days_until(today))]] += 1
         
-        conn.close()
-        return processed_items, stats
+        return items, stats
+    
+    @staticmethod
+    def status_class(days_left: int) -> str:
+        return STATUS_CLASSES[bucket_for(days_left)]
     
+    @metrics.timed(RENDER_SECONDS)
     def generate_html_dashboard(self):
         """Generate HTML dashboard"""
         items, stats = self.get_dashboard_data()
@@ -270,9 +272,12 @@ class SimpleDashboard:
         <div class="items-grid" id="itemsGrid">
         '''
         
+        today = clock.today()
         for item in items:
+            days_left = item.days_until(today)
+            status_class = self.status_class(days_left)
             html += f'''
-            <div class="item-card {item['status_class']}" data-status="{item['status_class']}">
+            <div class="item-card {status_class}" data-status="{status_class}">
                 <div class="item-title">{item['title']}</div>
                 <div class="item-details">
                     <strong>التصنيف:</strong> {item['category']}<br>
@@ -282,8 +287,8 @@ class SimpleDashboard:
                 <div class="item-date">
                     تاريخ الانتهاء: {item['expiry_date']}
                 </div>
-                <div class="days-left {item['status_class']}">
-                    {abs(item['days_left'])} يوم {'متبقي' if item['days_left'] > 0 else 'منذ الانتهاء'}
+                <div class="days-left {status_class}">
+                    {abs(days_left)} يوم {'متبقي' if days_left > 0 else 'منذ الانتهاء'}
                 </div>
             </div>
             '''
@@ -0,0 +1,206 @@
+# snapshots.py - نسخ لحظية للقراءة فقط تخدم القراءات التحليلية الثقيلة
+"""Point-in-time read-only copies of the tracker database.
+
+Training, the dashboard and the report job read every active row; run
+against the live file they hold read locks while scrapers and Streamlit
+write. SnapshotManager copies the database with the online backup API (or
+VACUUM INTO, which also defragments the copy) into snapshot_dir, and
+analytical readers open the newest copy with immutable=1 and a memory map:
+no locks, no change checks, and no contention with ingest.
+
+    manager = SnapshotManager(tracker).start(interval_seconds=900)
+    tracker.snapshots = manager
+    tracker.analytics().get_statistics()   # served from the latest snapshot
+
+Snapshots are taken after the status projection has been rolled over, so
+their days_left / status_bucket values are those of the day they were taken;
+reader() takes a new one when the latest is from an earlier day. A snapshot
+is not pruned while a SnapshotTracker reading it is alive.
+"""
+import glob
+import os
+import pathlib
+import sqlite3
+import threading
+import time
+import weakref
+
+import clock
+import metrics
+from database import connect
+from models import ExpiryTracker
+from periodic import PeriodicWorker
+from status_buckets import get_as_of
+
+SNAPSHOT_SECONDS = metrics.registry.histogram(
+    'expiry_snapshot_seconds', 'Time spent writing a read-only database snapshot')
+
+METHODS = ('backup', 'vacuum')
+
+
+def _read_only(name: str):
+    def method(self, *args, **kwargs):
+        raise RuntimeError(f"{name}: snapshot {self.db_path} is read-only; write through the live tracker")
+    method.__name__ = name
+    return method
+
+
+class SnapshotTracker(ExpiryTracker):
+    """ExpiryTracker reading one snapshot; its write methods fail with a read-only error"""
+
+    def __init__(self, manager: 'SnapshotManager', path: str):
+        # ExpiryTracker.__init__ would create the schema, which needs a writable file
+        self.db_path = path
+        self._pool = None
+        self._projection_day = None
+        self.snapshots = None
+        self.writer = None
+        self._cache = None
+        self._manager = manager
+
+    def get_connection(self):
+        return self._manager.connect(self.db_path)
+
+    def refresh_status_projection(self) -> bool:
+        # A snapshot keeps the projection of the day it was taken
+        return False
+
+    def _ensure_projection_current(self):
+        pass
+
+    init_database = _read_only('init_database')
+    add_item = _read_only('add_item')
+    update_item = _read_only('update_item')
+    update_item_status = _read_only('update_item_status')
+    delete_item = _read_only('delete_item')
+    set_recurrence = _read_only('set_recurrence')
+    declare_metadata_field = _read_only('declare_metadata_field')
+    backfill_metadata = _read_only('backfill_metadata')
+
+
+class SnapshotManager:
+    """Takes, prunes and serves read-only snapshots of a tracker's database"""
+
+    def __init__(self, tracker, snapshot_dir: str = None, method: str = 'backup', keep: int = 2,
+                 max_age_seconds: float = 3600, mmap_size: int = 256 * 1024 * 1024):
+        if method not in METHODS:
+            raise ValueError(f"Unknown snapshot method: {method}")
+        self.tracker = tracker
+        self.snapshot_dir = snapshot_dir or os.path.join(os.path.dirname(tracker.db_path) or '.', 'snapshots')
+        self.method = method
+        self.keep = max(keep, 1)
+        self.max_age_seconds = max_age_seconds
+        self.mmap_size = mmap_size
+        self._prefix = os.path.splitext(os.path.basename(tracker.db_path))[0] + '-'
+        self._lock = threading.Lock()
+        self._latest = None
+        self._latest_as_of = None
+        # Live SnapshotTrackers; prune() keeps the files they read
+        self._readers = weakref.WeakSet()
+        self._worker = PeriodicWorker(self.create, 'db-snapshots', 'Snapshot')
+
+    def _paths(self):
+        # Names end in a fixed-width nanosecond timestamp, so name order is age order
+        return sorted(glob.glob(os.path.join(glob.escape(self.snapshot_dir), glob.escape(self._prefix) + '*.db')))
+
+    def create(self) -> str:
+        """Write a new snapshot and make it the latest; returns its path"""
+        with SNAPSHOT_SECONDS.time():
+            self.tracker.refresh_status_projection()
+            os.makedirs(self.snapshot_dir, exist_ok=True)
+            path = os.path.join(self.snapshot_dir, f'{self._prefix}{time.time_ns():020d}.db')
+            partial = path + '.partial'
+
+            source = connect(self.tracker.db_path)
+            try:
+                if self.method == 'vacuum':
+                    source.execute("VACUUM INTO ?", (partial,))
+                else:
+                    target = sqlite3.connect(partial)
+                    try:
+                        source.backup(target)
+                    finally:
+                        target.close()
+            finally:
+                source.close()
+
+            # immutable readers must not look for a WAL; the copy is a plain rollback-journal file
+            target = sqlite3.connect(partial)
+            try:
+                target.execute("PRAGMA journal_mode=DELETE")
+                as_of = get_as_of(target)
+            finally:
+                target.close()
+            os.replace(partial, path)
+
+        with self._lock:
+            self._latest, self._latest_as_of = path, as_of
+        self.prune()
+        return path
+
+    def prune(self):
+        """Delete all but the newest keep snapshots, except those live readers use"""
+        with self._lock:
+            in_use = {reader.db_path for reader in self._readers}
+            for path in self._paths()[:-self.keep]:
+                if path in in_use:
+                    continue
+                try:
+                    os.remove(path)
+                except OSError as e:
+                    # Still open on platforms that lock open files; retried next time
+                    print(f"Could not remove snapshot {path}: {e}")
+
+    def latest(self) -> str:
+        """Path of the newest snapshot, including ones left by an earlier process; None if none"""
+        with self._lock:
+            if self._latest is not None and os.path.exists(self._latest):
+                return self._latest
+        paths = self._paths()
+        if not paths:
+            return None
+        conn = self.connect(paths[-1])
+        try:
+            as_of = get_as_of(conn)
+        finally:
+            conn.close()
+        with self._lock:
+            self._latest, self._latest_as_of = paths[-1], as_of
+        return paths[-1]
+
+    def age_seconds(self, path: str) -> float:
+        return time.time() - int(os.path.basename(path)[len(self._prefix):-3]) / 1e9
+
+    def connect(self, path: str = None) -> sqlite3.Connection:
+        """Read-only, lock-free connection to a snapshot (the latest by default)"""
+        path = path or self.latest()
+        if path is None:
+            raise FileNotFoundError(f"No snapshot in {self.snapshot_dir}")
+        # mode=ro: a missing snapshot is an error, not a new empty file
+        uri = pathlib.Path(path).resolve().as_uri() + '?mode=ro&immutable=1'
+        conn = connect(uri, uri=True, check_same_thread=False)
+        conn.execute(f"PRAGMA mmap_size = {int(self.mmap_size)}")
+        return conn
+
+    def reader(self) -> SnapshotTracker:
+        """Tracker over the latest snapshot; a new one is taken if it is missing or stale"""
+        path = self.latest()
+        if (path is None or self.age_seconds(path) > self.max_age_seconds
+                or self._latest_as_of != clock.today().isoformat()):
+            path = self.create()
+        while True:
+            with self._lock:
+                # Registered under the lock, so prune() cannot remove the file in between
+                if os.path.exists(path):
+                    reader = SnapshotTracker(self, path)
+                    self._readers.add(reader)
+                    return reader
+            path = self.create()
+
+    def start(self, interval_seconds: float = 900):
+        """Take a snapshot now and then every interval_seconds on a daemon thread"""
+        self._worker.start(interval_seconds)
+        return self
+
+    def stop(self):
+        self._worker.stop()
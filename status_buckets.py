@@ -0,0 +1,176 @@
+# status_buckets.py - إسقاط مخزن للأيام المتبقية وفئة الحالة مع تحديث يومي
+"""Materialized days_left / status_bucket columns on expiry_items.
+
+days_left is counted from the projection's as-of date (status_projection),
+not from the moment a query runs, so every reader sees the same whole-day
+value. Triggers keep a row current when it is inserted or its expiry date or
+status changes; once per day a rollover recomputes the active rows in
+batches for clock.today() and moves as_of there in its last transaction.
+Bucket queries ("overdue", "due this week") are then equality lookups on
+idx_items_status_bucket.
+
+A rollover in progress is recorded as rolling_to (its day) and rolled_id
+(the highest id recomputed so far), committed with every batch; a rollover
+interrupted by a crash resumes from there on the next refresh. Triggers
+compute against rolling_to while it is set, so rows written during a
+rollover already count from the new day.
+"""
+import time
+from datetime import date
+
+import metrics
+from periodic import PeriodicWorker
+
+ROLLOVER_SECONDS = metrics.registry.histogram(
+    'expiry_status_rollover_seconds', 'Time spent recomputing status buckets for a new day')
+
+# (bucket, highest days_left in it); anything later is 'later'
+BUCKET_LIMITS = (('overdue', -1), ('week', 7), ('month', 30))
+LATER = 'later'
+BUCKETS = tuple(name for name, _ in BUCKET_LIMITS) + (LATER,)
+
+
+def bucket_for(days_left: int) -> str:
+    for name, limit in BUCKET_LIMITS:
+        if days_left <= limit:
+            return name
+    return LATER
+
+
+def _bucket_sql(days_expr: str) -> str:
+    cases = ' '.join(f"WHEN {days_expr} <= {limit} THEN '{name}'" for name, limit in BUCKET_LIMITS)
+    return f"CASE {cases} ELSE '{LATER}' END"
+
+
+def _days_sql(expiry_expr: str, as_of_expr: str) -> str:
+    return f"CAST(julianday({expiry_expr}) - julianday({as_of_expr}) AS INTEGER)"
+
+
+def create_status_projection(cursor, today: date):
+    """Add the projection columns, state row, index and maintenance triggers"""
+    cursor.execute("PRAGMA table_info(expiry_items)")
+    existing = {row[1] for row in cursor.fetchall()}
+    if 'days_left' not in existing:
+        cursor.execute("ALTER TABLE expiry_items ADD COLUMN days_left INTEGER")
+    if 'status_bucket' not in existing:
+        cursor.execute("ALTER TABLE expiry_items ADD COLUMN status_bucket TEXT")
+
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS status_projection (
+            id INTEGER PRIMARY KEY CHECK (id = 1),
+            as_of DATE NOT NULL,
+            rolling_to DATE,
+            rolled_id INTEGER
+        )
+    ''')
+    cursor.execute("PRAGMA table_info(status_projection)")
+    state_columns = {row[1] for row in cursor.fetchall()}
+    for column, column_type in (('rolling_to', 'DATE'), ('rolled_id', 'INTEGER')):
+        if column not in state_columns:
+            cursor.execute(f"ALTER TABLE status_projection ADD COLUMN {column} {column_type}")
+    # A new projection starts one day behind so the first refresh fills every row
+    cursor.execute("INSERT OR IGNORE INTO status_projection (id, as_of) VALUES (1, date(?, '-1 day'))",
+                   (today.isoformat(),))
+
+    cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_items_status_bucket
+        ON expiry_items (status, status_bucket, expiry_date)
+    ''')
+
+    # Triggers of older databases count from as_of even during a rollover
+    cursor.execute('''
+        SELECT name FROM sqlite_master
+        WHERE type = 'trigger' AND name LIKE 'status_projection_%' AND sql NOT LIKE '%rolling_to%'
+    ''')
+    for (name,) in cursor.fetchall():
+        cursor.execute(f"DROP TRIGGER {name}")
+
+    days = _days_sql('NEW.expiry_date', '(SELECT COALESCE(rolling_to, as_of) FROM status_projection WHERE id = 1)')
+    refresh_row = f'''
+            UPDATE expiry_items
+            SET days_left = {days}, status_bucket = {_bucket_sql(days)}
+            WHERE id = NEW.id;
+    '''
+    cursor.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS status_projection_insert
+        AFTER INSERT ON expiry_items BEGIN
+            {refresh_row}
+        END
+    ''')
+    cursor.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS status_projection_update
+        AFTER UPDATE OF expiry_date, status ON expiry_items BEGIN
+            {refresh_row}
+        END
+    ''')
+
+
+def get_as_of(conn) -> str:
+    row = conn.execute("SELECT as_of FROM status_projection WHERE id = 1").fetchone()
+    return row[0] if row else None
+
+
+def refresh_status_projection(conn, today: date, batch_size: int = 5000) -> bool:
+    """Roll the projection forward to today; returns False if it was already current.
+
+    Active rows are recomputed in id-range batches, one short write
+    transaction each that also records the batch's high-water id; the last
+    one also moves as_of. A rollover for today left unfinished is resumed
+    after its high-water id.
+    """
+    as_of = today.isoformat()
+    cursor = conn.cursor()
+    cursor.execute("BEGIN IMMEDIATE")
+    current, rolling_to, rolled_id = cursor.execute(
+        "SELECT as_of, rolling_to, rolled_id FROM status_projection WHERE id = 1").fetchone()
+    if current == as_of and rolling_to is None:
+        conn.rollback()
+        return False
+    if rolling_to != as_of:
+        # A rollover to an earlier day left unfinished is restarted for today
+        rolled_id = 0
+        cursor.execute("UPDATE status_projection SET rolling_to = ?, rolled_id = 0 WHERE id = 1", (as_of,))
+    max_id = cursor.execute("SELECT COALESCE(MAX(id), 0) FROM expiry_items").fetchone()[0]
+    conn.commit()
+
+    days = _days_sql('expiry_date', ':as_of')
+    recompute = f'''
+        UPDATE expiry_items
+        SET days_left = {days}, status_bucket = {_bucket_sql(days)}
+        WHERE status = 'active' AND id > :low AND id <= :high
+    '''
+    start = time.perf_counter()
+    # Resumes after rolled_id; an empty range still needs the final transaction
+    lows = list(range(rolled_id or 0, max_id, batch_size)) or [max_id]
+    for low in lows:
+        cursor.execute("BEGIN IMMEDIATE")
+        cursor.execute(recompute, {'as_of': as_of, 'low': low, 'high': low + batch_size})
+        if low == lows[-1]:
+            cursor.execute('''
+                UPDATE status_projection SET as_of = rolling_to, rolling_to = NULL, rolled_id = NULL
+                WHERE id = 1
+            ''')
+        else:
+            cursor.execute("UPDATE status_projection SET rolled_id = ? WHERE id = 1", (low + batch_size,))
+        conn.commit()
+    ROLLOVER_SECONDS.observe(time.perf_counter() - start)
+    return True
+
+
+class StatusRollover:
+    """Daemon job that rolls the status projection over when the day changes"""
+
+    def __init__(self, tracker, interval_seconds: float = 60):
+        self.tracker = tracker
+        self.interval_seconds = interval_seconds
+        self._worker = PeriodicWorker(self.run_once, 'status-rollover', 'Status rollover')
+
+    def run_once(self) -> bool:
+        return self.tracker.refresh_status_projection()
+
+    def start(self):
+        self._worker.start(self.interval_seconds)
+        return self
+
+    def stop(self):
+        self._worker.stop()
@@ -0,0 +1,131 @@
+# streamlit_data.py - طبقة بيانات Streamlit مع تخزين مؤقت للموارد والاستعلامات
+"""Cached data access for the Streamlit pages.
+
+Trackers, the predictor and the auth system are created once per process
+(st.cache_resource). Query results are cached with st.cache_data and keyed by
+the tracker's data version and today's date, so reruns reuse them until an
+item actually changes or the day rolls over.
+"""
+from concurrent.futures import Future
+from typing import Any, Dict, List
+
+import pandas as pd
+import streamlit as st
+
+import clock
+from ai_predictor import ExpiryPredictor
+from background_writer import BackgroundWriter
+from models import ExpiryTracker
+
+DEFAULT_DB_PATH = "data/expiry_tracker.db"
+
+# Reruns within this many seconds share one data-version lookup
+VERSION_CHECK_SECONDS = 2
+
+
+@st.cache_resource
+def get_tracker(db_path: str = DEFAULT_DB_PATH) -> ExpiryTracker:
+    """Process-wide tracker"""
+    return ExpiryTracker(db_path)
+
+
+@st.cache_resource
+def get_writer(db_path: str = DEFAULT_DB_PATH) -> BackgroundWriter:
+    """Process-wide background writer; every session's item updates share its group commits"""
+    tracker = get_tracker(db_path)
+    tracker.writer = BackgroundWriter(tracker).start()
+    return tracker.writer
+
+
+@st.cache_resource
+def get_predictor(db_path: str = DEFAULT_DB_PATH) -> ExpiryPredictor:
+    """Process-wide predictor with its model loaded once"""
+    predictor = ExpiryPredictor(get_tracker(db_path))
+    predictor.load_model()
+    return predictor
+
+
+@st.cache_resource
+def get_auth_system():
+    """Process-wide auth system"""
+    from auth_system import AuthSystem
+    return AuthSystem()
+
+
+@st.cache_data(ttl=VERSION_CHECK_SECONDS, show_spinner=False)
+def _data_version(db_path: str) -> tuple:
+    return get_tracker(db_path).get_data_version(), clock.today().isoformat()
+
+
+@st.cache_data(max_entries=128, show_spinner=False)
+def _cached_query(db_path: str, version: tuple, method: str, args: tuple, kwargs: tuple):
+    return getattr(get_tracker(db_path), method)(*args, **dict(kwargs))
+
+
+def _query(method: str, *args, db_path: str = DEFAULT_DB_PATH, **kwargs):
+    return _cached_query(db_path, _data_version(db_path), method, args, tuple(sorted(kwargs.items())))
+
+
+def get_all_items(db_path: str = DEFAULT_DB_PATH) -> pd.DataFrame:
+    return _query('get_all_items', db_path=db_path)
+
+
+def get_upcoming_expirations(days: int = 30, db_path: str = DEFAULT_DB_PATH, **kwargs) -> pd.DataFrame:
+    return _query('get_upcoming_expirations', days, db_path=db_path, **kwargs)
+
+
+def get_overdue_items(db_path: str = DEFAULT_DB_PATH) -> pd.DataFrame:
+    return _query('get_overdue_items', db_path=db_path)
+
+
+def get_items_by_category(category: str, db_path: str = DEFAULT_DB_PATH) -> pd.DataFrame:
+    return _query('get_items_by_category', category, db_path=db_path)
+
+
+def get_statistics(db_path: str = DEFAULT_DB_PATH) -> Dict[str, Any]:
+    return _query('get_statistics', db_path=db_path)
+
+
+def search_items(query: str, limit: int = 50, db_path: str = DEFAULT_DB_PATH, **filters) -> pd.DataFrame:
+    return _query('search_items', query, filters or None, limit, db_path=db_path)
+
+
+def get_smart_recommendations(db_path: str = DEFAULT_DB_PATH) -> List[Dict[str, Any]]:
+    return _cached_recommendations(db_path, _data_version(db_path))
+
+
+@st.cache_data(max_entries=8, show_spinner=False)
+def _cached_recommendations(db_path: str, version: tuple) -> List[Dict[str, Any]]:
+    return get_predictor(db_path).get_smart_recommendations()
+
+
+def invalidate():
+    """Forget cached query results, e.g. right after a write from this session"""
+    _data_version.clear()
+
+
+def update_item_status(item_id: int, status: str, db_path: str = DEFAULT_DB_PATH) -> Future:
+    """Queue a status change; cached queries are dropped once it is committed"""
+    future = get_writer(db_path).update_status(item_id, status)
+    future.add_done_callback(lambda _: invalidate())
+    return future
+
+
+def update_item(item_id: int, fields: Dict[str, Any], db_path: str = DEFAULT_DB_PATH) -> Future:
+    """Queue changes to some of an item's columns"""
+    future = get_writer(db_path).update_item(item_id, fields)
+    future.add_done_callback(lambda _: invalidate())
+    return future
+
+
+def get_user_permissions(user_id) -> List[Any]:
+    """Permissions of a user, looked up once per session"""
+    cache = st.session_state.setdefault('_permissions_cache', {})
+    if user_id not in cache:
+        cache[user_id] = get_auth_system().get_user_permissions(user_id)
+    return cache[user_id]
+
+
+def clear_user_permissions():
+    """Drop the memoized permissions (on logout)"""
+    st.session_state.pop('_permissions_cache', None)
@@ -0,0 +1,184 @@
+# tenancy.py - توزيع بيانات الشركات العميلة على ملفات قواعد بيانات مستقلة
+import os
+import re
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List
+
+import pandas as pd
+
+from database import connect
+from models import ExpiryTracker
+
+_TENANT_ID = re.compile(r'^[a-z0-9][a-z0-9_-]{0,63}$')
+
+
+class TenantRegistry:
+    """Keeps the list of tenants and the database file of each one"""
+
+    def __init__(self, registry_path: str = "data/tenants.db", data_dir: str = "data/tenants"):
+        self.registry_path = registry_path
+        self.data_dir = data_dir
+        os.makedirs(data_dir, exist_ok=True)
+        self.init_database()
+
+    def init_database(self):
+        conn = connect(self.registry_path)
+        conn.execute('''
+            CREATE TABLE IF NOT EXISTS tenants (
+                tenant_id TEXT PRIMARY KEY,
+                name TEXT,
+                db_path TEXT NOT NULL,
+                is_active BOOLEAN DEFAULT TRUE,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+        ''')
+        conn.commit()
+        conn.close()
+
+    def add_tenant(self, tenant_id: str, name: str = None) -> str:
+        """Register a tenant and return the path of its database file"""
+        if not _TENANT_ID.match(tenant_id):
+            raise ValueError(f"Invalid tenant id: {tenant_id!r}")
+        db_path = os.path.join(self.data_dir, f"{tenant_id}.db")
+
+        conn = connect(self.registry_path)
+        conn.execute('''
+            INSERT INTO tenants (tenant_id, name, db_path) VALUES (?, ?, ?)
+            ON CONFLICT(tenant_id) DO UPDATE SET is_active = TRUE, name = COALESCE(excluded.name, name)
+        ''', (tenant_id, name or tenant_id, db_path))
+        conn.commit()
+        conn.close()
+
+        return db_path
+
+    def deactivate_tenant(self, tenant_id: str):
+        """Hide a tenant from routing; its database file is kept"""
+        conn = connect(self.registry_path)
+        conn.execute("UPDATE tenants SET is_active = FALSE WHERE tenant_id = ?", (tenant_id,))
+        conn.commit()
+        conn.close()
+
+    def get_db_path(self, tenant_id: str) -> str:
+        conn = connect(self.registry_path)
+        row = conn.execute(
+            "SELECT db_path FROM tenants WHERE tenant_id = ? AND is_active", (tenant_id,)
+        ).fetchone()
+        conn.close()
+        if row is None:
+            raise KeyError(f"Unknown tenant: {tenant_id}")
+        return row[0]
+
+    def list_tenants(self) -> List[str]:
+        conn = connect(self.registry_path)
+        rows = conn.execute("SELECT tenant_id FROM tenants WHERE is_active ORDER BY tenant_id").fetchall()
+        conn.close()
+        return [row[0] for row in rows]
+
+
+class ShardRouter:
+    """Routes calls to per-tenant trackers and fans aggregate queries out across shards.
+
+    Trackers are kept in an LRU cache, each with a pool of pool_size open
+    connections, so a busy tenant pays neither for schema checks nor for
+    opening connections on every request. At most max_open shards are cached;
+    the pool of an evicted one is closed.
+    """
+
+    def __init__(self, registry: TenantRegistry = None, max_open: int = 64, max_workers: int = None,
+                 pool_size: int = 2):
+        self.registry = registry or TenantRegistry()
+        self.max_open = max_open
+        self.max_workers = max_workers or min(32, (os.cpu_count() or 1) * 4)
+        self.pool_size = pool_size
+        self._trackers: 'OrderedDict[str, ExpiryTracker]' = OrderedDict()
+        self._lock = threading.Lock()
+        # tenant id -> lock held while its tracker is created, so it is created once
+        self._creating: Dict[str, threading.Lock] = {}
+
+    def _cached(self, tenant_id: str) -> ExpiryTracker:
+        # Caller holds self._lock
+        tracker = self._trackers.get(tenant_id)
+        if tracker is not None:
+            self._trackers.move_to_end(tenant_id)
+        return tracker
+
+    def tracker(self, tenant_id: str) -> ExpiryTracker:
+        """Get the tracker of one tenant"""
+        with self._lock:
+            tracker = self._cached(tenant_id)
+            if tracker is not None:
+                return tracker
+            creating = self._creating.setdefault(tenant_id, threading.Lock())
+
+        # Other tenants are served while this one's schema is checked
+        with creating:
+            with self._lock:
+                tracker = self._cached(tenant_id)
+            if tracker is not None:
+                return tracker
+
+            evicted = []
+            try:
+                tracker = ExpiryTracker(self.registry.get_db_path(tenant_id), pool_size=self.pool_size)
+                with self._lock:
+                    self._trackers[tenant_id] = tracker
+                    while len(self._trackers) > self.max_open:
+                        evicted.append(self._trackers.popitem(last=False)[1])
+            finally:
+                with self._lock:
+                    self._creating.pop(tenant_id, None)
+
+        for old in evicted:
+            old.close()
+        return tracker
+
+    def close(self):
+        """Close the connection pools of every cached tracker"""
+        with self._lock:
+            trackers = list(self._trackers.values())
+            self._trackers.clear()
+        for tracker in trackers:
+            tracker.close()
+
+    def add_tenant(self, tenant_id: str, name: str = None) -> ExpiryTracker:
+        """Register a tenant and create its database"""
+        self.registry.add_tenant(tenant_id, name)
+        return self.tracker(tenant_id)
+
+    def map_tenants(self, func: Callable[[ExpiryTracker], Any], tenants: List[str] = None) -> Dict[str, Any]:
+        """Run func against every tenant's tracker in parallel"""
+        tenants = tenants if tenants is not None else self.registry.list_tenants()
+        if not tenants:
+            return {}
+        with ThreadPoolExecutor(max_workers=min(self.max_workers, len(tenants))) as pool:
+            futures = {tenant: pool.submit(lambda t=tenant: func(self.tracker(t))) for tenant in tenants}
+            return {tenant: future.result() for tenant, future in futures.items()}
+
+    def global_statistics(self, tenants: List[str] = None) -> Dict[str, Any]:
+        """get_statistics() summed over all tenants"""
+        per_tenant = self.map_tenants(lambda tracker: tracker.get_statistics(), tenants)
+
+        merged: Dict[str, Any] = {'by_category': {}, 'tenants': len(per_tenant)}
+        for stats in per_tenant.values():
+            for key, value in stats.items():
+                if isinstance(value, dict):
+                    counts = merged.setdefault(key, {})
+                    for name, count in value.items():
+                        counts[name] = counts.get(name, 0) + count
+                else:
+                    merged[key] = merged.get(key, 0) + value
+        return merged
+
+    def global_upcoming(self, days: int = 30, limit: int = None, tenants: List[str] = None) -> pd.DataFrame:
+        """get_upcoming_expirations() of all tenants merged by expiry date"""
+        per_tenant = self.map_tenants(lambda tracker: tracker.get_upcoming_expirations(days), tenants)
+
+        frames = [df.assign(tenant_id=tenant) for tenant, df in per_tenant.items() if not df.empty]
+        if not frames:
+            return pd.DataFrame()
+        merged = pd.concat(frames, ignore_index=True).sort_values('expiry_date', kind='stable')
+        if limit is not None:
+            merged = merged.head(limit)
+        return merged.reset_index(drop=True)
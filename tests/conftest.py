@@ -0,0 +1,29 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from models import ExpiryTracker  # noqa: E402
+
+
+def make_item(**overrides):
+    item = {
+        'title': 'رخصة قيادة',
+        'category': 'رخص القيادة',
+        'expiry_date': '2030-01-01',
+        'source': 'manual',
+    }
+    item.update(overrides)
+    return item
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    return str(tmp_path / 'tracker.db')
+
+
+@pytest.fixture
+def tracker(db_path):
+    return ExpiryTracker(db_path)
@@ -0,0 +1,19 @@
+from datetime import datetime
+
+import clock
+from ai_predictor import ExpiryPredictor
+from conftest import make_item
+
+
+def test_training_days_left_match_the_projection(tracker):
+    for day in range(1, 13):
+        tracker.add_item(make_item(title=f'عنصر {day}', expiry_date=f'2030-01-{day:02d}'))
+
+    with clock.use_clock(clock.FixedClock(datetime(2030, 1, 1, 15, 30))):
+        tracker.refresh_status_projection()
+        features, urgency = ExpiryPredictor(tracker).prepare_training_data()
+        projected = [item['days_left'] for item in tracker.get_all_items().to_dict('records')]
+
+    assert features is not None
+    assert sorted(100 - urgency) == sorted(projected)
+    assert min(projected) == 0
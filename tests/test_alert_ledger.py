@@ -0,0 +1,97 @@
+import sqlite3
+import threading
+
+import pytest
+
+from alert_ledger import AlertLedger
+from conftest import make_item
+from notifications import NotificationManager
+
+CONFIG = {'telegram': {'enabled': True, 'chat_id': '1'}}
+
+
+@pytest.fixture
+def ledger(tracker):
+    return AlertLedger(tracker)
+
+
+def _keys(tracker, count=3):
+    items = [tracker.get_item(tracker.add_item(make_item(title=f'عنصر {n}'))) for n in range(count)]
+    return AlertLedger.keys(items, [3] * count, 'telegram')
+
+
+def _alerts(db_path):
+    conn = sqlite3.connect(db_path)
+    try:
+        return conn.execute("SELECT item_id, alert_type, sent FROM alerts ORDER BY item_id").fetchall()
+    finally:
+        conn.close()
+
+
+def test_claim_then_finish(tracker, ledger, db_path):
+    keys = _keys(tracker)
+    assert ledger.claim(keys) == set(keys)
+
+    ledger.finish(keys[:2], keys[2:])
+    assert _alerts(db_path) == [(keys[0][0], 'week', 1), (keys[1][0], 'week', 1)]
+    assert ledger.lookup(keys) == set(keys[:2])
+    # The released claim can be taken again
+    assert ledger.claim(keys) == {keys[2]}
+
+
+def test_duplicate_claim_returns_nothing(tracker, ledger):
+    keys = _keys(tracker)
+    ledger.claim(keys)
+    assert ledger.claim(keys) == set()
+    assert ledger.claim(keys + keys) == set()
+
+
+def test_concurrent_claimers_get_disjoint_sets(tracker, ledger):
+    keys = _keys(tracker, 40)
+    start = threading.Barrier(4)
+    won = []
+
+    def claim():
+        start.wait()
+        won.append(AlertLedger(tracker).claim(keys))
+
+    threads = [threading.Thread(target=claim) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert sum(len(claimed) for claimed in won) == len(keys)
+    assert set().union(*won) == set(keys)
+
+
+@pytest.fixture
+def records(tracker):
+    _keys(tracker, 2)
+    return tracker.get_upcoming_records(100000)
+
+
+def _unreachable(chat_id, message):
+    raise OSError('down')
+
+
+def test_failed_send_releases_the_claim(ledger, records, db_path, monkeypatch):
+    manager = NotificationManager()
+    monkeypatch.setattr(manager, 'send_telegram', _unreachable)
+
+    results = manager.send_bulk_notifications(records, CONFIG, ledger)
+    assert [result['success'] for result in results] == [False, False]
+    assert _alerts(db_path) == []
+
+
+def test_render_error_releases_the_claims(ledger, records, db_path, monkeypatch):
+    manager = NotificationManager()
+    monkeypatch.setattr(manager, 'get_renderer', lambda channel: 1 / 0)
+    with pytest.raises(ZeroDivisionError):
+        manager.send_bulk_notifications(records, CONFIG, ledger)
+    assert _alerts(db_path) == []
+
+    monkeypatch.undo()
+    monkeypatch.setattr(manager, 'send_telegram', lambda chat_id, message: True)
+    results = manager.send_bulk_notifications(records, CONFIG, ledger)
+    assert [result['success'] for result in results] == [True, True]
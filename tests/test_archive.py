@@ -0,0 +1,50 @@
+import sqlite3
+
+import pytest
+
+from archive import ItemArchiver
+from conftest import make_item
+from models import ExpiryTracker
+
+
+@pytest.fixture
+def cached_tracker(db_path):
+    return ExpiryTracker(db_path, cache_size=64)
+
+
+def _age(db_path, item_id):
+    conn = sqlite3.connect(db_path)
+    conn.execute("UPDATE expiry_items SET status = 'inactive', updated_at = '2000-01-01' WHERE id = ?", (item_id,))
+    conn.commit()
+    conn.close()
+
+
+def test_archiving_invalidates_cached_statistics(cached_tracker, db_path):
+    cached_tracker.add_item(make_item())
+    old_id = cached_tracker.add_item(make_item(title='قديم'))
+    _age(db_path, old_id)
+    cached_tracker.invalidate_cache()
+
+    assert cached_tracker.get_statistics()['total_items'] == 2
+    assert ItemArchiver(cached_tracker).run() == 1
+    assert cached_tracker.get_statistics()['total_items'] == 1
+
+
+def test_restore_invalidates_cached_statistics(cached_tracker, db_path):
+    old_id = cached_tracker.add_item(make_item())
+    _age(db_path, old_id)
+    archiver = ItemArchiver(cached_tracker)
+    archiver.run()
+
+    assert cached_tracker.get_statistics()['total_items'] == 0
+    assert archiver.restore_item(old_id)
+    assert cached_tracker.get_statistics()['total_items'] == 1
+
+
+def test_manual_run_works_after_the_background_worker_stopped(cached_tracker, db_path):
+    archiver = ItemArchiver(cached_tracker).start(interval_seconds=3600)
+    archiver.stop()
+
+    old_id = cached_tracker.add_item(make_item(title='قديم'))
+    _age(db_path, old_id)
+    assert archiver.run() == 1
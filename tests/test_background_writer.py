@@ -0,0 +1,42 @@
+import threading
+
+import pytest
+
+from background_writer import BackgroundWriter
+from conftest import make_item
+
+
+def test_updates_are_committed(tracker):
+    item_id = tracker.add_item(make_item())
+    writer = BackgroundWriter(tracker).start()
+    try:
+        assert writer.update_status(item_id, 'inactive').result(5) is True
+    finally:
+        writer.close()
+    assert tracker.get_item(item_id)['status'] == 'inactive'
+
+
+def test_a_dead_writer_fails_queued_updates_and_refuses_new_ones(tracker, monkeypatch):
+    item_id = tracker.add_item(make_item())
+    writer = BackgroundWriter(tracker, flush_interval=0)
+    flushing, release = threading.Event(), threading.Event()
+
+    def dying_flush(conn, batch):
+        flushing.set()
+        release.wait(5)
+        raise MemoryError('writer died')
+
+    monkeypatch.setattr(writer, '_flush', dying_flush)
+    writer.start()
+    in_flight = writer.update_status(item_id, 'inactive')
+    assert flushing.wait(5)
+    queued = writer.update_item(item_id, {'title': 'جديد'})
+    release.set()
+
+    for future in (in_flight, queued):
+        with pytest.raises(MemoryError, match='writer died'):
+            future.result(5)
+    writer._thread.join(5)
+    with pytest.raises(RuntimeError, match='not running'):
+        writer.update_status(item_id, 'renewed')
+    writer.close()
@@ -0,0 +1,46 @@
+import glob
+import os
+
+import pytest
+
+pytest.importorskip('pyarrow')
+
+from columnar_export import export_items, read_export  # noqa: E402
+from conftest import make_item  # noqa: E402
+
+
+def _parts(out_dir):
+    return sorted(glob.glob(os.path.join(out_dir, 'expiry_month=*', 'part-*.parquet')))
+
+
+def test_incremental_export_writes_only_changed_items(tracker, tmp_path):
+    out_dir = str(tmp_path / 'export')
+    ids = [tracker.add_item(make_item(title=f'عنصر {n}', expiry_date=f'2030-0{n}-01')) for n in range(1, 6)]
+    assert export_items(tracker, out_dir)['rows'] == 5
+    parts = _parts(out_dir)
+
+    unchanged = export_items(tracker, out_dir, incremental=True)
+    assert (unchanged['rows'], unchanged['files']) == (0, 0)
+    assert _parts(out_dir) == parts
+
+    tracker.update_item(ids[0], dict(tracker.get_item(ids[0]), title='جديد'))
+    changed = export_items(tracker, out_dir, incremental=True)
+    assert (changed['rows'], changed['files']) == (1, 1)
+
+    table = read_export(out_dir)
+    assert table.num_rows == 5
+    assert dict(zip(table.column('id').to_pylist(), table.column('title').to_pylist()))[ids[0]] == 'جديد'
+
+
+def test_export_holds_back_change_log_pruning(tracker, tmp_path):
+    from change_feed import ChangeFeed
+
+    out_dir = str(tmp_path / 'export')
+    tracker.add_item(make_item())
+    export_items(tracker, out_dir)
+    item_id = tracker.add_item(make_item(title='ثانية'))
+
+    ChangeFeed(tracker, 'other').commit(10 ** 6)
+    ChangeFeed(tracker, 'other').prune()
+    assert export_items(tracker, out_dir, incremental=True)['rows'] == 1
+    assert item_id in read_export(out_dir).column('id').to_pylist()
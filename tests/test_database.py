@@ -0,0 +1,33 @@
+import pytest
+
+from database import connect
+from query_monitor import monitor
+
+
+@pytest.fixture
+def enabled_monitor():
+    previous = monitor.enabled
+    monitor.configure(enabled=True)
+    monitor.reset()
+    yield monitor
+    monitor.configure(enabled=previous)
+    monitor.reset()
+
+
+def _recorded(sql_start):
+    return [s for s in monitor.get_stats() if s['sql'].startswith(sql_start)]
+
+
+def test_connection_execute_is_monitored(enabled_monitor, tracker):
+    conn = connect(tracker.db_path)
+    try:
+        assert conn.execute("SELECT COUNT(*) FROM expiry_items").fetchone() == (0,)
+        conn.executemany("INSERT INTO alerts (item_id, alert_type, alert_date, channel) VALUES (?, ?, ?, ?)",
+                         [(1, 'week', '2030-01-01', 'email')])
+        conn.executescript("DELETE FROM alerts;")
+    finally:
+        conn.close()
+
+    [select] = _recorded('SELECT COUNT(*) FROM expiry_items')
+    assert select['count'] == 1 and select['caller'].startswith('test_database.')
+    assert _recorded('INSERT INTO alerts')
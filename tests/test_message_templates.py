@@ -0,0 +1,22 @@
+import pytest
+
+from message_templates import AlertRenderer, weekly_summary
+
+ITEM = {'title': '*عرض* _خاص_', 'category': 'عروض', 'source': 'manual', 'expiry_date': '2030-01-01'}
+
+
+def test_whatsapp_titles_cannot_add_markup():
+    message = AlertRenderer('whatsapp').render(ITEM, 3)['message']
+    assert '*عرض*' not in message and '_خاص_' not in message
+    assert '*\u200bعرض*\u200b _\u200bخاص_\u200b' in message
+
+
+def test_whatsapp_weekly_titles_are_escaped():
+    summary = weekly_summary(1, 1, 0, [('*عاجل*', 2)], channel='whatsapp')
+    assert '*\u200bعاجل*\u200b' in summary
+
+
+@pytest.mark.parametrize('channel, expected', [('telegram', '&lt;b&gt;'), ('email', '&lt;b&gt;')])
+def test_html_channels_escape_titles(channel, expected):
+    message = AlertRenderer(channel).render(dict(ITEM, title='<b>'), 3)['message']
+    assert expected in message
@@ -0,0 +1,62 @@
+from datetime import date, datetime, timedelta
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import clock
+from model_registry import ModelRegistry, days_left
+
+TODAY = date(2030, 1, 1)
+
+
+def _frame(category, rows, priority='high'):
+    return pd.DataFrame({
+        'category': category,
+        'priority': priority,
+        'source': 'manual',
+        'created_at': '2029-06-01 12:00:00',
+        'expiry_date': [(TODAY + timedelta(days=1 + day % 90)).isoformat() for day in range(rows)],
+    })
+
+
+@pytest.fixture(autouse=True)
+def fixed_clock():
+    with clock.use_clock(clock.FixedClock(TODAY)):
+        yield
+
+
+@pytest.mark.parametrize('rows, kind', [(40, 'linear'), (120, 'forest')])
+def test_fitted_model_beats_the_heuristic(tmp_path, rows, kind):
+    registry = ModelRegistry(str(tmp_path), min_forest_rows=100)
+    entry = registry.train(_frame('visa', rows))['visa']
+
+    assert entry['kind'] == kind
+    assert entry['mae'] < entry['heuristic_mae']
+    assert registry.get('visa') is not None
+
+    items = _frame('visa', 5)
+    expected = np.clip(100 - days_left(items), 0, 100)
+    assert np.abs(registry.predict(items) - expected).max() < 5
+
+
+def test_items_without_expiry_fall_back_to_the_heuristic(tmp_path):
+    registry = ModelRegistry(str(tmp_path))
+    registry.train(_frame('visa', 40))
+
+    scores = registry.predict([{'category': 'visa', 'priority': 'medium', 'source': 'manual',
+                                'created_at': None, 'expiry_date': None}])
+    assert scores.tolist() == [50.0]
+
+
+def test_days_left_counts_calendar_days():
+    with clock.use_clock(clock.FixedClock(datetime(2030, 1, 1, 23, 59))):
+        assert days_left(pd.DataFrame({'expiry_date': ['2030-01-02', '2030-01-01']})).tolist() == [1.0, 0.0]
+
+
+def test_get_stats_does_not_register_unused_models(tmp_path):
+    registry = ModelRegistry(str(tmp_path))
+    registry.train(_frame('visa', 40))
+
+    assert registry.get_stats()['visa']['calls'] == 0
+    assert registry._stats == {}
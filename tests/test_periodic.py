@@ -0,0 +1,22 @@
+import threading
+
+from periodic import PeriodicWorker
+
+
+def test_worker_keeps_running_after_a_failure_and_stops():
+    calls = []
+    ran_twice = threading.Event()
+
+    def job():
+        calls.append(1)
+        if len(calls) >= 2:
+            ran_twice.set()
+        if len(calls) == 1:
+            raise ValueError('boom')
+
+    worker = PeriodicWorker(job, 'test-worker', 'Test job').start(0.01)
+    assert ran_twice.wait(5)
+    worker.stop()
+    count = len(calls)
+    worker.stopping.wait(0.05)
+    assert len(calls) == count
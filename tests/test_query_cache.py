@@ -0,0 +1,38 @@
+import pytest
+
+from conftest import make_item
+from models import ExpiryTracker
+
+
+@pytest.fixture
+def cached_tracker(db_path):
+    return ExpiryTracker(db_path, cache_size=64)
+
+
+def test_positional_and_keyword_calls_share_one_entry(cached_tracker):
+    cached_tracker.get_upcoming_expirations(30)
+    cached_tracker.get_upcoming_expirations(days=30)
+    cached_tracker.get_upcoming_expirations()
+    stats = cached_tracker.get_cache_stats()
+    assert (stats['size'], stats['misses'], stats['hits']) == (1, 1, 2)
+
+
+@pytest.mark.parametrize('lookup', [
+    lambda tracker: tracker.get_items_by_category('visa'),
+    lambda tracker: tracker.get_items_by_category(category='visa'),
+])
+def test_adding_an_item_invalidates_its_category(cached_tracker, lookup):
+    cached_tracker.add_item(make_item(category='visa'))
+    assert len(lookup(cached_tracker)) == 1
+
+    cached_tracker.add_item(make_item(category='visa', title='ثانية'))
+    assert len(lookup(cached_tracker)) == 2
+
+
+def test_other_categories_stay_cached(cached_tracker):
+    cached_tracker.add_item(make_item(category='visa'))
+    cached_tracker.get_items_by_category(category='passport')
+    cached_tracker.add_item(make_item(category='visa', title='ثانية'))
+
+    cached_tracker.get_items_by_category('passport')
+    assert cached_tracker.get_cache_stats()['hits'] == 1
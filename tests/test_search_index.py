@@ -0,0 +1,48 @@
+import sqlite3
+
+from conftest import make_item
+from search_index import metadata_sql, metadata_text, normalize_sql, normalize_text
+
+
+def test_plain_connection_can_write_items(tracker, db_path):
+    item_id = tracker.add_item(make_item())
+
+    # A connection that never imported search_index, as the sqlite3 CLI or a migration would use
+    conn = sqlite3.connect(db_path)
+    conn.execute("UPDATE expiry_items SET title = 'عقد مُحَمَّد' WHERE id = ?", (item_id,))
+    conn.execute("INSERT INTO expiry_items (title, category, expiry_date, source) VALUES ('x', 'y', '2030-01-01', 'z')")
+    conn.execute("DELETE FROM expiry_items WHERE title = 'x'")
+    conn.commit()
+    conn.close()
+
+    assert tracker.search_items('محمد')['id'].tolist() == [item_id]
+
+
+def test_sql_normalization_matches_python():
+    conn = sqlite3.connect(':memory:')
+    for text in ('مُحَمَّد أحمد إلى ـــ', 'Visa', '', None):
+        assert conn.execute(f"SELECT {normalize_sql('?')}", (text,)).fetchone()[0].lower() == normalize_text(text)
+
+    conn.execute("CREATE TABLE t (metadata TEXT)")
+    for metadata in ('{"employee_name": "أحمد", "plate_number": 123, "other": "x"}', '[1]', 'bad', None, '{}'):
+        conn.execute("DELETE FROM t")
+        conn.execute("INSERT INTO t VALUES (?)", (metadata,))
+        assert conn.execute(f"SELECT {metadata_sql('metadata')} FROM t").fetchone()[0] == metadata_text(metadata)
+
+
+def test_triggers_from_older_schema_are_replaced(tracker, db_path):
+    conn = sqlite3.connect(db_path)
+    conn.execute("DROP TRIGGER expiry_items_fts_insert")
+    conn.execute('''
+        CREATE TRIGGER expiry_items_fts_insert AFTER INSERT ON expiry_items BEGIN
+            INSERT INTO expiry_items_fts (rowid, title) VALUES (NEW.id, fts_normalize(NEW.title));
+        END
+    ''')
+    conn.commit()
+    conn.close()
+
+    tracker.init_database()
+    conn = sqlite3.connect(db_path)
+    sql = conn.execute("SELECT sql FROM sqlite_master WHERE name = 'expiry_items_fts_insert'").fetchone()[0]
+    conn.close()
+    assert 'fts_normalize' not in sql
@@ -0,0 +1,62 @@
+import gc
+import os
+import sqlite3
+
+import pytest
+
+from conftest import make_item
+from snapshots import SnapshotManager
+
+
+@pytest.fixture
+def reader(tracker, tmp_path):
+    tracker.add_item(make_item())
+    return SnapshotManager(tracker, str(tmp_path / 'snapshots')).reader()
+
+
+def test_snapshot_tracker_has_every_tracker_attribute(tracker, reader):
+    assert set(vars(tracker)) <= set(vars(reader))
+    assert reader.writer is None
+
+
+def test_snapshot_tracker_reads(reader):
+    assert len(reader.get_all_items()) == 1
+    assert reader.get_statistics()['total_items'] == 1
+
+
+@pytest.mark.parametrize('call', [
+    lambda reader: reader.add_item(make_item()),
+    lambda reader: reader.update_item(1, {'title': 'جديد'}),
+    lambda reader: reader.update_item_status(1, 'renewed'),
+    lambda reader: reader.delete_item(1),
+    lambda reader: reader.set_recurrence(1, 'yearly'),
+    lambda reader: reader.declare_metadata_field('plate'),
+])
+def test_snapshot_tracker_rejects_writes(reader, call):
+    with pytest.raises(RuntimeError, match='read-only'):
+        call(reader)
+
+
+def test_prune_keeps_snapshots_of_live_readers(tracker, tmp_path):
+    tracker.add_item(make_item())
+    manager = SnapshotManager(tracker, str(tmp_path / 'snapshots'), keep=1)
+    reader = manager.reader()
+    old_path = reader.db_path
+
+    tracker.add_item(make_item(title='ثانية'))
+    manager.create()
+    assert len(reader.get_all_items()) == 1
+    assert len(manager.reader().get_all_items()) == 2
+
+    del reader
+    gc.collect()
+    manager.prune()
+    assert not os.path.exists(old_path)
+
+
+def test_connecting_to_a_missing_snapshot_creates_no_file(tracker, tmp_path):
+    manager = SnapshotManager(tracker, str(tmp_path))
+    missing = str(tmp_path / 'gone.db')
+    with pytest.raises(sqlite3.OperationalError):
+        manager.connect(missing)
+    assert not os.path.exists(missing)
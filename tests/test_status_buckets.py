@@ -0,0 +1,85 @@
+import sqlite3
+from datetime import date, timedelta
+
+import pytest
+
+import clock
+from conftest import make_item
+from status_buckets import get_as_of, refresh_status_projection
+
+START = date(2030, 1, 1)
+
+
+class _Crash(Exception):
+    pass
+
+
+class _CrashingCursor(sqlite3.Cursor):
+    """Fails the third recompute batch, like a process dying mid-rollover"""
+
+    batches = 0
+
+    def execute(self, sql, parameters=()):
+        if sql.lstrip().startswith('UPDATE expiry_items'):
+            self.batches += 1
+            if self.batches == 3:
+                raise _Crash()
+        return super().execute(sql, parameters)
+
+
+class _CrashingConnection(sqlite3.Connection):
+    def cursor(self, factory=_CrashingCursor):
+        return super().cursor(factory)
+
+
+@pytest.fixture
+def items(tracker):
+    with clock.use_clock(clock.FixedClock(START)):
+        ids = [tracker.add_item(make_item(title=f'عنصر {day}', expiry_date=(START + timedelta(days=day)).isoformat()))
+               for day in (4, 10, 20, 40)]
+        tracker.refresh_status_projection()
+    return ids
+
+
+def _projection(db_path):
+    conn = sqlite3.connect(db_path)
+    try:
+        return conn.execute("SELECT id, days_left, status_bucket FROM expiry_items ORDER BY id").fetchall()
+    finally:
+        conn.close()
+
+
+def test_interrupted_rollover_is_resumed(tracker, db_path, items):
+    later = START + timedelta(days=10)
+    conn = sqlite3.connect(db_path, factory=_CrashingConnection)
+    with pytest.raises(_Crash):
+        refresh_status_projection(conn, later, batch_size=1)
+    conn.rollback()
+    conn.close()
+
+    conn = sqlite3.connect(db_path)
+    assert get_as_of(conn) == START.isoformat()
+    assert conn.execute("SELECT rolling_to, rolled_id FROM status_projection").fetchone() == (later.isoformat(), 2)
+    conn.close()
+
+    with clock.use_clock(clock.FixedClock(later)):
+        assert tracker.refresh_status_projection() is True
+        assert tracker.get_statistics()['overdue_items'] == 1
+
+    assert _projection(db_path) == [
+        (items[0], -6, 'overdue'), (items[1], 0, 'week'), (items[2], 10, 'month'), (items[3], 30, 'month')]
+    conn = sqlite3.connect(db_path)
+    assert conn.execute("SELECT as_of, rolling_to, rolled_id FROM status_projection").fetchone() == (
+        later.isoformat(), None, None)
+    conn.close()
+
+
+def test_rows_written_during_a_rollover_count_from_the_new_day(tracker, db_path, items):
+    later = START + timedelta(days=10)
+    conn = sqlite3.connect(db_path)
+    conn.execute("UPDATE status_projection SET rolling_to = ?, rolled_id = 0", (later.isoformat(),))
+    conn.commit()
+    conn.close()
+
+    new_id = tracker.add_item(make_item(expiry_date=(START + timedelta(days=12)).isoformat()))
+    assert _projection(db_path)[-1] == (new_id, 2, 'week')
@@ -0,0 +1,66 @@
+import threading
+
+import pytest
+
+import tenancy
+from conftest import make_item
+from tenancy import ShardRouter, TenantRegistry
+
+
+@pytest.fixture
+def router(tmp_path):
+    router = ShardRouter(TenantRegistry(str(tmp_path / 'tenants.db'), str(tmp_path / 'tenants')), max_open=2)
+    yield router
+    router.close()
+
+
+def test_cached_trackers_reuse_pooled_connections(router):
+    tracker = router.add_tenant('acme')
+    first = tracker.get_connection()
+    first.close()
+    second = tracker.get_connection()
+    second.close()
+    assert first is second
+    assert router.tracker('acme') is tracker
+
+
+def test_eviction_closes_the_pool(router):
+    acme = router.add_tenant('acme')
+    acme.add_item(make_item())
+    idle = acme.get_connection()
+    idle.close()
+    router.add_tenant('globex')
+    router.add_tenant('initech')
+
+    assert router.tracker('acme') is not acme
+    with pytest.raises(Exception, match='closed'):
+        idle.execute("SELECT 1")
+    # A reference kept by a caller still works, on its own connections
+    assert acme.get_statistics()['total_items'] == 1
+
+
+def test_concurrent_misses_create_one_tracker(router, monkeypatch):
+    router.registry.add_tenant('acme')
+    created = []
+    real_tracker = tenancy.ExpiryTracker
+
+    def counting_tracker(*args, **kwargs):
+        created.append(args)
+        return real_tracker(*args, **kwargs)
+
+    monkeypatch.setattr(tenancy, 'ExpiryTracker', counting_tracker)
+    start = threading.Barrier(8)
+    results = []
+
+    def lookup():
+        start.wait()
+        results.append(router.tracker('acme'))
+
+    threads = [threading.Thread(target=lookup) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(created) == 1
+    assert len({id(tracker) for tracker in results}) == 1
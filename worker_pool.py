@@ -0,0 +1,26 @@
+# worker_pool.py - مجمع عمليات يستلم فيه كل عامل البيانات المشتركة مرة واحدة
+"""Process pools with read-only data shared once per worker.
+
+Passing a large frame or column set with every task pickles it again for
+each task. executor() hands it to ProcessPoolExecutor's initializer instead,
+so each worker process receives it once at start-up; tasks read it back
+with shared().
+"""
+from concurrent.futures import ProcessPoolExecutor
+
+_shared = None
+
+
+def share(data):
+    """Make data available to shared() in this process; the pool initializer"""
+    global _shared
+    _shared = data
+
+
+def shared():
+    return _shared
+
+
+def executor(workers: int, data) -> ProcessPoolExecutor:
+    """Process pool whose workers start with share(data)"""
+    return ProcessPoolExecutor(max_workers=workers, initializer=share, initargs=(data,))